@@ -0,0 +1,172 @@
+"""
+Benchmark del buscador de cédula y nombre: el anterior (expresiones regulares exactas sobre el
+texto normalizado) contra el actual (proyección de dígitos con confusiones de OCR, Myers con
+distancia acotada y partes del nombre a un error). Sobre texto sintético con los errores típicos
+del OCR mide, por tipo de error, el recall (documentos del aprendiz encontrados), los falsos
+positivos (consultas de otros aprendices que coinciden) y el tiempo por búsqueda.
+
+Uso:
+    python benchmarks/bench_coincidencias.py --documentos 2000 [--semilla 42] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas.coincidencias import ConsultaDocumentos  # noqa: E402
+from epas.configuracion import DISTANCIA_MAX_CEDULA  # noqa: E402
+from epas.texto import normalize_text, proyeccion_digitos  # noqa: E402
+from corpus_sintetico import RELLENO, generar_roster  # noqa: E402
+
+class ConsultaLegado:
+    """Buscador anterior, copiado tal cual: patrones compilados por consulta y solo dígitos exactos"""
+
+    def __init__(self, cedula: str, nombre: str):
+        self.norm_cedula = normalize_text(cedula)
+        self.clean_cedula = re.sub(r'\D', '', self.norm_cedula)
+        self.name_parts = normalize_text(nombre).split()
+        self.patron_ultimos_digitos = None
+        if len(self.clean_cedula) >= 4:
+            self.patron_ultimos_digitos = re.compile(
+                rf'(?:cc|c[ée]dula|documento|identificaci[óo]n)\D*{self.clean_cedula[-4:]}', re.IGNORECASE
+            )
+        self.patrones_nombre = []
+        self.patron_nombre_completo = None
+        if len(self.name_parts) >= 2:
+            self.patrones_nombre = [re.compile(r'\b' + re.escape(part) + r'\b') for part in self.name_parts]
+            self.patron_nombre_completo = re.compile(
+                r'\b' + r'\s+'.join([re.escape(part) for part in self.name_parts]) + r'\b'
+            )
+
+    def buscar_texto(self, norm_text: str, digitos: str) -> Tuple[bool, bool]:
+        cedula_found = False
+        if self.norm_cedula:
+            cedula_found = self.clean_cedula in digitos
+            if not cedula_found and self.patron_ultimos_digitos:
+                cedula_found = bool(self.patron_ultimos_digitos.search(norm_text))
+        name_found = False
+        if self.patrones_nombre:
+            name_found = sum(1 for patron in self.patrones_nombre if patron.search(norm_text)) >= 2
+            if not name_found:
+                name_found = bool(self.patron_nombre_completo.search(norm_text))
+        return (cedula_found, name_found)
+
+# Lo que EasyOCR suele leer en lugar de cada dígito (inverso de CONFUSIONES_OCR en epas/texto.py)
+LETRAS_OCR = {'0': 'oOD', '1': 'lI', '2': 'Z', '5': 'S', '8': 'B', '9': 'g', '7': 'T'}
+
+def _confundir_digito(cedula: str, azar: random.Random) -> str:
+    posiciones = [i for i, c in enumerate(cedula) if c in LETRAS_OCR]
+    if not posiciones:
+        return cedula
+    i = azar.choice(posiciones)
+    return cedula[:i] + azar.choice(LETRAS_OCR[cedula[i]]) + cedula[i + 1:]
+
+def _perder_digito(cedula: str, azar: random.Random) -> str:
+    i = azar.randrange(len(cedula))
+    return cedula[:i] + cedula[i + 1:]
+
+def _cambiar_digito(cedula: str, azar: random.Random) -> str:
+    i = azar.randrange(len(cedula))
+    return cedula[:i] + azar.choice([d for d in '0123456789' if d != cedula[i]]) + cedula[i + 1:]
+
+def _errata_nombre(palabra: str, azar: random.Random) -> str:
+    if len(palabra) < 4:
+        return palabra
+    i = azar.randrange(1, len(palabra))
+    if azar.random() < 0.5:
+        return palabra[:i] + palabra[i + 1:]
+    return palabra[:i] + azar.choice('aeiourn') + palabra[i + 1:]
+
+# Tipo de error -> (cédula como la lee el OCR, nombre como lo lee el OCR)
+ERRORES: Dict[str, Callable[[Dict[str, str], random.Random], Tuple[str, str]]] = {
+    'limpio': lambda a, azar: (a['documento'], f"{a['nombres']} {a['apellido1']} {a['apellido2']}"),
+    'cedula_confundida': lambda a, azar: (_confundir_digito(a['documento'], azar), ''),
+    'cedula_partida': lambda a, azar: (a['documento'][:3] + ' ' + a['documento'][3:], ''),
+    'cedula_digito_perdido': lambda a, azar: (_perder_digito(a['documento'], azar), ''),
+    'cedula_digito_cambiado': lambda a, azar: (_cambiar_digito(a['documento'], azar), ''),
+    'nombre_errata': lambda a, azar: ('', ' '.join(
+        _errata_nombre(p, azar) for p in f"{a['nombres']} {a['apellido1']} {a['apellido2']}".split()
+    )),
+}
+
+def generar_textos(documentos: int, azar: random.Random) -> Tuple[List[Dict[str, str]], List[Tuple[str, int, str]]]:
+    """Roster y documentos (tipo de error, aprendiz, texto normalizado) con relleno y otros números"""
+    roster = generar_roster(max(50, documentos // 10), azar)
+    textos = []
+    for n in range(documentos):
+        error = list(ERRORES)[n % len(ERRORES)]
+        i = azar.randrange(len(roster))
+        cedula, nombre = ERRORES[error](roster[i], azar)
+        lineas = [
+            "SERVICIO NACIONAL DE APRENDIZAJE SENA",
+            f"Ficha {roster[i]['ficha']} radicado {azar.randint(10**5, 10**7)}",
+            f"Aprendiz: {nombre}" if nombre else "Aprendiz:",
+            f"Documento de identidad {cedula}" if cedula and azar.random() < 0.5 else f"N. {cedula}",
+        ] + [azar.choice(RELLENO) for _ in range(6)]
+        textos.append((error, i, normalize_text("\n".join(lineas))))
+    return roster, textos
+
+def medir(clase, roster: List[Dict[str, str]], textos: List[Tuple[str, int, str]], otros: int,
+          azar: random.Random) -> dict:
+    """Recall por tipo de error, falsos positivos y tiempo por búsqueda de una implementación"""
+    consultas = [clase(a['documento'], f"{a['nombres']} {a['apellido1']} {a['apellido2']}") for a in roster]
+    # La proyección forma parte del costo de cada implementación (se calcula una vez por documento)
+    proyectar = proyeccion_digitos if clase is ConsultaDocumentos else (lambda t: re.sub(r'\D', '', t))
+    aciertos: Dict[str, List[bool]] = {error: [] for error in ERRORES}
+    falsos, negativos, tiempos = 0, 0, []
+    for error, i, texto in textos:
+        inicio = time.perf_counter()
+        digitos = proyectar(texto)
+        encontrado = any(consultas[i].buscar_texto(texto, digitos))
+        tiempos.append(time.perf_counter() - inicio)
+        aciertos[error].append(encontrado)
+        for j in azar.sample(range(len(roster)), otros):
+            if j != i and roster[j]['documento'] != roster[i]['documento']:
+                inicio = time.perf_counter()
+                coincide = any(consultas[j].buscar_texto(texto, digitos))
+                tiempos.append(time.perf_counter() - inicio)
+                negativos += 1
+                falsos += coincide
+    return {
+        'recall': {error: round(sum(v) / len(v), 3) for error, v in aciertos.items() if v},
+        'recall_total': round(sum(sum(v) for v in aciertos.values()) / len(textos), 3),
+        'falsos_positivos': round(falsos / negativos, 4) if negativos else 0.0,
+        'microsegundos_mediana': round(statistics.median(tiempos) * 1e6, 1),
+        'microsegundos_media': round(statistics.fmean(tiempos) * 1e6, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documentos', type=int, default=2000)
+    parser.add_argument('--otros', type=int, default=5, help='consultas de otros aprendices por documento')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    roster, textos = generar_textos(args.documentos, random.Random(args.semilla))
+    resultados = {
+        'parametros': {'documentos': args.documentos, 'otros': args.otros, 'semilla': args.semilla,
+                       'distancia_max_cedula': DISTANCIA_MAX_CEDULA},
+        'legado': medir(ConsultaLegado, roster, textos, args.otros, random.Random(args.semilla)),
+        'actual': medir(ConsultaDocumentos, roster, textos, args.otros, random.Random(args.semilla)),
+    }
+
+    print(f"{'métrica':<32} {'legado':>10} {'actual':>10}")
+    for error in ERRORES:
+        print(f"{'recall ' + error:<32} {resultados['legado']['recall'][error]:>10.1%} {resultados['actual']['recall'][error]:>10.1%}")
+    for metrica, formato in (('recall_total', '.1%'), ('falsos_positivos', '.2%'),
+                             ('microsegundos_mediana', '.1f'), ('microsegundos_media', '.1f')):
+        print(f"{metrica:<32} {resultados['legado'][metrica]:>10{formato}} {resultados['actual'][metrica]:>10{formato}}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2)
+
+if __name__ == '__main__':
+    main()
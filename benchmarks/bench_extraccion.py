@@ -0,0 +1,115 @@
+"""
+Benchmark del extractor por página: tiempo por página en PDFs con capa de texto,
+escaneados (solo imagen) y mixtos (portada digitada + anexos escaneados).
+
+Para las páginas que pasan por OCR reporta además los bytes de imagen renderizados y el tiempo
+de EasyOCR por página, y cuántas se renderizaron de nuevo a DPI_OCR (resolución adaptativa).
+
+Uso:
+    python benchmarks/bench_extraccion.py --paginas 5 --repeticiones 3 [--legado] [--fija] [--salida resultados.json]
+
+Con --legado también se mide el extractor anterior (PyPDF2 + heurística de 100 caracteres
+sobre todo el documento), si PyPDF2 está instalado. Con --fija también se mide el OCR siempre
+a DPI_OCR, sin la pasada a baja resolución.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas import extraccion, ocr  # noqa: E402
+from corpus_sintetico import generar_pdf  # noqa: E402
+
+def _extraer_legado(ruta: str) -> int:
+    """Extractor anterior: PyPDF2 en todo el PDF y OCR de todas las páginas si hay < 100 caracteres"""
+    from PyPDF2 import PdfReader
+    texto = "".join((page.extract_text() or "") + "\n" for page in PdfReader(ruta).pages)
+    paginas_ocr = 0
+    if len(texto.strip()) < 100:
+        for imagen in ocr.pdf_to_images(ruta):
+            ocr.extract_text_with_easyocr(imagen)
+            paginas_ocr += 1
+    return paginas_ocr
+
+def _medir_extractor(ruta: str, paginas: int, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        control = ocr.ControlOCR()
+        inicio = time.perf_counter()
+        resultado, _ = extraccion._extraer_paginas(ruta, control)
+        tiempos.append(time.perf_counter() - inicio)
+    mejor = min(tiempos)
+    memoria = control.memoria
+    por_ocr = max(1, memoria.paginas_ocr)
+    return {
+        'paginas': paginas,
+        'paginas_texto': sum(1 for p in resultado if p.metodo == 'texto'),
+        'paginas_ocr': sum(1 for p in resultado if p.metodo == 'ocr'),
+        'segundos': mejor,
+        'segundos_por_pagina': mejor / paginas,
+        'bytes_por_pagina_ocr': memoria.bytes_ocr // por_ocr,
+        'segundos_ocr_por_pagina': memoria.segundos_ocr / por_ocr,
+        'rerenderizadas': memoria.rerenderizadas,
+        'pico_bytes': memoria.pico,
+    }
+
+def medir(ruta: str, paginas: int, repeticiones: int, legado: bool, fija: bool) -> dict:
+    """Mide el extractor sin pasar por la caché persistente"""
+    medicion = _medir_extractor(ruta, paginas, repeticiones)
+    if fija:
+        dpi_inicial = ocr.DPI_OCR_INICIAL
+        ocr.DPI_OCR_INICIAL = ocr.DPI_OCR
+        try:
+            medicion['fija'] = _medir_extractor(ruta, paginas, repeticiones)
+        finally:
+            ocr.DPI_OCR_INICIAL = dpi_inicial
+    if legado:
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            paginas_ocr = _extraer_legado(ruta)
+            tiempos.append(time.perf_counter() - inicio)
+        medicion['legado'] = {
+            'paginas_ocr': paginas_ocr,
+            'segundos': min(tiempos),
+            'segundos_por_pagina': min(tiempos) / paginas
+        }
+    return medicion
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', type=int, default=5)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--legado', action='store_true', help='medir también el extractor PyPDF2 anterior')
+    parser.add_argument('--fija', action='store_true', help='medir también el OCR siempre a DPI_OCR')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for tipo in ('texto', 'escaneado', 'mixto'):
+            ruta = os.path.join(directorio, f'{tipo}.pdf')
+            generar_pdf(ruta, tipo, args.paginas)
+            resultados[tipo] = medir(ruta, args.paginas, args.repeticiones, args.legado, args.fija)
+
+    print(f"{'tipo':<15} {'págs':>5} {'texto':>6} {'ocr':>5} {'s/página':>10} {'legado s/pág':>13} "
+          f"{'MB/pág OCR':>11} {'s OCR/pág':>10} {'re-render':>10}")
+    for tipo, r in resultados.items():
+        legado = f"{r['legado']['segundos_por_pagina']:.4f}" if 'legado' in r else '-'
+        for nombre, m in ((tipo, r), (f"{tipo} fija", r.get('fija'))):
+            if m is None:
+                continue
+            print(f"{nombre:<15} {m['paginas']:>5} {m['paginas_texto']:>6} {m['paginas_ocr']:>5} "
+                  f"{m['segundos_por_pagina']:>10.4f} {legado if m is r else '-':>13} "
+                  f"{m['bytes_por_pagina_ocr'] / (1024 * 1024):>11.2f} {m['segundos_ocr_por_pagina']:>10.4f} "
+                  f"{m['rerenderizadas']:>10}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2)
+
+if __name__ == '__main__':
+    main()
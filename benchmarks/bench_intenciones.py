@@ -0,0 +1,128 @@
+"""
+Microbenchmark del motor de intenciones: mensajes por segundo de MotorIntenciones.detectar con
+intenciones.json y con catálogos sintéticos de cientos de preguntas frecuentes, para comprobar
+que el costo por mensaje no crece con el número de preguntas (solo con las frases que de verdad
+aparecen en el mensaje, que se reportan aparte). Como referencia se mide también la cadena de
+`in` anterior (solo conoce las intenciones originales).
+
+Uso:
+    python benchmarks/bench_intenciones.py --preguntas 10,100,500 [--mensajes 20000] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas.configuracion import INTENCIONES_PATH  # noqa: E402
+from epas.intenciones import MotorIntenciones  # noqa: E402
+
+PALABRAS = [
+    'aprendiz', 'contrato', 'aprendizaje', 'empresa', 'patrocinio', 'bitacora', 'instructor', 'seguimiento',
+    'evaluacion', 'certificacion', 'titulo', 'ficha', 'programa', 'formacion', 'pasantia', 'proyecto',
+    'vinculacion', 'monitoria', 'apoyo', 'sostenimiento', 'arl', 'eps', 'novedad', 'aplazamiento', 'retiro',
+    'cancelacion', 'traslado', 'reintegro', 'plan', 'mejoramiento', 'comite', 'sancion', 'reglamento',
+    'juicio', 'competencia', 'resultado', 'horario', 'jornada', 'sede', 'centro', 'regional', 'plataforma',
+]
+RELLENO = ['como', 'puedo', 'el', 'la', 'de', 'mi', 'para', 'que', 'es', 'hacer', 'quiero', 'saber', 'sobre']
+SILABAS = ['ca', 'me', 'ti', 'lo', 'ru', 'sa', 'ne', 'po', 'di', 'ga', 'ver', 'con', 'tra', 'mien', 'cion']
+
+def vocabulario(tamano: int, azar: random.Random) -> List[str]:
+    """Términos del reglamento más palabras inventadas: cada tema del reglamento trae su vocabulario"""
+    palabras = set(PALABRAS)
+    while len(palabras) < tamano:
+        palabras.add("".join(azar.choice(SILABAS) for _ in range(azar.randint(2, 4))))
+    return sorted(palabras)
+
+def detectar_legado(texto: str) -> str:
+    """Detección anterior, copiada tal cual: cadena de `in` sobre el texto en minúsculas"""
+    texto = texto.lower().strip()
+    saludos = ['hola', 'hi', 'buenos días', 'buenas tardes', 'buenas noches']
+    if any(s in texto for s in saludos):
+        return 'saludo'
+    if 'documento' in texto or 'requisito' in texto or 'necesito' in texto:
+        return 'documentos'
+    if 'fecha' in texto or 'cuándo' in texto or 'día' in texto:
+        return 'fechas'
+    if 'hora' in texto or 'dura' in texto or 'tiempo' in texto:
+        return 'horas'
+    if 'ayuda' in texto or 'pregunta' in texto or 'frecuente' in texto:
+        return 'ayuda'
+    if any(palabra in texto for palabra in ['estado', 'documento', 'cedula', 'cédula', 'identificación']):
+        return 'consulta'
+    return 'desconocido'
+
+def catalogo_sintetico(base: dict, preguntas: int, palabras: List[str], azar: random.Random) -> dict:
+    """intenciones.json más `preguntas` preguntas inventadas, cada una con 3 a 6 frases de 1 a 3 palabras"""
+    datos = json.loads(json.dumps(base))
+    for n in range(preguntas):
+        frases = {}
+        for _ in range(azar.randint(3, 6)):
+            frases[" ".join(azar.sample(palabras, azar.randint(1, 3)))] = azar.choice([1, 1.5, 2])
+        datos['preguntas_frecuentes'].append({
+            'clave': f'sintetica_{n}', 'pregunta': f'Pregunta sintética {n}', 'respuesta': '...', 'frases': frases
+        })
+    return datos
+
+def mensajes_sinteticos(cantidad: int, palabras: List[str], azar: random.Random) -> List[str]:
+    """Mensajes de 3 a 12 palabras mezclando términos del reglamento y relleno"""
+    return [
+        " ".join(azar.choice(palabras if azar.random() < 0.4 else RELLENO) for _ in range(azar.randint(3, 12)))
+        for _ in range(cantidad)
+    ]
+
+def medir(detectar: Callable[[str], str], mensajes: List[str], repeticiones: int) -> float:
+    """Mejor tasa de mensajes por segundo entre las repeticiones"""
+    mejor = 0.0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for mensaje in mensajes:
+            detectar(mensaje)
+        mejor = max(mejor, len(mensajes) / (time.perf_counter() - inicio))
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preguntas', default='10,100,500', help='preguntas sintéticas agregadas, separadas por comas')
+    parser.add_argument('--mensajes', type=int, default=20000)
+    parser.add_argument('--vocabulario', type=int, default=3000, help='palabras distintas en preguntas y mensajes')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    azar = random.Random(args.semilla)
+    with open(INTENCIONES_PATH, encoding='utf-8') as file:
+        base = json.load(file)
+    palabras = vocabulario(args.vocabulario, azar)
+    mensajes = mensajes_sinteticos(args.mensajes, palabras, azar)
+
+    resultados = {'legado': {'preguntas': len(base['preguntas_frecuentes']),
+                             'mensajes_por_segundo': medir(detectar_legado, mensajes, args.repeticiones)}}
+    for preguntas in [0] + [int(p) for p in args.preguntas.split(',')]:
+        inicio = time.perf_counter()
+        motor = MotorIntenciones(catalogo_sintetico(base, preguntas, palabras, azar))
+        carga = time.perf_counter() - inicio
+        coincidencias = sum(len(motor._puntajes(m)) for m in mensajes) / len(mensajes)
+        resultados[f'motor_{preguntas}'] = {
+            'preguntas': len(motor.preguntas),
+            'frases': motor._automata.frases,
+            'segundos_carga': round(carga, 4),
+            'intenciones_por_mensaje': round(coincidencias, 2),
+            'mensajes_por_segundo': medir(motor.detectar, mensajes, args.repeticiones),
+        }
+
+    print(f"{'detector':<14} {'preguntas':>9} {'frases':>7} {'carga s':>8} {'intenc./msj':>11} {'mensajes/s':>11}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<14} {r['preguntas']:>9} {r.get('frases', '-'):>7} {r.get('segundos_carga', '-'):>8} "
+              f"{r.get('intenciones_por_mensaje', '-'):>11} {r['mensajes_por_segundo']:>11.0f}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2)
+
+if __name__ == '__main__':
+    main()
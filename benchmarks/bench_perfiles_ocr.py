@@ -0,0 +1,100 @@
+"""
+Benchmark de los perfiles de OCR por tipo de documento: extrae el corpus sintético (cédulas
+escaneadas, actas mixtas, evaluaciones grandes) con el OCR genérico de página completa y con los
+perfiles, y reporta por tipo las páginas escaneadas, las reconocidas, las que la detección dio por
+en blanco, los megapíxeles que pasaron por EasyOCR, el tiempo y cuántos documentos siguen dejando
+leer una cédula del roster (para comprobar que la reducción del OCR no pierde cédulas).
+
+Uso:
+    python benchmarks/bench_perfiles_ocr.py --aprendices 20 [--perfiles perfiles_ocr.json] [--salida resultados.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas import configuracion, extraccion, ocr, texto  # noqa: E402
+from corpus_sintetico import TIPOS_DOCUMENTO, generar_corpus  # noqa: E402
+
+def cedulas_roster(ruta_database: str) -> List[str]:
+    """Números de documento de database.txt"""
+    with open(ruta_database, encoding='utf-8') as file:
+        next(file)
+        return [linea.split('|')[1] for linea in file if linea.strip()]
+
+def extraer_tipo(directorio: str, doc_type: str, perfil: Optional[ocr.PerfilOCR], cedulas: List[str]) -> dict:
+    """
+    Extrae todos los PDF de un tipo sin caché, con `perfil` como en una consulta; trabajo de OCR,
+    documentos con una cédula legible y los que quedaron con páginas pendientes para la ingesta
+    """
+    control = ocr.ControlOCR()
+    escaneadas = con_cedula = parciales = 0
+    rutas = sorted(glob.glob(os.path.join(directorio, 'documentos', doc_type, '*.pdf')))
+    inicio = time.perf_counter()
+    for ruta in rutas:
+        paginas, completo = extraccion._extraer_paginas(ruta, control, perfil=perfil)
+        parciales += not completo
+        escaneadas += sum(1 for p in paginas if p.metodo != 'texto')
+        digitos = texto.proyeccion_digitos(" ".join(p.texto_normalizado for p in paginas))
+        con_cedula += any(cedula in digitos for cedula in cedulas)
+    return {
+        'archivos': len(rutas),
+        'paginas_escaneadas': escaneadas,
+        'paginas_ocr': control.paginas_ocr,
+        'vacias': control.vacias,
+        'mpx': round(control.pixeles_ocr / 1e6, 1),
+        'segundos': round(time.perf_counter() - inicio, 2),
+        'con_cedula': con_cedula,
+        'parciales': parciales,
+    }
+
+def medir(directorio: str, perfiles: Dict[str, ocr.PerfilOCR], cedulas: List[str]) -> dict:
+    """Extrae el corpus con `perfiles` (vacío: OCR genérico) y agrega los respaldos de cada tipo"""
+    ocr.uso_perfiles_ocr = ocr.UsoPerfilesOCR()
+    resultados = {
+        doc_type: extraer_tipo(directorio, doc_type, perfiles.get(doc_type), cedulas) for doc_type in TIPOS_DOCUMENTO
+    }
+    for doc_type, uso in ocr.uso_perfiles_ocr.estadisticas().items():
+        resultados[doc_type]['respaldos'] = uso['respaldos']
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aprendices', type=int, default=20)
+    parser.add_argument('--paginas-grande', type=int, default=30, help='páginas de las evaluaciones grandes')
+    parser.add_argument('--perfiles', default=configuracion.PERFILES_OCR_PATH, help='JSON con perfiles que reemplazan a los predeterminados')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    perfiles = ocr.cargar_perfiles_ocr(args.perfiles)
+    with tempfile.TemporaryDirectory() as directorio:
+        corpus = generar_corpus(directorio, args.aprendices, args.semilla, args.paginas_grande)
+        cedulas = cedulas_roster(os.path.join(directorio, 'database.txt'))
+        ocr.obtener_lector()
+        resultados = {
+            'corpus': corpus,
+            'perfiles': {tipo: perfil.describir() for tipo, perfil in perfiles.items()},
+            'generico': medir(directorio, {}, cedulas),
+            'perfiles_ocr': medir(directorio, perfiles, cedulas),
+        }
+
+    print(f"{'tipo':<13} {'modo':<9} {'archivos':>8} {'escaneadas':>10} {'OCR':>5} {'en blanco':>9} "
+          f"{'Mpx':>7} {'s':>7} {'respaldos':>9} {'con cédula':>10} {'parciales':>9}")
+    for doc_type in TIPOS_DOCUMENTO:
+        for modo, nombre in (('generico', 'genérico'), ('perfiles_ocr', 'perfil')):
+            r = resultados[modo][doc_type]
+            print(f"{doc_type:<13} {nombre:<9} {r['archivos']:>8} {r['paginas_escaneadas']:>10} {r['paginas_ocr']:>5} "
+                  f"{r['vacias']:>9} {r['mpx']:>7} {r['segundos']:>7} {r.get('respaldos', '-'):>9} {r['con_cedula']:>10} {r['parciales']:>9}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
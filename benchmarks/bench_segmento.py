@@ -0,0 +1,149 @@
+"""
+Benchmark del segmento compartido del corpus: varios procesos (como los workers del servidor)
+buscan cédulas en el texto de miles de documentos. En modo `copia` cada proceso carga el texto y
+los dígitos de todos los documentos en su propia memoria (como hacía el índice con sus
+proyecciones); en modo `segmento` lo busca directamente sobre el archivo mapeado. Se mide, por
+proceso, la memoria privada (RssAnon) y la compartida con el page cache (RssFile), el tiempo de
+carga, el de recorrer todos los documentos por cédula (lo que hace el índice con cédulas de menos
+de 8 dígitos) y el de verificar los pocos candidatos que dejan los n-gramas (el caso habitual).
+
+Uso:
+    python benchmarks/bench_segmento.py --documentos 5000 --workers 4 [--consultas 50] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas.cache import DocumentoExtraido  # noqa: E402
+from epas.configuracion import CORPUS_COMPACTAR_FRACCION  # noqa: E402
+from epas.segmento import SegmentoCorpus  # noqa: E402
+from epas.texto import normalize_text, proyeccion_digitos  # noqa: E402
+from corpus_sintetico import RELLENO, generar_roster  # noqa: E402
+
+def memoria_proceso() -> dict:
+    """RssAnon y RssFile del proceso actual en MB (Linux)"""
+    memoria = {}
+    with open('/proc/self/status', encoding='utf-8') as file:
+        for linea in file:
+            if linea.startswith(('RssAnon:', 'RssFile:')):
+                clave, valor = linea.split(':')
+                memoria[clave] = round(int(valor.split()[0]) / 1024, 1)
+    return memoria
+
+def generar_segmento(ruta: str, documentos: int, paginas: int, azar: random.Random) -> list:
+    """Segmento con documentos sintéticos de `paginas` páginas de relleno; devuelve las cédulas usadas"""
+    segmento = SegmentoCorpus(ruta, CORPUS_COMPACTAR_FRACCION)
+    roster = generar_roster(documentos, azar)
+    for i, aprendiz in enumerate(roster):
+        lineas = [
+            "SERVICIO NACIONAL DE APRENDIZAJE SENA",
+            f"Aprendiz: {aprendiz['nombres']} {aprendiz['apellido1']} {aprendiz['apellido2']}",
+            f"Documento de identidad {aprendiz['tipo_documento']} {aprendiz['documento']}",
+        ] + [azar.choice(RELLENO) for _ in range(40 * paginas)]
+        norm_text = normalize_text("\n".join(lineas))
+        documento = DocumentoExtraido(
+            f'/corpus/{i}.pdf', [], norm_text, proyeccion_digitos(norm_text), False, 0.0,
+            conteo_paginas=(paginas, 0)
+        )
+        segmento.guardar((i, 1), documento)
+    return [(i, a['documento']) for i, a in enumerate(roster)]
+
+def trabajador(modo: str, ruta: str, consultas: list) -> dict:
+    """Carga el corpus según el modo y busca cada cédula en todos los documentos"""
+    base = memoria_proceso()
+    segmento = SegmentoCorpus(ruta, CORPUS_COMPACTAR_FRACCION)
+    inicio = time.perf_counter()
+    rutas = segmento.rutas()
+    cedulas = [cedula for _, cedula in consultas]
+    if modo == 'copia':
+        textos = {r: segmento.documento(r) for r in rutas}
+    carga = time.perf_counter() - inicio
+
+    def buscar(cedula: str, candidatos: list) -> int:
+        if modo == 'copia':
+            return sum(1 for r in candidatos if cedula in textos[r].digitos)
+        return len(segmento.filtrar_digitos(candidatos, [cedula.encode('ascii')]))
+
+    inicio = time.perf_counter()
+    encontrados = sum(buscar(cedula, rutas) for cedula in cedulas)
+    busqueda = time.perf_counter() - inicio
+
+    # Candidatos de los n-gramas: el documento de la cédula y dos más
+    azar = random.Random(len(cedulas))
+    candidatos = [[f'/corpus/{i}.pdf'] + azar.sample(rutas, 2) for i, _ in consultas]
+    inicio = time.perf_counter()
+    for _ in range(100):
+        for cedula, lista in zip(cedulas, candidatos):
+            buscar(cedula, lista)
+    verificacion = time.perf_counter() - inicio
+
+    memoria = memoria_proceso()
+    return {
+        'modo': modo,
+        'segundos_carga': round(carga, 3),
+        'ms_por_consulta': round(busqueda / len(cedulas) * 1000, 2),
+        'us_por_verificacion': round(verificacion / (100 * len(cedulas)) * 1e6, 2),
+        'encontrados': encontrados,
+        'mb_privados': round(memoria['RssAnon'] - base['RssAnon'], 1),
+        'mb_compartidos': round(memoria['RssFile'] - base['RssFile'], 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documentos', type=int, default=5000)
+    parser.add_argument('--paginas', type=int, default=3, help='páginas de relleno por documento')
+    parser.add_argument('--workers', type=int, default=4, help='procesos que buscan a la vez')
+    parser.add_argument('--consultas', type=int, default=50)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--trabajador', nargs=2, metavar=('MODO', 'SEGMENTO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trabajador:
+        cedulas = json.loads(sys.stdin.read())
+        print(json.dumps(trabajador(*args.trabajador, cedulas)))
+        return
+
+    azar = random.Random(args.semilla)
+    resultados = {'documentos': args.documentos, 'workers': args.workers, 'modos': {}}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'corpus_texto.seg')
+        cedulas = generar_segmento(ruta, args.documentos, args.paginas, azar)
+        resultados['mb_segmento'] = round(os.path.getsize(ruta) / (1024 * 1024), 1)
+        consultas = json.dumps(azar.sample(cedulas, min(args.consultas, len(cedulas))))
+
+        for modo in ('copia', 'segmento'):
+            procesos = [
+                subprocess.Popen([sys.executable, __file__, '--trabajador', modo, ruta],
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                for _ in range(args.workers)
+            ]
+            salidas = [json.loads(p.communicate(consultas)[0].strip().splitlines()[-1]) for p in procesos]
+            resultados['modos'][modo] = {
+                'mb_privados_total': round(sum(s['mb_privados'] for s in salidas), 1),
+                'mb_compartidos_por_worker': max(s['mb_compartidos'] for s in salidas),
+                'segundos_carga': max(s['segundos_carga'] for s in salidas),
+                'ms_por_consulta': max(s['ms_por_consulta'] for s in salidas),
+                'us_por_verificacion': max(s['us_por_verificacion'] for s in salidas),
+                'encontrados': salidas[0]['encontrados'],
+            }
+
+    print(f"segmento de {resultados['mb_segmento']} MB con {args.documentos} documentos, {args.workers} workers")
+    print(f"{'modo':<10} {'MB privados':>12} {'MB compartidos':>15} {'carga s':>8} {'ms/recorrido':>13} "
+          f"{'µs/verificación':>16} {'encontrados':>12}")
+    for modo, r in resultados['modos'].items():
+        print(f"{modo:<10} {r['mb_privados_total']:>12} {r['mb_compartidos_por_worker']:>15} "
+              f"{r['segundos_carga']:>8} {r['ms_por_consulta']:>13} {r['us_por_verificacion']:>16} {r['encontrados']:>12}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark del servicio de OCR por lotes: varios hilos (como consultas concurrentes) envían páginas
+escaneadas al mismo ServicioOCR y se mide el throughput en páginas por segundo y el llenado medio
+de los lotes, para cada tamaño máximo de lote. Con --lotes 1 el servicio equivale a reconocer una
+página a la vez con el lector compartido.
+
+Uso:
+    python benchmarks/bench_servicio_ocr.py --hilos 4 --paginas 3 --lotes 1,2,4,8 [--espera 0.05] [--salida resultados.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas.configuracion import DPI_OCR_INICIAL, OCR_LOTE_ESPERA  # noqa: E402
+from epas.ocr import ServicioOCR, obtener_lector, renderizar_gris  # noqa: E402
+from corpus_sintetico import generar_pdf  # noqa: E402
+
+def renderizar(ruta: str) -> list:
+    """Páginas del PDF en escala de grises a DPI_OCR_INICIAL, copiadas para sobrevivir al pixmap"""
+    with fitz.open(ruta) as doc:
+        return [renderizar_gris(page, DPI_OCR_INICIAL)[1].copy() for page in doc]
+
+def medir(imagenes: list, hilos: int, lote_max: int, espera: float) -> dict:
+    """Cada hilo reconoce todas las páginas a través del mismo servicio"""
+    servicio = ServicioOCR(lote_max, espera)
+    servicio.reconocer(imagenes[0])  # arranca el hilo y descarta el primer lote del conteo
+    servicio.lotes = servicio.paginas = 0
+    servicio.segundos_ocupado = 0.0
+
+    def enviar():
+        for imagen in imagenes:
+            servicio.reconocer(imagen)
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=enviar) for _ in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    segundos = time.perf_counter() - inicio
+    estadisticas = servicio.estadisticas()
+    return {
+        'lote_max': lote_max,
+        'paginas': hilos * len(imagenes),
+        'segundos': round(segundos, 3),
+        'paginas_por_segundo': round(hilos * len(imagenes) / segundos, 2),
+        'lotes': estadisticas['lotes'],
+        'llenado_lote': estadisticas['llenado_lote'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hilos', type=int, default=4, help='consultas concurrentes')
+    parser.add_argument('--paginas', type=int, default=3, help='páginas escaneadas por consulta')
+    parser.add_argument('--lotes', default='1,2,4,8', help='tamaños máximos de lote a medir, separados por comas')
+    parser.add_argument('--espera', type=float, default=OCR_LOTE_ESPERA, help='espera máxima para llenar un lote')
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'escaneado.pdf')
+        generar_pdf(ruta, 'escaneado', args.paginas, rng=np.random.default_rng(42))
+        imagenes = renderizar(ruta)
+
+    obtener_lector()
+    resultados = [medir(imagenes, args.hilos, int(lote), args.espera) for lote in args.lotes.split(',')]
+
+    print(f"{'lote máx':>8} {'páginas':>8} {'s':>8} {'págs/s':>8} {'lotes':>6} {'llenado':>8}")
+    for r in resultados:
+        print(f"{r['lote_max']:>8} {r['paginas']:>8} {r['segundos']:>8.2f} {r['paginas_por_segundo']:>8.2f} "
+              f"{r['lotes']:>6} {r['llenado_lote']:>8.0%}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump({'hilos': args.hilos, 'espera': args.espera, 'resultados': resultados}, file, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Suite de benchmarks sobre un corpus sintético reproducible (ver corpus_sintetico.py), a varios
+tamaños de roster/corpus. Mide load_database, extract_text_from_pdf (en frío por forma de PDF y
+desde caché), search_in_pdf, check_documents (índice frío, índice caliente y consulta repetida)
+y /procesar de punta a punta con el cliente de pruebas de Flask.
+
+Uso:
+    python benchmarks/bench_suite.py --tamanos 10,50 --salida actual.json
+    python benchmarks/bench_suite.py --tamanos 10,50 --comparar base.json [--tolerancia 0.2]
+
+Con --comparar, las métricas cuya mediana empeora más que la tolerancia (y más que --minimo
+segundos, para ignorar ruido en mediciones de microsegundos) se reportan como regresiones y
+el comando termina con código 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import web_app  # noqa: E402
+from epas import aprendices, cache, configuracion, extraccion, indice, segmento, verificacion  # noqa: E402
+from corpus_sintetico import generar_corpus  # noqa: E402
+
+def cronometrar(funcion: Callable[[], object], repeticiones: int) -> Dict[str, float]:
+    """Ejecuta `funcion` varias veces y resume los tiempos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir(tiempos)
+
+def resumir(tiempos: List[float]) -> Dict[str, float]:
+    return {
+        'mediana': statistics.median(tiempos),
+        'minimo': min(tiempos),
+        'media': statistics.fmean(tiempos),
+        'n': len(tiempos),
+    }
+
+def preparar_entorno(directorio: str):
+    """Apunta la configuración y los componentes de epas al corpus sintético, con caché de extracción, segmento del corpus, índice y roster nuevos"""
+    configuracion.DATABASE_PATH = os.path.join(directorio, 'database.txt')
+    configuracion.DOCUMENTOS_PATH = os.path.join(directorio, 'documentos')
+    cache.cache_extraccion = cache.CacheExtraccion(os.path.join(directorio, 'cache_extraccion.sqlite3'))
+    segmento.segmento_corpus = segmento.SegmentoCorpus(os.path.join(directorio, 'corpus_texto.seg'),
+                                                       configuracion.CORPUS_COMPACTAR_FRACCION)
+    aprendices.roster_aprendices = aprendices.RosterAprendices(configuracion.DATABASE_PATH, configuracion.INTERVALO_RECARGA_DATABASE)
+    reiniciar_indice()
+
+def reiniciar_indice():
+    indice.indice_corpus = indice.IndiceCorpus(configuracion.TIPOS_DOCUMENTO)
+    indice.cache_resultados = indice.CacheResultados(indice.indice_corpus, configuracion.CACHE_RESULTADOS_MAX)
+
+def _muestra_por_forma(directorio: str) -> Dict[str, str]:
+    """Un PDF representativo de cada forma del corpus (texto, escaneado, mixto, grande)"""
+    documentos = os.path.join(directorio, 'documentos')
+    muestra = {'escaneado': os.path.join(documentos, 'cedulas', sorted(os.listdir(os.path.join(documentos, 'cedulas')))[0])}
+    for doc_type in ('actas', 'evaluaciones'):
+        for nombre in sorted(os.listdir(os.path.join(documentos, doc_type))):
+            ruta = os.path.join(documentos, doc_type, nombre)
+            with fitz.open(ruta) as pdf:
+                paginas = pdf.page_count
+                con_imagen = bool(pdf[paginas - 1].get_images())
+            forma = 'grande' if paginas > 5 else ('mixto' if con_imagen else 'texto')
+            muestra.setdefault(forma, ruta)
+    return muestra
+
+def medir_tamano(tamano: int, semilla: int, repeticiones: int, consultas: int) -> dict:
+    """Genera el corpus de un tamaño y mide cada etapa"""
+    with tempfile.TemporaryDirectory() as directorio:
+        inicio = time.perf_counter()
+        corpus = generar_corpus(directorio, tamano, semilla)
+        corpus['segundos_generacion'] = round(time.perf_counter() - inicio, 2)
+        preparar_entorno(directorio)
+        metricas = {}
+
+        def cargar_roster():
+            aprendices.roster_aprendices = aprendices.RosterAprendices(configuracion.DATABASE_PATH, configuracion.INTERVALO_RECARGA_DATABASE)
+            return aprendices.load_database()
+        metricas['load_database'] = cronometrar(cargar_roster, repeticiones)
+        database = aprendices.load_database()
+        azar = random.Random(semilla)
+        estudiantes = azar.sample([e for _, e in database.items()], min(consultas, len(database)))
+
+        for forma, ruta in sorted(_muestra_por_forma(directorio).items()):
+            def extraer_en_frio(ruta=ruta):
+                cache.cache_extraccion.invalidar(ruta)
+                return extraccion.extract_text_from_pdf(ruta)
+            metricas[f'extract_text_from_pdf.{forma}'] = cronometrar(extraer_en_frio, repeticiones)
+            metricas[f'extract_text_from_pdf.cache.{forma}'] = cronometrar(
+                lambda ruta=ruta: extraccion.extract_text_from_pdf(ruta), repeticiones
+            )
+
+        # A partir de aquí todo el corpus ya está en la caché de extracción
+        for doc_type in configuracion.TIPOS_DOCUMENTO:
+            indice.indice_corpus.actualizar(doc_type, os.path.join(configuracion.DOCUMENTOS_PATH, doc_type))
+        archivos = sorted(
+            os.path.join(configuracion.DOCUMENTOS_PATH, t, f)
+            for t in configuracion.TIPOS_DOCUMENTO for f in os.listdir(os.path.join(configuracion.DOCUMENTOS_PATH, t))
+        )
+        pares = [(e, azar.choice(archivos)) for e in estudiantes]
+        tiempos = []
+        for estudiante, ruta in pares:
+            inicio = time.perf_counter()
+            extraccion.search_in_pdf(ruta, estudiante.documento, estudiante.nombre_completo)
+            tiempos.append(time.perf_counter() - inicio)
+        metricas['search_in_pdf'] = resumir(tiempos)
+
+        def series_check(antes: Callable[[], None]) -> Dict[str, float]:
+            tiempos = []
+            for estudiante in estudiantes:
+                antes()
+                inicio = time.perf_counter()
+                verificacion.check_documents(estudiante.documento, estudiante.nombre_completo)
+                tiempos.append(time.perf_counter() - inicio)
+            return resumir(tiempos)
+
+        metricas['check_documents.indice_frio'] = series_check(reiniciar_indice)
+        metricas['check_documents.indice_caliente'] = series_check(
+            lambda: setattr(indice, 'cache_resultados', indice.CacheResultados(indice.indice_corpus, configuracion.CACHE_RESULTADOS_MAX))
+        )
+        metricas['check_documents.repetida'] = series_check(lambda: None)
+
+        indice.cache_resultados = indice.CacheResultados(indice.indice_corpus, configuracion.CACHE_RESULTADOS_MAX)
+        cliente = web_app.app.test_client()
+        tiempos = []
+        for estudiante in estudiantes:
+            inicio = time.perf_counter()
+            respuesta = cliente.post('/procesar', json={
+                'estado': web_app.ESTADOS['SOLICITAR_CEDULA'], 'mensaje': estudiante.documento, 'contexto': {}
+            })
+            tiempos.append(time.perf_counter() - inicio)
+            assert respuesta.status_code == 200, respuesta.status_code
+        metricas['procesar'] = resumir(tiempos)
+
+        return {'corpus': corpus, 'metricas': metricas}
+
+def comparar(actual: dict, base: dict, tolerancia: float, minimo: float) -> List[str]:
+    """Compara las medianas con una línea base; devuelve las regresiones encontradas"""
+    regresiones = []
+    for tamano, resultado in actual['tamanos'].items():
+        anteriores = base.get('tamanos', {}).get(tamano)
+        if not anteriores:
+            print(f"(sin línea base para {tamano} aprendices)")
+            continue
+        for nombre, medicion in resultado['metricas'].items():
+            previa = anteriores['metricas'].get(nombre)
+            if not previa:
+                continue
+            antes, ahora = previa['mediana'], medicion['mediana']
+            cambio = (ahora - antes) / antes if antes else 0.0
+            linea = f"{tamano:>6} {nombre:<40} {antes:>10.4f} {ahora:>10.4f} {cambio:>+8.1%}"
+            if cambio > tolerancia and ahora - antes > minimo:
+                regresiones.append(linea)
+                linea += "  ⚠️ REGRESIÓN"
+            elif cambio < -tolerancia and antes - ahora > minimo:
+                linea += "  ✅ mejora"
+            print(linea)
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', default='10,50', help='aprendices del roster por corrida, separados por comas')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--consultas', type=int, default=10, help='aprendices consultados por medición')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior contra el cual buscar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='empeoramiento relativo admitido (0.2 = 20%%)')
+    parser.add_argument('--minimo', type=float, default=0.001, help='diferencia absoluta mínima en segundos')
+    parser.add_argument('--detalle', action='store_true', help='mostrar los avisos de extracción de web_app')
+    args = parser.parse_args()
+
+    resultados = {
+        'entorno': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'ocr_procesos': configuracion.OCR_PROCESOS,
+        },
+        'parametros': {'repeticiones': args.repeticiones, 'consultas': args.consultas, 'semilla': args.semilla},
+        'tamanos': {},
+    }
+    with open(os.devnull, 'w') as silencio:
+        for tamano in (int(t) for t in args.tamanos.split(',')):
+            print(f"⏱️ Midiendo con {tamano} aprendices...", file=sys.stderr)
+            if args.detalle:
+                resultados['tamanos'][str(tamano)] = medir_tamano(tamano, args.semilla, args.repeticiones, args.consultas)
+            else:
+                with redirect_stdout(silencio):
+                    resultados['tamanos'][str(tamano)] = medir_tamano(tamano, args.semilla, args.repeticiones, args.consultas)
+
+    print(f"{'tamaño':>6} {'métrica':<40} {'mediana s':>10} {'mínimo s':>10}")
+    for tamano, resultado in resultados['tamanos'].items():
+        for nombre, medicion in resultado['metricas'].items():
+            print(f"{tamano:>6} {nombre:<40} {medicion['mediana']:>10.4f} {medicion['minimo']:>10.4f}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(resultados, file, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as file:
+            base = json.load(file)
+        print(f"\n{'tamaño':>6} {'métrica':<40} {'base s':>10} {'actual s':>10} {'cambio':>8}")
+        regresiones = comparar(resultados, base, args.tolerancia, args.minimo)
+        if regresiones:
+            print(f"\n⚠️ {len(regresiones)} regresión(es) por encima de {args.tolerancia:.0%}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Generador reproducible de un corpus sintético de documentos SENA para los benchmarks:
+un database.txt con aprendices inventados y, en documentos/, sus cédulas escaneadas
+(imagen con ruido y rotación), actas F-023 (con capa de texto o mixtas) y evaluaciones
+(algunas grandes, de muchas páginas). La misma semilla produce exactamente los mismos archivos.
+
+Uso:
+    python benchmarks/corpus_sintetico.py DIRECTORIO --aprendices 50 [--semilla 42]
+"""
+import argparse
+import io
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+# Sin la extensión C de reportlab, codificar imágenes en ASCII85 domina el tiempo de generación
+rl_config.useA85 = 0
+
+TIPOS_DOCUMENTO = ['cedulas', 'actas', 'evaluaciones']
+ENCABEZADO_DATABASE = "TipoDocumento|NumeroDocumento|Nombres|Apellido1|Apellido2|Ficha|Codigo|VersionPrograma|Programa|NivelFormacion"
+
+NOMBRES = [
+    'NICOLLE ALEJANDRA', 'JULIAN', 'NICOLE VANESSA', 'BELLANIRA', 'BRAHIAN', 'MARIA JOSE', 'JUAN DAVID',
+    'LAURA', 'ANDRES FELIPE', 'VALENTINA', 'CARLOS', 'DANIELA', 'SANTIAGO', 'PAULA ANDREA', 'KEVIN'
+]
+APELLIDOS = [
+    'GONZALEZ', 'RODRIGUEZ', 'ALDANA', 'MAZO', 'AGUIRRE', 'LATORRE', 'ARANGO', 'BERMUDEZ', 'TORRES',
+    'GARCIA', 'MARTINEZ', 'LOPEZ', 'HERNANDEZ', 'RAMIREZ', 'CASTRO', 'VARGAS', 'MORENO', 'ROJAS'
+]
+PROGRAMAS = [
+    ('233108', 'SISTEMAS TELEINFORMÁTICOS', 'TÉCNICO'),
+    ('228118', 'ANÁLISIS Y DESARROLLO DE SOFTWARE', 'TECNÓLOGO'),
+    ('134104', 'GESTIÓN CONTABLE', 'TÉCNICO'),
+]
+RELLENO = [
+    'El aprendiz desarrolla su etapa productiva en la empresa patrocinadora',
+    'Se verifican los resultados de aprendizaje concertados con el instructor',
+    'Las actividades se registran en la bitácora quincenal',
+    'Observaciones del ente coformador sobre el desempeño del aprendiz',
+]
+
+# Misma portada que usaba bench_extraccion.py
+LINEAS = [
+    "SERVICIO NACIONAL DE APRENDIZAJE SENA",
+    "FORMATO F-023 ACTA DE INICIO ETAPA PRODUCTIVA",
+    "Aprendiz: NICOLLE ALEJANDRA GONZALEZ RODRIGUEZ",
+    "Documento de identidad CC 1032508266",
+    "Ficha 2944777 - Sistemas Teleinformaticos",
+]
+
+def _pagina_texto(c: canvas.Canvas, lineas: List[str]):
+    y = 740
+    for linea in lineas:
+        c.drawString(60, y, linea)
+        y -= 22
+    c.showPage()
+
+def _pagina_escaneada(c: canvas.Canvas, lineas: List[str], rng: Optional[np.random.Generator] = None):
+    """Página solo imagen: el texto se dibuja en baja resolución y se amplía, con rotación y ruido"""
+    ancho, alto = letter
+    tamano = (int(ancho * 150 / 72), int(alto * 150 / 72))
+    imagen = Image.new('L', (tamano[0] // 3, tamano[1] // 3), 255)
+    dibujo = ImageDraw.Draw(imagen)
+    for i, linea in enumerate(lineas):
+        dibujo.text((40, 40 + i * 15), linea, fill=0)
+    imagen = imagen.resize(tamano, Image.NEAREST)
+    if rng is not None:
+        imagen = imagen.rotate(float(rng.uniform(-3, 3)), fillcolor=255)
+        pixeles = np.asarray(imagen, dtype=np.int16) + rng.normal(0, 18, (tamano[1], tamano[0])).astype(np.int16)
+        imagen = Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8))
+    # Como un escáner real: JPEG embebido tal cual (reportlab no lo recomprime)
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='JPEG', quality=75)
+    buffer.seek(0)
+    c.drawImage(ImageReader(buffer), 0, 0, ancho, alto)
+    c.showPage()
+
+def generar_pdf(ruta: str, tipo: str, paginas: int, lineas: List[str] = LINEAS,
+                rng: Optional[np.random.Generator] = None):
+    """Genera un PDF 'texto', 'escaneado' o 'mixto' (primera página digitada, resto escaneado)"""
+    c = canvas.Canvas(ruta, pagesize=letter, invariant=1)
+    for numero in range(paginas):
+        if tipo == 'texto' or (tipo == 'mixto' and numero == 0):
+            _pagina_texto(c, lineas)
+        else:
+            _pagina_escaneada(c, lineas, rng)
+    c.save()
+
+def generar_roster(aprendices: int, azar: random.Random) -> List[Dict[str, str]]:
+    """Aprendices inventados con cédulas únicas de 8 a 10 dígitos, repartidos en fichas de 30"""
+    roster = []
+    cedulas = set()
+    for i in range(aprendices):
+        cedula = str(azar.randint(10_000_000, 1_999_999_999))
+        while cedula in cedulas:
+            cedula = str(azar.randint(10_000_000, 1_999_999_999))
+        cedulas.add(cedula)
+        codigo, programa, nivel = PROGRAMAS[(i // 30) % len(PROGRAMAS)]
+        roster.append({
+            'tipo_documento': 'TI' if azar.random() < 0.1 else 'CC',
+            'documento': cedula,
+            'nombres': azar.choice(NOMBRES),
+            'apellido1': azar.choice(APELLIDOS),
+            'apellido2': azar.choice(APELLIDOS),
+            'ficha': str(2944777 + i // 30),
+            'codigo': codigo,
+            'version': '1',
+            'programa': programa,
+            'nivel': nivel,
+        })
+    return roster
+
+def escribir_database(ruta: str, roster: List[Dict[str, str]]):
+    """Escribe el roster con el formato de database.txt"""
+    with open(ruta, 'w', encoding='utf-8') as file:
+        file.write(ENCABEZADO_DATABASE + "\n")
+        for a in roster:
+            file.write("|".join([
+                a['tipo_documento'], a['documento'], a['nombres'], a['apellido1'], a['apellido2'],
+                a['ficha'], a['codigo'], a['version'], a['programa'], a['nivel']
+            ]) + "\n")
+
+def _lineas(titulo: str, aprendiz: Dict[str, str], azar: random.Random, relleno: int) -> List[str]:
+    nombre = f"{aprendiz['nombres']} {aprendiz['apellido1']} {aprendiz['apellido2']}"
+    lineas = [
+        "SERVICIO NACIONAL DE APRENDIZAJE SENA",
+        titulo,
+        f"Aprendiz: {nombre}",
+        f"Documento de identidad {aprendiz['tipo_documento']} {aprendiz['documento']}",
+        f"Ficha {aprendiz['ficha']} - {aprendiz['programa'].title()}",
+    ]
+    return lineas + [azar.choice(RELLENO) for _ in range(relleno)]
+
+def generar_corpus(directorio: str, aprendices: int, semilla: int = 42, paginas_grande: int = 30) -> dict:
+    """
+    Crea database.txt y documentos/{cedulas,actas,evaluaciones} en `directorio`.
+    No todos los aprendices tienen todos sus documentos, y hay algunos PDFs de personas que
+    no están en el roster. Devuelve estadísticas del corpus generado.
+    """
+    azar = random.Random(semilla)
+    rng = np.random.default_rng(semilla)
+    roster = generar_roster(aprendices, azar)
+    escribir_database(os.path.join(directorio, 'database.txt'), roster)
+    for doc_type in TIPOS_DOCUMENTO:
+        os.makedirs(os.path.join(directorio, 'documentos', doc_type), exist_ok=True)
+
+    estadisticas = {
+        'aprendices': aprendices,
+        'archivos': {doc_type: 0 for doc_type in TIPOS_DOCUMENTO},
+        'paginas': 0,
+        'paginas_escaneadas': 0,
+        'por_forma': {'texto': 0, 'escaneado': 0, 'mixto': 0, 'grande': 0},
+    }
+
+    def agregar(doc_type: str, nombre: str, forma: str, paginas: int, lineas: List[str]):
+        ruta = os.path.join(directorio, 'documentos', doc_type, nombre)
+        tipo = 'mixto' if forma == 'grande' else forma
+        generar_pdf(ruta, tipo, paginas, lineas, rng)
+        estadisticas['archivos'][doc_type] += 1
+        estadisticas['paginas'] += paginas
+        estadisticas['paginas_escaneadas'] += paginas if tipo == 'escaneado' else (paginas - 1 if tipo == 'mixto' else 0)
+        estadisticas['por_forma'][forma] += 1
+
+    externos = generar_roster(max(1, aprendices // 10), random.Random(semilla + 1))
+    for i, aprendiz in enumerate(roster + externos):
+        if azar.random() < 0.85:
+            agregar('cedulas', f"cedula_{aprendiz['documento']}.pdf", 'escaneado', 1,
+                    _lineas("REPUBLICA DE COLOMBIA - IDENTIFICACION PERSONAL", aprendiz, azar, 0))
+        if azar.random() < 0.8:
+            forma = 'mixto' if azar.random() < 0.3 else 'texto'
+            agregar('actas', f"F023_{aprendiz['ficha']}_{i:05d}.pdf", forma, 2 if forma == 'texto' else 3,
+                    _lineas("FORMATO F-023 ACTA DE INICIO ETAPA PRODUCTIVA", aprendiz, azar, 4))
+        if azar.random() < 0.75:
+            grande = i % 10 == 0
+            agregar('evaluaciones', f"evaluacion_{i:05d}.pdf", 'grande' if grande else 'texto',
+                    paginas_grande if grande else 1,
+                    _lineas("EVALUACION ETAPA PRODUCTIVA", aprendiz, azar, 6))
+    return estadisticas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directorio')
+    parser.add_argument('--aprendices', type=int, default=50)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--paginas-grande', type=int, default=30)
+    args = parser.parse_args()
+
+    os.makedirs(args.directorio, exist_ok=True)
+    estadisticas = generar_corpus(args.directorio, args.aprendices, args.semilla, args.paginas_grande)
+    print(json.dumps(estadisticas, indent=2))
+
+if __name__ == '__main__':
+    main()
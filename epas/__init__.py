@@ -0,0 +1,9 @@
+"""
+Componentes de EPASBot: configuración, métricas, roster de aprendices, intenciones del chatbot,
+OCR, extracción de PDF con su caché y segmento compartido, índice del corpus, ingesta,
+verificación de documentos y reporte. web_app.py solo expone la aplicación Flask.
+"""
+import time
+
+# Antes de importar los demás módulos, para que el tiempo de arranque incluya cargar fitz, numpy, etc.
+INICIO_PROCESO = time.perf_counter()
@@ -0,0 +1,202 @@
+"""Roster de aprendices (database.txt) en memoria, con índices y recarga automática"""
+import threading
+import time
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from epas.cache import huella_archivo
+from epas.configuracion import DATABASE_PATH, INTERVALO_RECARGA_DATABASE
+from epas.metricas import etapa
+from epas.texto import normalize_text, to_capital_case
+
+class Aprendiz(NamedTuple):
+    """Registro de un aprendiz de database.txt (respaldado por tupla, sin dict por registro)"""
+    tipo_documento: str
+    documento: str
+    nombres: str
+    apellido1: str
+    apellido2: str
+    ficha: str
+    codigo: str
+    version_programa: str
+    programa: str
+    nivel_formacion: str
+
+    @property
+    def nombre_completo(self) -> str:
+        return f"{self.nombres} {self.apellido1} {self.apellido2}"
+
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+class BaseDatosAprendices:
+    """
+    Roster de aprendices en memoria, indexado por documento, código, ficha y tokens normalizados
+    del nombre. Un índice de trigramas sobre el vocabulario de tokens resuelve las búsquedas
+    por subcadena sin recorrer todo el roster.
+    """
+
+    def __init__(self, aprendices: List[Aprendiz]):
+        self._aprendices = aprendices
+        self._por_documento: Dict[str, int] = {}
+        self._por_codigo: Dict[str, array] = {}
+        self._por_ficha: Dict[str, array] = {}
+        self._por_token: Dict[str, array] = {}
+        self._trigramas_vocabulario: Dict[str, List[str]] = {}
+        self._nombres_normalizados: List[str] = []
+
+        for posicion, aprendiz in enumerate(aprendices):
+            self._por_documento[aprendiz.documento] = posicion
+            self._por_codigo.setdefault(aprendiz.codigo, array('I')).append(posicion)
+            self._por_ficha.setdefault(aprendiz.ficha, array('I')).append(posicion)
+            nombre = normalize_text(aprendiz.nombre_completo)
+            self._nombres_normalizados.append(nombre)
+            for token in set(nombre.split()):
+                self._por_token.setdefault(token, array('I')).append(posicion)
+
+        for token in self._por_token:
+            for trigrama in _trigramas(token):
+                self._trigramas_vocabulario.setdefault(trigrama, []).append(token)
+
+    def __len__(self) -> int:
+        return len(self._por_documento)
+
+    def __contains__(self, documento: str) -> bool:
+        return documento in self._por_documento
+
+    def get(self, documento: str, default=None) -> Optional[Aprendiz]:
+        posicion = self._por_documento.get(documento)
+        return default if posicion is None else self._aprendices[posicion]
+
+    def items(self) -> Iterator[Tuple[str, Aprendiz]]:
+        for documento, posicion in self._por_documento.items():
+            yield documento, self._aprendices[posicion]
+
+    def _registros(self, posiciones) -> List[Aprendiz]:
+        return [self._aprendices[p] for p in posiciones]
+
+    def buscar_por_codigo(self, codigo: str) -> List[Aprendiz]:
+        return self._registros(self._por_codigo.get(codigo, ()))
+
+    def buscar_por_ficha(self, ficha: str) -> List[Aprendiz]:
+        return self._registros(self._por_ficha.get(ficha, ()))
+
+    def buscar_por_tokens(self, tokens: List[str]) -> List[Aprendiz]:
+        """Aprendices cuyo nombre normalizado contiene todos los tokens dados"""
+        listas = [self._por_token.get(normalize_text(t), ()) for t in tokens]
+        if not listas or not all(listas):
+            return []
+        listas.sort(key=len)
+        posiciones = set(listas[0])
+        for lista in listas[1:]:
+            posiciones.intersection_update(lista)
+        return self._registros(sorted(posiciones))
+
+    def _tokens_que_contienen(self, fragmento: str) -> List[str]:
+        """Tokens del vocabulario que contienen el fragmento (de al menos 3 caracteres)"""
+        listas = [self._trigramas_vocabulario.get(t, ()) for t in _trigramas(fragmento)]
+        if not all(listas):
+            return []
+        candidatos = set(min(listas, key=len))
+        return [token for token in candidatos if fragmento in token]
+
+    def buscar_por_nombre(self, texto: str) -> List[Aprendiz]:
+        """Aprendices cuyo nombre completo contiene el texto (sin distinguir mayúsculas ni tildes)"""
+        consulta = normalize_text(texto)
+        if not consulta:
+            return []
+        # Cada fragmento sin espacios de la consulta cae dentro de un único token del nombre
+        fragmento = max(consulta.split(), key=len)
+        if len(fragmento) < 3:
+            candidatos = range(len(self._aprendices))
+        else:
+            posiciones = set()
+            for token in self._tokens_que_contienen(fragmento):
+                posiciones.update(self._por_token[token])
+            candidatos = sorted(posiciones)
+        return self._registros(p for p in candidatos if consulta in self._nombres_normalizados[p])
+
+def _parsear_database(path: str) -> List[Aprendiz]:
+    """Lee database.txt (separado por '|') y devuelve sus registros"""
+    aprendices = []
+    # Los valores se repiten mucho (programas, niveles, nombres): se capitalizan una vez y se comparten
+    capitalizados: Dict[str, str] = {}
+
+    def capital(valor: str) -> str:
+        resultado = capitalizados.get(valor)
+        if resultado is None:
+            resultado = capitalizados[valor] = to_capital_case(valor)
+        return resultado
+
+    with open(path, 'r', encoding='utf-8') as file:
+        # Saltar la primera línea de encabezados si existe
+        file.readline()
+
+        for line in file:
+            parts = line.strip().split('|')
+            if len(parts) >= 10:  # Asegurar que tenemos todos los campos
+                aprendices.append(Aprendiz(
+                    tipo_documento=parts[0].strip(),
+                    documento=parts[1].strip(),  # NumeroDocumento es la clave
+                    nombres=capital(parts[2].strip()),
+                    apellido1=capital(parts[3].strip()),
+                    apellido2=capital(parts[4].strip()),
+                    ficha=parts[5].strip(),
+                    codigo=parts[6].strip(),
+                    version_programa=parts[7].strip(),
+                    programa=capital(parts[8].strip()),
+                    nivel_formacion=capital(parts[9].strip())
+                ))
+    return aprendices
+
+class RosterAprendices:
+    """Mantiene database.txt cargado y lo recarga de forma atómica solo si cambian su mtime o tamaño"""
+
+    def __init__(self, path: str, intervalo: float):
+        self.path = path
+        self.intervalo = intervalo
+        self.recargas = 0
+        self._actual: Optional[BaseDatosAprendices] = None
+        self._huella: Optional[Tuple[int, int]] = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self) -> BaseDatosAprendices:
+        """Devuelve el roster vigente; como mucho un stat() del archivo cada `intervalo` segundos"""
+        ahora = time.monotonic()
+        actual = self._actual
+        if actual is not None and ahora - self._ultima_revision < self.intervalo:
+            return actual
+
+        # Mientras otro hilo recarga, las consultas siguen usando el roster vigente
+        if not self._lock.acquire(blocking=actual is None):
+            return actual
+        try:
+            self._ultima_revision = ahora
+            try:
+                huella = huella_archivo(self.path)
+            except OSError:
+                huella = None
+            if self._actual is not None and huella == self._huella:
+                return self._actual
+
+            if huella is None:
+                print(f"⚠️ Archivo de base de datos no encontrado en {self.path}")
+                aprendices = []
+            else:
+                with etapa('roster.carga'):
+                    aprendices = _parsear_database(self.path)
+            # La nueva base se construye completa antes de reemplazar la referencia
+            with etapa('roster.indices'):
+                self._actual = BaseDatosAprendices(aprendices)
+            self._huella = huella
+            self.recargas += 1
+            return self._actual
+        finally:
+            self._lock.release()
+
+roster_aprendices = RosterAprendices(DATABASE_PATH, INTERVALO_RECARGA_DATABASE)
+
+def load_database() -> BaseDatosAprendices:
+    """Devuelve la base de datos de usuarios en memoria (se recarga sola si database.txt cambia)"""
+    return roster_aprendices.obtener()
@@ -0,0 +1,231 @@
+"""Texto extraído de los PDF y su caché persistente en SQLite"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+from epas import configuracion
+
+class PaginaExtraida(NamedTuple):
+    """Texto extraído de una página de un PDF"""
+    numero: int
+    # 'texto' (capa de texto), 'ocr', 'region' (solo la región del perfil de OCR), 'omitida' (en blanco)
+    # o 'pendiente' (OCR aún no realizado)
+    metodo: str
+    texto: str
+    texto_normalizado: str
+
+def huella_archivo(file_path: str) -> Tuple[int, int]:
+    """Devuelve (tamaño, mtime en ns) de un archivo"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+def hash_archivo(file_path: str) -> str:
+    """Calcula el SHA-256 del contenido de un archivo"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for bloque in iter(lambda: file.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+class DocumentoExtraido(NamedTuple):
+    """Texto de un PDF con sus proyecciones (normalizada y solo dígitos) calculadas una vez"""
+    ruta: str
+    paginas: List[PaginaExtraida]
+    texto_normalizado: str
+    digitos: str
+    desde_cache: bool
+    segundos: float
+    completo: bool = True
+    conteo_paginas: Optional[Tuple[int, int]] = None  # (páginas, con OCR) cuando se leyó del segmento sin páginas
+
+    @property
+    def total_paginas(self) -> int:
+        return self.conteo_paginas[0] if self.conteo_paginas else len(self.paginas)
+
+    @property
+    def paginas_ocr(self) -> int:
+        if self.conteo_paginas:
+            return self.conteo_paginas[1]
+        return sum(1 for p in self.paginas if p.metodo == 'ocr')
+
+    def describir(self) -> str:
+        """Resumen legible de cómo se obtuvo el texto, para el registro del proceso"""
+        if self.conteo_paginas:
+            origen = f"texto del segmento compartido, {self.total_paginas} página(s)"
+        elif self.desde_cache:
+            origen = f"texto en caché, {len(self.paginas)} página(s)"
+        else:
+            con_texto = sum(1 for p in self.paginas if p.metodo == 'texto')
+            origen = f"{len(self.paginas)} página(s): {con_texto} con capa de texto, {self.paginas_ocr} con OCR"
+            omitidas = sum(1 for p in self.paginas if p.metodo == 'omitida')
+            if omitidas:
+                origen += f", {omitidas} en blanco"
+        if not self.completo and not self.paginas:
+            origen = "no se pudo leer el PDF; se reintentará"
+        elif not self.completo:
+            pendientes = sum(1 for p in self.paginas if p.metodo in ('pendiente', 'region'))
+            origen += f", OCR parcial ({pendientes} página(s) para la ingesta)"
+        return f"{origen}, {self.segundos:.2f} s"
+
+class CacheExtraccion:
+    """
+    Caché persistente (SQLite) del texto extraído de cada PDF.
+    Las entradas se identifican por ruta + tamaño + mtime + SHA-256, de modo que
+    el OCR de un archivo solo se ejecuta una vez por versión del documento.
+    """
+    # v3: las páginas que el perfil de OCR no leyó quedan 'pendiente' y la extracción, parcial
+    VERSION_ESQUEMA = 3
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.guardados = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 1:
+                # v2 agrega extracciones parciales (OCR detenido al encontrar coincidencia); v1 no tiene perfiles
+                self._conn.execute("ALTER TABLE documentos ADD COLUMN completo INTEGER NOT NULL DEFAULT 1")
+            elif version != self.VERSION_ESQUEMA:
+                self._conn.execute("DROP TABLE IF EXISTS paginas")
+                self._conn.execute("DROP TABLE IF EXISTS documentos")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documentos ("
+                " ruta TEXT PRIMARY KEY, tamano INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL,"
+                " completo INTEGER NOT NULL DEFAULT 1)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS paginas ("
+                " ruta TEXT NOT NULL, numero INTEGER NOT NULL, metodo TEXT NOT NULL,"
+                " texto TEXT NOT NULL, texto_normalizado TEXT NOT NULL,"
+                " PRIMARY KEY (ruta, numero))"
+            )
+            self._conn.execute(f"PRAGMA user_version = {self.VERSION_ESQUEMA}")
+
+    def _eliminar(self, file_path: str):
+        self._conn.execute("DELETE FROM paginas WHERE ruta = ?", (file_path,))
+        self._conn.execute("DELETE FROM documentos WHERE ruta = ?", (file_path,))
+
+    def _leer(self, file_path: str) -> Optional[Tuple[List[PaginaExtraida], bool]]:
+        """Devuelve (páginas, completo) si el archivo no ha cambiado; invalida la entrada si cambió"""
+        try:
+            tamano, mtime_ns = huella_archivo(file_path)
+        except OSError:
+            self.invalidar(file_path)
+            return None
+
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT tamano, mtime_ns, sha256, completo FROM documentos WHERE ruta = ?", (file_path,)
+            ).fetchone()
+
+        if fila and (fila[0], fila[1]) != (tamano, mtime_ns):
+            # Cambió la metadata: solo es un acierto si el contenido es idéntico
+            if fila[0] == tamano and fila[2] == hash_archivo(file_path):
+                with self._lock, self._conn:
+                    self._conn.execute(
+                        "UPDATE documentos SET mtime_ns = ? WHERE ruta = ?", (mtime_ns, file_path)
+                    )
+            else:
+                self.invalidar(file_path)
+                fila = None
+
+        if not fila:
+            return None
+
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT numero, metodo, texto, texto_normalizado FROM paginas"
+                " WHERE ruta = ? ORDER BY numero", (file_path,)
+            ).fetchall()
+        return [PaginaExtraida(*f) for f in filas], bool(fila[3])
+
+    def obtener(self, file_path: str) -> Optional[List[PaginaExtraida]]:
+        """Devuelve las páginas en caché si el archivo no ha cambiado y su extracción está completa, o None"""
+        entrada = self._leer(file_path)
+        if entrada is None or not entrada[1]:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        return entrada[0]
+
+    def obtener_parcial(self, file_path: str) -> List[PaginaExtraida]:
+        """Páginas ya procesadas de una extracción que se detuvo antes de terminar (vacío si no hay)"""
+        entrada = self._leer(file_path)
+        if entrada is None or entrada[1]:
+            return []
+        return entrada[0]
+
+    def guardar(self, file_path: str, huella: Tuple[int, int, str], paginas: List[PaginaExtraida],
+                completo: bool = True):
+        """
+        Guarda las páginas extraídas de un archivo con su huella (tamaño, mtime, sha256).
+        Una extracción parcial guarda solo las páginas procesadas, para retomarla después.
+        """
+        with self._lock, self._conn:
+            self._eliminar(file_path)
+            self._conn.execute(
+                "INSERT INTO documentos (ruta, tamano, mtime_ns, sha256, completo) VALUES (?, ?, ?, ?, ?)",
+                (file_path, *huella, int(completo))
+            )
+            self._conn.executemany(
+                "INSERT INTO paginas (ruta, numero, metodo, texto, texto_normalizado)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(file_path, *p) for p in paginas]
+            )
+            self.guardados += 1
+
+    def invalidar(self, file_path: str):
+        """Elimina la entrada de un archivo borrado o modificado"""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM documentos WHERE ruta = ?", (file_path,)).fetchone():
+                self.invalidaciones += 1
+            self._eliminar(file_path)
+
+    def purgar(self) -> int:
+        """Elimina las entradas de archivos que ya no existen; devuelve cuántas se borraron"""
+        with self._lock:
+            rutas = [r[0] for r in self._conn.execute("SELECT ruta FROM documentos")]
+        borradas = 0
+        for file_path in rutas:
+            if not os.path.exists(file_path):
+                self.invalidar(file_path)
+                borradas += 1
+        return borradas
+
+    def estadisticas(self) -> dict:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            documentos = self._conn.execute("SELECT COUNT(*) FROM documentos").fetchone()[0]
+            paginas = self._conn.execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'invalidaciones': self.invalidaciones,
+            'guardados': self.guardados,
+            'documentos': documentos,
+            'paginas': paginas
+        }
+
+_cache_extraccion_lock = threading.Lock()
+
+def __getattr__(nombre: str):
+    """
+    `cache.cache_extraccion` se abre al primer uso, en configuracion.CACHE_EXTRACCION_PATH de ese
+    momento: importar este módulo (pruebas, benchmarks, el reporte) no crea el archivo SQLite
+    """
+    if nombre != 'cache_extraccion':
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    with _cache_extraccion_lock:
+        if 'cache_extraccion' not in globals():
+            globals()['cache_extraccion'] = CacheExtraccion(configuracion.CACHE_EXTRACCION_PATH)
+    return globals()['cache_extraccion']
@@ -0,0 +1,253 @@
+"""Búsqueda de la cédula y el nombre de un aprendiz en el texto de un documento"""
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from epas.cache import DocumentoExtraido
+from epas.configuracion import DISTANCIA_MAX_CEDULA, LONGITUD_BLOQUE_CEDULA, LONGITUD_MIN_APROXIMADA
+from epas.metricas import etapa
+from epas.texto import (
+    CONFUSIONES_OCR, PATRON_CLAVE_CEDULA, PATRON_TOKEN_CON_DIGITO, PATRON_TOKEN_NUMERICO, normalize_text
+)
+
+def _proyeccion_con_posiciones(norm_text: str) -> Tuple[str, List[int]]:
+    """Igual que proyeccion_digitos, con la posición en el texto de cada dígito proyectado"""
+    digitos, posiciones = [], []
+    for m in PATRON_TOKEN_CON_DIGITO.finditer(norm_text):
+        token = m.group()
+        numerico = PATRON_TOKEN_NUMERICO.fullmatch(token)
+        for i, caracter in enumerate(token):
+            if caracter.isdigit() or numerico:
+                digitos.append(caracter.translate(CONFUSIONES_OCR))
+                posiciones.append(m.start() + i)
+    return "".join(digitos), posiciones
+
+def distancia_max_cedula(largo: int) -> int:
+    """
+    Errores de edición admitidos al buscar una cédula de `largo` dígitos: tantos que siempre quede
+    un bloque de LONGITUD_BLOQUE_CEDULA dígitos intacto, y ninguno en las cédulas cortas, donde un
+    error ya da el número de otra persona
+    """
+    if largo < LONGITUD_MIN_APROXIMADA:
+        return 0
+    return max(0, min(DISTANCIA_MAX_CEDULA, largo // LONGITUD_BLOQUE_CEDULA - 1))
+
+def variantes_borrado(token: str) -> set:
+    """El token y sus variantes con una letra menos: dos palabras a distancia 1 comparten alguna"""
+    return {token[:i] + token[i + 1:] for i in range(len(token))} | {token}
+
+class VariantesNombre:
+    """
+    Partes de nombre (de 4 letras o más) indexadas por sus variantes de borrado, para encontrar las
+    que están a un error de edición de un token sin compararlo contra todas (búsqueda tipo SymSpell)
+    """
+
+    def __init__(self, partes=()):
+        self.variantes: Dict[str, set] = {}
+        self.longitudes: set = set()
+        self.agregar(partes)
+
+    def agregar(self, partes):
+        for part in partes:
+            if len(part) >= 4:
+                self.longitudes.update((len(part), len(part) + 1))
+                for variante in variantes_borrado(part):
+                    self.variantes.setdefault(variante, set()).add(part)
+
+    def cercanas(self, token: str) -> set:
+        """Partes a distancia de edición 1 o menos del token (tokens de 3 letras o más)"""
+        if len(token) < 3 or not self.variantes:
+            return set()
+        # Un token con una letra menos que la parte es una de sus variantes: basta una consulta
+        candidatas = set(self.variantes.get(token, ()))
+        if len(token) in self.longitudes:
+            for variante in variantes_borrado(token):
+                candidatas |= self.variantes.get(variante, set())
+        return {part for part in candidatas if distancia_edicion(token, part, 1) <= 1}
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Distancia de Levenshtein entre a y b, o maximo + 1 si la supera"""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        actual = [i]
+        for j, cb in enumerate(b, start=1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return min(anterior[-1], maximo + 1)
+
+def buscar_aproximado(patron: str, texto: str, maximo: int) -> Optional[Tuple[int, int]]:
+    """
+    Algoritmo bit-paralelo de Myers: en una sola pasada por `texto`, la menor distancia de edición
+    entre `patron` y alguna subcadena del texto. Devuelve (distancia, posición final) de la mejor
+    coincidencia con distancia <= maximo, o None.
+    """
+    m = len(patron)
+    if not m:
+        return None
+    mascaras: Dict[str, int] = {}
+    for i, caracter in enumerate(patron):
+        mascaras[caracter] = mascaras.get(caracter, 0) | (1 << i)
+    completo = (1 << m) - 1
+    ultimo = 1 << (m - 1)
+    pv, mv, distancia = completo, 0, m
+    mejor = None
+    for j, caracter in enumerate(texto):
+        eq = mascaras.get(caracter, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & completo) ^ pv) | eq
+        ph = mv | (~(xh | pv) & completo)
+        mh = pv & xh
+        if ph & ultimo:
+            distancia += 1
+        elif mh & ultimo:
+            distancia -= 1
+        # Sin arrastrar un 1 en la fila 0: la coincidencia puede empezar en cualquier parte del texto
+        ph = (ph << 1) & completo
+        mh = (mh << 1) & completo
+        pv = mh | (~(xv | ph) & completo)
+        mv = ph & xv
+        if distancia <= maximo and (mejor is None or distancia < mejor[0]):
+            mejor = (distancia, j)
+            if distancia == 0:
+                break
+    return mejor
+
+class Coincidencia(NamedTuple):
+    """Por qué un documento coincide con la consulta: qué se encontró, dónde y con qué confianza"""
+    cedula: bool
+    nombre: bool
+    confianza: float  # 0 a 1
+    tramo: Optional[Tuple[int, int]]  # posiciones en el texto normalizado
+    evidencia: str
+    motivo: str
+
+    def describir(self) -> str:
+        evidencia = f": «{self.evidencia[:60]}»" if self.evidencia else ""
+        return f"{self.motivo}, confianza {self.confianza:.0%}{evidencia}"
+
+class ConsultaDocumentos:
+    """
+    Cédula y nombre normalizados una sola vez por consulta. La cédula se busca en la proyección de
+    dígitos (con las confusiones del OCR ya corregidas) de forma exacta y, si no aparece, con los
+    errores de edición que admite su largo (ver distancia_max_cedula); el nombre, por tokens,
+    admitiendo un error en las partes de 4 letras o más.
+    """
+
+    def __init__(self, cedula: str, nombre: str):
+        self.norm_cedula = normalize_text(cedula)
+        self.norm_nombre = normalize_text(nombre)
+        self.clean_cedula = re.sub(r'\D', '', self.norm_cedula)
+        self.name_parts = self.norm_nombre.split()
+        self.ultimos_digitos = self.clean_cedula[-4:] if len(self.clean_cedula) >= 4 else None
+        self.distancia_max = distancia_max_cedula(len(self.clean_cedula))
+        # Con k errores, alguno de k + 1 bloques disjuntos de la cédula aparece intacto (filtro previo a Myers)
+        self.bloques_cedula = [
+            self.clean_cedula[i:i + LONGITUD_BLOQUE_CEDULA]
+            for i in range(0, LONGITUD_BLOQUE_CEDULA * (self.distancia_max + 1), LONGITUD_BLOQUE_CEDULA)
+        ] if self.distancia_max else []
+
+        # Variantes con una letra borrada de cada parte del nombre (búsqueda tipo SymSpell)
+        self._partes = set(self.name_parts)
+        self._variantes = VariantesNombre(self._partes)
+
+    def buscar(self, documento: DocumentoExtraido) -> Tuple[bool, bool]:
+        """Busca la cédula y el nombre en un documento ya extraído"""
+        with etapa('busqueda', archivo=os.path.basename(documento.ruta)):
+            return self.buscar_texto(documento.texto_normalizado, documento.digitos)
+
+    def _partes_encontradas(self, tokens) -> Dict[str, bool]:
+        """Partes del nombre presentes entre los tokens: True si exacta, False si solo aproximada"""
+        encontradas: Dict[str, bool] = {}
+        for token in tokens:
+            if token in self._partes:
+                encontradas[token] = True
+            for part in self._variantes.cercanas(token):
+                encontradas.setdefault(part, False)
+        return encontradas
+
+    def _cedula(self, norm_text: str, digitos: str) -> Optional[Tuple[int, int]]:
+        """(distancia, fin en la proyección) de la cédula, o None"""
+        if not self.clean_cedula:
+            return None
+        if self.clean_cedula in digitos:
+            return 0, digitos.index(self.clean_cedula) + len(self.clean_cedula) - 1
+        if self.distancia_max and any(bloque in digitos for bloque in self.bloques_cedula):
+            return buscar_aproximado(self.clean_cedula, digitos, self.distancia_max)
+        return None
+
+    def buscar_texto(self, norm_text: str, digitos: str) -> Tuple[bool, bool]:
+        """Busca la cédula y el nombre en un texto normalizado y su proyección de dígitos"""
+        if not norm_text:
+            return (False, False)
+
+        cedula_found = self._cedula(norm_text, digitos) is not None
+        if not cedula_found and self.ultimos_digitos:
+            cedula_found = any(m.group(1) == self.ultimos_digitos for m in PATRON_CLAVE_CEDULA.finditer(norm_text))
+
+        # Cada parte del nombre cuenta tantas veces como aparece en él (p. ej. "perez perez")
+        name_found = False
+        if len(self.name_parts) >= 2:
+            tokens = set(norm_text.split())
+            name_found = sum(1 for part in self.name_parts if part in tokens) >= 2
+            if not name_found:
+                encontradas = self._partes_encontradas(tokens)
+                name_found = sum(1 for part in self.name_parts if part in encontradas) >= 2
+
+        return (cedula_found, name_found)
+
+    def explicar(self, documento: DocumentoExtraido) -> Coincidencia:
+        """Coincidencia detallada (tramo, evidencia y confianza) para reportar por qué un archivo coincide"""
+        norm_text = documento.texto_normalizado
+        if self.clean_cedula:
+            digitos, posiciones = _proyeccion_con_posiciones(norm_text)
+            encontrada = self._cedula(norm_text, digitos)
+            if encontrada is not None:
+                distancia, fin = encontrada
+                m = len(self.clean_cedula)
+                # El inicio exacto se recupera comparando las pocas ventanas posibles que terminan en `fin`
+                inicio = min(
+                    range(max(0, fin - m - distancia + 1), max(0, fin - m + distancia + 1) + 1),
+                    key=lambda i: distancia_edicion(self.clean_cedula, digitos[i:fin + 1], distancia)
+                )
+                tramo = (posiciones[inicio], posiciones[fin] + 1)
+                evidencia = norm_text[tramo[0]:tramo[1]]
+                corregida = evidencia.replace(' ', '') != digitos[inicio:fin + 1]
+                confianza = (1 - distancia / m) * (0.95 if corregida else 1.0)
+                if distancia:
+                    motivo = f"cédula con {distancia} diferencia(s) de OCR"
+                elif corregida:
+                    motivo = "cédula leída con letras confundidas por el OCR"
+                else:
+                    motivo = "cédula exacta"
+                return Coincidencia(True, self.buscar_texto(norm_text, documento.digitos)[1],
+                                    round(confianza, 2), tramo, evidencia, motivo)
+
+            if self.ultimos_digitos:
+                for clave in PATRON_CLAVE_CEDULA.finditer(norm_text):
+                    if clave.group(1) == self.ultimos_digitos:
+                        return Coincidencia(True, self.buscar_texto(norm_text, documento.digitos)[1], 0.6,
+                                            clave.span(), clave.group(), "palabra clave con los últimos 4 dígitos")
+
+        if len(self.name_parts) >= 2:
+            posiciones_partes: Dict[str, Tuple[int, int, bool]] = {}
+            for m in re.finditer(r'\S+', norm_text):
+                token = m.group()
+                for part, exacta in self._partes_encontradas((token,)).items():
+                    if part not in posiciones_partes or (exacta and not posiciones_partes[part][2]):
+                        posiciones_partes[part] = (m.start(), m.end(), exacta)
+            encontradas = sum(1 for part in self.name_parts if part in posiciones_partes)
+            if encontradas >= 2:
+                tramo = (min(p[0] for p in posiciones_partes.values()), max(p[1] for p in posiciones_partes.values()))
+                exactas = sum(1 for part in self.name_parts if posiciones_partes.get(part, (0, 0, False))[2])
+                confianza = (exactas + 0.8 * (encontradas - exactas)) / len(self.name_parts)
+                evidencia = " ".join(norm_text[p[0]:p[1]] for p in sorted(posiciones_partes.values()))
+                motivo = f"{encontradas} de {len(self.name_parts)} partes del nombre"
+                if exactas < encontradas:
+                    motivo += f" ({encontradas - exactas} aproximada(s))"
+                return Coincidencia(False, True, round(confianza, 2), tramo, evidencia, motivo)
+
+        return Coincidencia(False, False, 0.0, None, "", "sin coincidencia")
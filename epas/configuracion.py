@@ -0,0 +1,81 @@
+"""Configuración de EPASBot: rutas y parámetros ajustables con variables de entorno EPAS_*"""
+import os
+
+# Configuración de paths (relativos a la raíz del proyecto, donde está web_app.py)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_PATH = os.path.join(BASE_DIR, 'database.txt')
+DOCUMENTOS_PATH = os.path.join(BASE_DIR, 'documentos')
+CACHE_EXTRACCION_PATH = os.environ.get('EPAS_CACHE_EXTRACCION', os.path.join(BASE_DIR, 'cache_extraccion.sqlite3'))
+CORPUS_SEGMENTO_PATH = os.environ.get('EPAS_CORPUS_SEGMENTO', os.path.join(BASE_DIR, 'corpus_texto.seg'))
+TIPOS_DOCUMENTO = ['cedulas', 'actas', 'evaluaciones']
+INTERVALO_RECARGA_DATABASE = float(os.environ.get('EPAS_INTERVALO_RECARGA_DB', '1'))  # segundos entre stat()
+INTENCIONES_PATH = os.environ.get('EPAS_INTENCIONES', os.path.join(BASE_DIR, 'intenciones.json'))
+
+# Ingesta en segundo plano de PDFs nuevos
+INGESTA_WORKERS = int(os.environ.get('EPAS_INGESTA_WORKERS', '2'))
+INGESTA_INTERVALO_SONDEO = float(os.environ.get('EPAS_INGESTA_SONDEO', '10'))
+
+# Verificación en paralelo: tipos de documento concurrentes y OCR en un pool de procesos
+VERIFICACION_PARALELA = os.environ.get('EPAS_VERIFICACION_PARALELA', '1') == '1'
+OCR_PROCESOS = int(os.environ.get('EPAS_OCR_PROCESOS', '0'))  # 0 = OCR en el proceso del servidor
+OCR_MAX_POR_CONSULTA = int(os.environ.get('EPAS_OCR_MAX_POR_CONSULTA', '4'))
+# Sin pool de procesos, un hilo dueño del modelo reconoce las páginas de todas las consultas en lotes
+SERVICIO_OCR = os.environ.get('EPAS_SERVICIO_OCR', '1') == '1'
+OCR_LOTE_MAX = int(os.environ.get('EPAS_OCR_LOTE_MAX', '4'))
+OCR_LOTE_ESPERA = float(os.environ.get('EPAS_OCR_LOTE_ESPERA', '0.05'))  # segundos que se espera a llenar un lote
+OCR_MAX_GLOBAL = int(os.environ.get(
+    'EPAS_OCR_MAX_GLOBAL', str(OCR_PROCESOS * 2 if OCR_PROCESOS > 0 else (OCR_LOTE_MAX if SERVICIO_OCR else 2))
+))
+PAGINAS_EN_MEMORIA = int(os.environ.get('EPAS_PAGINAS_EN_MEMORIA', '2'))  # páginas renderizadas en espera por PDF
+# OCR con resolución adaptativa: primero a DPI_OCR_INICIAL y de nuevo a DPI_OCR solo si la confianza
+# media es baja o no aparecen dígitos candidatos a cédula (EPAS_DPI_OCR_INICIAL=300 lo desactiva)
+DPI_OCR = 300
+DPI_OCR_INICIAL = int(os.environ.get('EPAS_DPI_OCR_INICIAL', '150'))
+CONFIANZA_MIN_OCR = float(os.environ.get('EPAS_CONFIANZA_MIN_OCR', '0.6'))
+# Un número candidato a cédula: entre DIGITOS_MIN_CANDIDATO y DIGITOS_MAX_CANDIDATO dígitos
+DIGITOS_MIN_CANDIDATO = 8
+DIGITOS_MAX_CANDIDATO = 10
+# Perfiles de OCR por tipo de documento (ver PerfilOCR); el JSON, si existe, reemplaza el perfil de cada tipo que nombra
+PERFILES_OCR_PATH = os.environ.get('EPAS_PERFILES_OCR', os.path.join(BASE_DIR, 'perfiles_ocr.json'))
+PERFILES_OCR_PREDETERMINADOS = {
+    # Cédula escaneada: anverso y reverso; la tarjeta puede estar en cualquier parte de la hoja
+    'cedulas': {'max_paginas': 2, 'region': None, 'pasada_digitos': True, 'detectar_vacias': True},
+    # Acta F-023 y evaluación: los datos del aprendiz van en el encabezado de las primeras páginas
+    'actas': {'max_paginas': 2, 'region': [0.0, 0.0, 1.0, 0.4], 'pasada_digitos': True, 'detectar_vacias': True},
+    'evaluaciones': {'max_paginas': 2, 'region': [0.0, 0.0, 1.0, 0.4], 'pasada_digitos': True, 'detectar_vacias': True},
+}
+DIGITOS_OCR = '0123456789'
+# Una página va a OCR si su capa de texto tiene menos de estos caracteres y tiene imágenes que la cubren
+CARACTERES_MIN_PAGINA = 25
+COBERTURA_MIN_OCR = 0.1
+
+# El segmento del corpus se compacta cuando esta fracción de sus bytes son registros reemplazados o retirados
+CORPUS_COMPACTAR_FRACCION = float(os.environ.get('EPAS_CORPUS_COMPACTAR', '0.5'))
+
+# EasyOCR se carga bajo demanda (ver obtener_lector)
+PRECARGAR_OCR = os.environ.get('EPAS_PRECARGAR_OCR', '0') == '1'
+
+# Verificaciones como trabajos: cola acotada, una sola verificación en curso por cédula
+TRABAJOS_WORKERS = int(os.environ.get('EPAS_TRABAJOS_WORKERS', '2'))
+TRABAJOS_MAX_COLA = int(os.environ.get('EPAS_TRABAJOS_MAX_COLA', '32'))
+TRABAJOS_RETENCION = float(os.environ.get('EPAS_TRABAJOS_RETENCION', '600'))  # segundos que se guarda un resultado
+# Segundos que /procesar espera el resultado; después responde 202 con el trabajo para seguirlo en /trabajos/<id>
+TRABAJOS_ESPERA_PROCESAR = float(os.environ.get('EPAS_TRABAJOS_ESPERA_PROCESAR', '30'))
+
+# Resultados de verificación por aprendiz, válidos mientras no cambie el corpus de cada tipo
+CACHE_RESULTADOS_MAX = int(os.environ.get('EPAS_CACHE_RESULTADOS_MAX', '4096'))
+
+# Búsqueda de la cédula tolerante a errores de OCR: ningún error hasta 8 dígitos y uno más por cada
+# bloque de LONGITUD_BLOQUE_CEDULA dígitos adicional, hasta DISTANCIA_MAX_CEDULA
+DISTANCIA_MAX_CEDULA = int(os.environ.get('EPAS_DISTANCIA_MAX_CEDULA', '1'))
+LONGITUD_MIN_APROXIMADA = 9
+LONGITUD_BLOQUE_CEDULA = 4
+
+# Métricas (/metrics) y registro de consultas lentas; EPAS_METRICAS=0 las desactiva por completo
+METRICAS_ACTIVAS = os.environ.get('EPAS_METRICAS', '1') == '1'
+UMBRAL_CONSULTA_LENTA = float(os.environ.get('EPAS_UMBRAL_CONSULTA_LENTA', '10'))  # segundos
+REGISTRO_LENTAS_PATH = os.environ.get('EPAS_REGISTRO_LENTAS', os.path.join(BASE_DIR, 'consultas_lentas.jsonl'))
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BUCKETS_ARCHIVOS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+BUCKETS_BYTES = tuple(2 ** n for n in range(18, 27))  # 256 KB a 64 MB
@@ -0,0 +1,229 @@
+"""Extracción del texto de los PDF: capa de texto, OCR según el perfil del tipo, caché y segmento"""
+import os
+import threading
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from epas import cache, ocr, segmento
+from epas.cache import DocumentoExtraido, PaginaExtraida, hash_archivo, huella_archivo
+from epas.coincidencias import ConsultaDocumentos
+from epas.configuracion import CARACTERES_MIN_PAGINA, COBERTURA_MIN_OCR
+from epas.metricas import etapa, metricas
+from epas.ocr import ControlOCR, ExtraccionCancelada, PerfilOCR, UsoPerfilesOCR, ocr_paginas, tiene_numero_candidato
+from epas.texto import normalize_text, proyeccion_digitos
+
+def necesita_ocr(page, texto: str) -> bool:
+    """Una página necesita OCR si casi no tiene capa de texto pero sí imágenes que cubren parte de ella"""
+    if len(texto.strip()) >= CARACTERES_MIN_PAGINA:
+        return False
+    area_pagina = abs(page.rect)
+    if not area_pagina:
+        return False
+    area_imagenes = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+    return area_imagenes / area_pagina >= COBERTURA_MIN_OCR
+
+def _extraer_paginas(pdf_path: str, control: Optional[ControlOCR] = None,
+                     previas: Optional[List[PaginaExtraida]] = None,
+                     perfil: Optional[PerfilOCR] = None) -> Optional[Tuple[List[PaginaExtraida], bool]]:
+    """
+    Extrae el texto por página con PyMuPDF: usa la capa de texto de cada página y hace OCR (EasyOCR)
+    solo de las páginas que no la tienen; con `perfil`, solo las que él indica. Cada página registra
+    su procedencia ('texto', 'ocr', 'region' si solo se leyó la región del perfil, 'omitida' si
+    estaba en blanco, o 'pendiente' si el perfil no la leyó o el OCR se detuvo al encontrar la
+    cédula y el nombre de la consulta). Devuelve (páginas, completo): completo solo si no quedó
+    ninguna página pendiente ni leída a medias. `previas` permite retomar un OCR parcial anterior,
+    incluidas las regiones que ya leyó la pasada dirigida.
+    """
+    try:
+        textos, metodos = [], []
+        nombre_archivo = os.path.basename(pdf_path)
+        # Toda la capa de texto del PDF de una vez bajo el lock de fitz (ver ocr.bloqueo_fitz)
+        with ocr.bloqueo_fitz, fitz.open(pdf_path) as doc:
+            for page in doc:
+                with etapa('pdf.capa_texto', archivo=nombre_archivo, pagina=page.number):
+                    texto = page.get_text()
+                    textos.append(texto)
+                    metodos.append('pendiente' if necesita_ocr(page, texto) else 'texto')
+        metricas.contar('epas_paginas_total', metodos.count('texto'), metodo='texto')
+
+        # Retomar una extracción parcial sin repetir el OCR de las páginas ya leídas: las enteras quedan
+        # listas y las leídas solo en la región parten de ese texto, sin repetir la pasada dirigida
+        capas = list(textos)
+        regiones: List[str] = []
+        for pagina in previas or []:
+            if pagina.metodo in ('ocr', 'omitida', 'region') and pagina.numero < len(textos):
+                textos[pagina.numero] = pagina.texto
+                metodos[pagina.numero] = pagina.metodo
+                if pagina.metodo == 'region':
+                    regiones.append(pagina.texto[len(capas[pagina.numero]):])
+
+        por_ocr = [numero for numero, metodo in enumerate(metodos) if metodo in ('pendiente', 'region')]
+        if por_ocr:
+            tipo = os.path.basename(os.path.dirname(pdf_path))
+            detalle = f" (perfil de {tipo}: {perfil.describir()})" if perfil else ""
+            print(f"🔍 Usando EasyOCR en {len(por_ocr)} de {len(textos)} página(s) de {pdf_path}{detalle}")
+            normalizados = [normalize_text(texto) for texto in textos]
+            consulta = control.consulta if control else None
+            uso = dict.fromkeys(UsoPerfilesOCR.CAMPOS[1:], 0)
+            uso['paginas_escaneadas'] = len(por_ocr)
+
+            def leer(numeros: List[int], perfil_pasada: Optional[PerfilOCR], pasada: str,
+                     leidos: Optional[List[str]] = None) -> bool:
+                """
+                Una pasada de OCR sobre `numeros`, agregando a `leidos` el texto reconocido;
+                False si se detuvo al encontrar la cédula y el nombre
+                """
+                nombre_pasada = 'dirigido' if pasada == 'dirigidas' else 'de página completa'
+                en_region = perfil_pasada is not None and perfil_pasada.region is not None
+                with closing(ocr_paginas(pdf_path, numeros, control, perfil_pasada)) as paginas_ocr:
+                    for hechas, (numero, resultado) in enumerate(paginas_ocr, start=1):
+                        if control and control.progreso:
+                            control.progreso(
+                                f"   OCR {nombre_pasada} página {hechas}/{len(numeros)} de {nombre_archivo} "
+                                f"({resultado.describir()})"
+                            )
+                        if resultado.fallida:
+                            # Sin lectura la página conserva su estado: pendiente para un próximo intento
+                            continue
+                        uso['pixeles'] += resultado.pixeles
+                        # Una lectura de página completa reemplaza la de la región
+                        textos[numero] = capas[numero] + "\n" + resultado.texto if resultado.texto else capas[numero]
+                        normalizados[numero] = normalize_text(textos[numero])
+                        if leidos is not None:
+                            leidos.append(resultado.texto)
+                        if resultado.vacia:
+                            # Una región en blanco no dice nada del resto de la página
+                            metodos[numero] = 'region' if en_region else 'omitida'
+                            uso['vacias'] += 1
+                            continue
+                        metodos[numero] = 'region' if en_region else 'ocr'
+                        uso[pasada] += 1
+                        metricas.contar('epas_paginas_total', metodo=metodos[numero])
+
+                        if consulta and numero != numeros[-1]:
+                            norm_text = " ".join(n for n in normalizados if n)
+                            if all(consulta.buscar_texto(norm_text, proyeccion_digitos(norm_text))):
+                                # Cédula y nombre encontrados: no hace falta renderizar el resto
+                                return False
+                return True
+
+            if perfil is None:
+                leer(por_ocr, None, 'completas')
+            else:
+                dirigidas = [
+                    numero for numero in por_ocr
+                    if metodos[numero] == 'pendiente' and (perfil.max_paginas is None or numero < perfil.max_paginas)
+                ]
+                leidos = list(regiones)
+                terminada = not dirigidas or leer(dirigidas, perfil, 'dirigidas', leidos)
+                # Solo cuenta lo que leyó el OCR dirigido: la capa de texto de una portada tipeada
+                # (ficha, fechas) no dice si la cédula estaba en las páginas escaneadas
+                if terminada and not any(tiene_numero_candidato(texto) for texto in leidos):
+                    # Ningún número candidato a cédula: OCR de página completa de todo lo escaneado
+                    # (sin repetir las páginas que la pasada dirigida ya leyó enteras)
+                    uso['respaldos'] = 1
+                    repetir = [numero for numero in por_ocr if metodos[numero] in ('pendiente', 'region')]
+                    terminada = not repetir or leer(repetir, perfil._replace(region=None), 'completas')
+                if terminada:
+                    uso['omitidas'] = sum(1 for numero in por_ocr if metodos[numero] == 'pendiente')
+            ocr.uso_perfiles_ocr.registrar(tipo, uso)
+
+        completo = not any(metodo in ('pendiente', 'region') for metodo in metodos)
+        paginas = [
+            PaginaExtraida(i, metodo, texto, normalize_text(texto))
+            for i, (metodo, texto) in enumerate(zip(metodos, textos))
+        ]
+        return paginas, completo
+    except ExtraccionCancelada:
+        raise
+    except Exception as e:
+        print(f"⚠️ Error procesando PDF {pdf_path}: {str(e)}")
+        return None
+
+# Un lock por archivo para que la ingesta y las consultas no extraigan el mismo PDF a la vez
+_locks_extraccion: Dict[str, threading.Lock] = {}
+_locks_extraccion_lock = threading.Lock()
+
+def _obtener_paginas(pdf_path: str, control: Optional[ControlOCR] = None) -> Tuple[List[PaginaExtraida], bool, bool]:
+    """
+    Devuelve (páginas, desde_caché, completo), extrayendo el PDF solo si no está en caché.
+    Un PDF que no se pudo leer no está completo: no se indexa ni se guarda y se reintenta después.
+    Lanza ExtraccionCancelada si la consulta dueña de `control` se cancela durante el OCR.
+    """
+    with etapa('cache.lectura', archivo=os.path.basename(pdf_path)):
+        paginas = cache.cache_extraccion.obtener(pdf_path)
+    if paginas is not None:
+        return paginas, True, True
+
+    with _locks_extraccion_lock:
+        lock_archivo = _locks_extraccion.setdefault(pdf_path, threading.Lock())
+
+    with lock_archivo:
+        # Otro hilo pudo terminar la extracción mientras esperábamos el lock
+        paginas = cache.cache_extraccion.obtener(pdf_path)
+        if paginas is not None:
+            return paginas, True, True
+
+        try:
+            huella = (*huella_archivo(pdf_path), hash_archivo(pdf_path))
+        except OSError as e:
+            print(f"⚠️ Error leyendo PDF {pdf_path}: {str(e)}")
+            return [], False, False
+
+        # El perfil de OCR del tipo solo acorta las consultas; la ingesta y el reporte leen todo
+        perfil = None
+        if control is not None and control.consulta is not None:
+            perfil = ocr.PERFILES_OCR.get(os.path.basename(os.path.dirname(pdf_path)))
+        with etapa('extraccion', archivo=os.path.basename(pdf_path)):
+            resultado = _extraer_paginas(pdf_path, control, cache.cache_extraccion.obtener_parcial(pdf_path), perfil)
+        if resultado is None:
+            return [], False, False
+        paginas, completo = resultado
+        cache.cache_extraccion.guardar(pdf_path, huella, paginas, completo)
+        return paginas, False, completo
+
+def extraer_paginas_pdf(pdf_path: str) -> List[PaginaExtraida]:
+    """Devuelve las páginas de un PDF, consultando la caché antes de parsear o hacer OCR"""
+    return _obtener_paginas(pdf_path)[0]
+
+def extraer_documento(pdf_path: str, control: Optional[ControlOCR] = None) -> DocumentoExtraido:
+    """
+    Lee un PDF del segmento compartido si su huella no cambió; si no, lo extrae (o lo lee de la
+    caché), calcula sus proyecciones de búsqueda y lo agrega al segmento para los demás procesos
+    """
+    inicio = time.perf_counter()
+    try:
+        huella = huella_archivo(pdf_path)
+    except OSError:
+        huella = None
+    if huella is not None:
+        with etapa('segmento.lectura', archivo=os.path.basename(pdf_path)):
+            almacenado = segmento.segmento_corpus.documento(pdf_path, huella)
+        if almacenado is not None:
+            return almacenado._replace(segundos=time.perf_counter() - inicio)
+
+    paginas, desde_cache, completo = _obtener_paginas(pdf_path, control)
+    norm_text = " ".join(p.texto_normalizado for p in paginas if p.texto_normalizado)
+    documento = DocumentoExtraido(
+        pdf_path, paginas, norm_text, proyeccion_digitos(norm_text), desde_cache,
+        time.perf_counter() - inicio, completo
+    )
+    # Solo extracciones completas: una parcial (detenida por la consulta o por el perfil) no es el texto del PDF
+    if huella is not None and completo and paginas:
+        segmento.segmento_corpus.guardar(huella, documento)
+    return documento
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """Extrae texto de un PDF usando la capa de texto de PyMuPDF + EasyOCR en las páginas escaneadas"""
+    return "\n".join(pagina.texto for pagina in extraer_paginas_pdf(pdf_path))
+
+def search_in_pdf(file_path: str, cedula: str, nombre: str) -> Tuple[bool, bool]:
+    """Busca cédula y nombre en un archivo PDF"""
+    try:
+        return ConsultaDocumentos(cedula, nombre).buscar(extraer_documento(file_path))
+    except Exception as e:
+        print(f"⚠️ Error procesando {file_path}: {str(e)}")
+        return (False, False)
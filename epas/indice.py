@@ -0,0 +1,320 @@
+"""Índice invertido del corpus por tipo de documento y caché de resultados por aprendiz"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from epas import segmento
+from epas.cache import DocumentoExtraido, huella_archivo
+from epas.coincidencias import ConsultaDocumentos, buscar_aproximado, distancia_edicion, variantes_borrado
+from epas.configuracion import CACHE_RESULTADOS_MAX, LONGITUD_BLOQUE_CEDULA, TIPOS_DOCUMENTO
+from epas.extraccion import extraer_documento
+from epas.ocr import ControlOCR
+from epas.texto import PATRON_CLAVE_CEDULA
+
+LONGITUD_NGRAMA_CEDULA = 8  # Las cédulas válidas tienen entre 8 y 10 dígitos
+
+class _IndiceTipo:
+    """
+    Índices invertidos de un tipo de documento (cedulas, actas o evaluaciones). Las proyecciones de
+    dígitos no se copian aquí: se leen del segmento compartido del corpus.
+    """
+
+    def __init__(self):
+        self.huellas: Dict[str, Tuple[int, int]] = {}
+        self.ngramas: Dict[str, set] = {}
+        self.bloques: Dict[str, set] = {}  # bloques de LONGITUD_BLOQUE_CEDULA dígitos, para la búsqueda aproximada
+        self.claves_cedula: Dict[str, set] = {}
+        self.tokens: Dict[str, Dict[str, List[int]]] = {}  # token -> {archivo: posiciones}
+        self.borrados: Dict[str, set] = {}  # variante con una letra menos -> tokens, para nombres aproximados
+        self.generacion = 0  # aumenta con cada archivo agregado, modificado o retirado
+        self._entradas: Dict[str, Tuple[set, set, set, set]] = {}
+
+    def agregar(self, huella: Tuple[int, int], documento: DocumentoExtraido):
+        file_path = documento.ruta
+        norm_text = documento.texto_normalizado
+        digitos = documento.digitos
+        # Reemplazar un archivo cuenta como un solo cambio de la generación
+        reemplazado = file_path in self._entradas
+        self.eliminar(file_path)
+        ngramas = {
+            digitos[i:i + LONGITUD_NGRAMA_CEDULA]
+            for i in range(len(digitos) - LONGITUD_NGRAMA_CEDULA + 1)
+        }
+        bloques = {
+            digitos[i:i + LONGITUD_BLOQUE_CEDULA]
+            for i in range(len(digitos) - LONGITUD_BLOQUE_CEDULA + 1)
+        }
+        claves = {m.group(1) for m in PATRON_CLAVE_CEDULA.finditer(norm_text)}
+        posiciones: Dict[str, List[int]] = {}
+        for pos, token in enumerate(norm_text.split()):
+            posiciones.setdefault(token, []).append(pos)
+
+        for ngrama in ngramas:
+            self.ngramas.setdefault(ngrama, set()).add(file_path)
+        for bloque in bloques:
+            self.bloques.setdefault(bloque, set()).add(file_path)
+        for clave in claves:
+            self.claves_cedula.setdefault(clave, set()).add(file_path)
+        for token, lista in posiciones.items():
+            if token not in self.tokens and len(token) >= 3:
+                for variante in variantes_borrado(token):
+                    self.borrados.setdefault(variante, set()).add(token)
+            self.tokens.setdefault(token, {})[file_path] = lista
+
+        self.huellas[file_path] = huella
+        self._entradas[file_path] = (ngramas, bloques, claves, set(posiciones))
+        if not reemplazado:
+            self.generacion += 1
+
+    def eliminar(self, file_path: str):
+        entrada = self._entradas.pop(file_path, None)
+        self.huellas.pop(file_path, None)
+        if not entrada:
+            return
+        self.generacion += 1
+        ngramas, bloques, claves, tokens = entrada
+        for indice, llaves in ((self.ngramas, ngramas), (self.bloques, bloques), (self.claves_cedula, claves)):
+            for llave in llaves:
+                archivos = indice.get(llave)
+                if archivos is not None:
+                    archivos.discard(file_path)
+                    if not archivos:
+                        del indice[llave]
+        for token in tokens:
+            archivos = self.tokens.get(token)
+            if archivos is not None:
+                archivos.pop(file_path, None)
+                if not archivos:
+                    del self.tokens[token]
+                    for variante in variantes_borrado(token) if len(token) >= 3 else ():
+                        variantes = self.borrados.get(variante)
+                        if variantes is not None:
+                            variantes.discard(token)
+                            if not variantes:
+                                del self.borrados[variante]
+
+    def _archivos_con_cedula(self, consulta: ConsultaDocumentos) -> set:
+        clean_cedula = consulta.clean_cedula
+        cedula = [clean_cedula.encode('ascii')]
+        if len(clean_cedula) < LONGITUD_NGRAMA_CEDULA:
+            # Sin n-grama posible: verificar la proyección de dígitos de cada archivo
+            return segmento.segmento_corpus.filtrar_digitos(self.huellas, cedula)
+        primero = self.ngramas.get(clean_cedula[:LONGITUD_NGRAMA_CEDULA], set())
+        ultimo = self.ngramas.get(clean_cedula[-LONGITUD_NGRAMA_CEDULA:], set())
+        exactos = segmento.segmento_corpus.filtrar_digitos(primero & ultimo, cedula)
+        if exactos or not consulta.distancia_max:
+            return exactos
+        # Solo pasan a Myers los archivos que comparten con la cédula un bloque exacto o la clave de sus últimos dígitos
+        candidatos = set(self.claves_cedula.get(consulta.ultimos_digitos, ()))
+        for bloque in consulta.bloques_cedula:
+            candidatos |= self.bloques.get(bloque, set())
+        aproximados = set()
+        for file_path in candidatos:
+            digitos = segmento.segmento_corpus.digitos(file_path)
+            if digitos is None or buscar_aproximado(clean_cedula, digitos, consulta.distancia_max) is not None:
+                aproximados.add(file_path)
+        return aproximados
+
+    def _archivos_con_nombre(self, name_parts: List[str]) -> set:
+        # El nombre contiguo implica al menos dos partes encontradas, basta con contar
+        conteo: Dict[str, int] = {}
+        for part in name_parts:
+            archivos = set(self.tokens.get(part, {}))
+            if len(part) >= 4:
+                for variante in variantes_borrado(part):
+                    for token in self.borrados.get(variante, ()):
+                        if token != part and distancia_edicion(token, part, 1) <= 1:
+                            archivos.update(self.tokens[token])
+            for file_path in archivos:
+                conteo[file_path] = conteo.get(file_path, 0) + 1
+        return {f for f, n in conteo.items() if n >= 2}
+
+    def candidatos(self, consulta: ConsultaDocumentos) -> set:
+        encontrados = set()
+        if consulta.norm_cedula:
+            encontrados |= self._archivos_con_cedula(consulta)
+            if consulta.ultimos_digitos:
+                encontrados |= self.claves_cedula.get(consulta.ultimos_digitos, set())
+        if len(consulta.name_parts) >= 2:
+            encontrados |= self._archivos_con_nombre(consulta.name_parts)
+        return encontrados
+
+class IndiceCorpus:
+    """
+    Índice invertido del texto extraído de todos los PDFs, por tipo de documento:
+    n-gramas de la proyección de dígitos y claves "cc/cédula/documento + últimos 4 dígitos"
+    para la cédula, y tokens normalizados con posiciones para el nombre.
+    Se actualiza incrementalmente según la huella (tamaño, mtime) de cada archivo.
+    """
+
+    def __init__(self, tipos: List[str]):
+        self._lock = threading.RLock()
+        self._tipos = {tipo: _IndiceTipo() for tipo in tipos}
+
+    def pendientes(self, doc_type: str, dir_path: str) -> Tuple[List[Tuple[str, Tuple[int, int]]], int]:
+        """
+        Retira del índice los archivos borrados y devuelve (archivos nuevos o modificados con su
+        huella, número de eliminados), sin extraer nada
+        """
+        try:
+            actuales = {
+                os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith('.pdf')
+            }
+        except OSError:
+            actuales = set()
+
+        with self._lock:
+            indice = self._tipos[doc_type]
+            eliminados = set(indice.huellas) - actuales
+            for file_path in eliminados:
+                indice.eliminar(file_path)
+                segmento.segmento_corpus.retirar(file_path)
+            pendientes = []
+            for file_path in sorted(actuales):
+                try:
+                    huella = huella_archivo(file_path)
+                except OSError:
+                    continue
+                if indice.huellas.get(file_path) != huella:
+                    pendientes.append((file_path, huella))
+        return pendientes, len(eliminados)
+
+    def actualizar(self, doc_type: str, dir_path: str) -> Tuple[List[DocumentoExtraido], int]:
+        """Indexa archivos nuevos o modificados y elimina los borrados; devuelve (indexados, eliminados)"""
+        pendientes, eliminados = self.pendientes(doc_type, dir_path)
+        # La extracción ocurre fuera del lock para no bloquear otras consultas
+        indexados = [self.indexar(doc_type, file_path, huella) for file_path, huella in pendientes]
+        return indexados, eliminados
+
+    def indexar(self, doc_type: str, file_path: str, huella: Tuple[int, int],
+                control: Optional[ControlOCR] = None) -> DocumentoExtraido:
+        """Agrega (o reemplaza) un archivo en el índice a partir de su texto extraído"""
+        documento = extraer_documento(file_path, control)
+        # Una extracción detenida al encontrar coincidencia no se indexa: la ingesta la completará
+        if documento.completo:
+            with self._lock:
+                self._tipos[doc_type].agregar(huella, documento)
+        return documento
+
+    def archivos(self, doc_type: str) -> set:
+        """Archivos indexados de un tipo de documento"""
+        with self._lock:
+            return set(self._tipos[doc_type].huellas)
+
+    def al_dia(self, doc_type: str, file_path: str) -> bool:
+        """Indica si el archivo está indexado con su versión actual"""
+        try:
+            huella = huella_archivo(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            return self._tipos[doc_type].huellas.get(file_path) == huella
+
+    def eliminar(self, doc_type: str, file_path: str):
+        """Quita un archivo del índice"""
+        with self._lock:
+            self._tipos[doc_type].eliminar(file_path)
+
+    def generacion(self, doc_type: str) -> int:
+        """Contador de cambios del corpus indexado de un tipo de documento"""
+        with self._lock:
+            return self._tipos[doc_type].generacion
+
+    def candidatos(self, doc_type: str, consulta: ConsultaDocumentos) -> List[str]:
+        """Archivos que pueden contener la cédula o el nombre, ordenados por nombre de archivo"""
+        with self._lock:
+            encontrados = self._tipos[doc_type].candidatos(consulta)
+        return sorted(encontrados)
+
+    def estadisticas(self) -> dict:
+        """Tamaño del índice por tipo de documento"""
+        with self._lock:
+            return {
+                tipo: {
+                    'archivos': len(indice.huellas),
+                    'generacion': indice.generacion,
+                    'ngramas': len(indice.ngramas),
+                    'bloques': len(indice.bloques),
+                    'claves_cedula': len(indice.claves_cedula),
+                    'tokens': len(indice.tokens),
+                    'variantes_nombre': len(indice.borrados)
+                }
+                for tipo, indice in self._tipos.items()
+            }
+
+indice_corpus = IndiceCorpus(TIPOS_DOCUMENTO)
+
+class ResultadoTipo(NamedTuple):
+    """Resultado de verificar un tipo de documento, con la generación del corpus en que se calculó"""
+    encontrado: bool
+    archivo: Optional[str]
+    generacion: int
+
+class CacheResultados:
+    """
+    Caché LRU en memoria de los resultados de verificación por aprendiz (cédula + nombre normalizado).
+    Cada tipo de documento se invalida por separado: el resultado sirve mientras la generación del
+    índice de ese tipo no cambie y, si no se encontró, mientras no haya archivos sin indexar.
+    """
+
+    def __init__(self, indice: IndiceCorpus, max_entradas: int):
+        self.indice = indice
+        self.max_entradas = max(1, max_entradas)
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.desalojos = 0
+        self._entradas: 'OrderedDict[Tuple[str, str], Dict[str, ResultadoTipo]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, consulta: ConsultaDocumentos, doc_type: str,
+                pendientes: List[Tuple[str, Tuple[int, int]]]) -> Optional[ResultadoTipo]:
+        """Resultado aún válido para el tipo de documento, o None (cuenta acierto o fallo)"""
+        clave = (consulta.clean_cedula, consulta.norm_nombre)
+        generacion = self.indice.generacion(doc_type)
+        with self._lock:
+            por_tipo = self._entradas.get(clave)
+            resultado = por_tipo.get(doc_type) if por_tipo else None
+            if resultado is None:
+                self.fallos += 1
+                return None
+
+            rutas_pendientes = {file_path for file_path, _ in pendientes}
+            vigente = resultado.generacion == generacion and (
+                resultado.archivo not in rutas_pendientes if resultado.encontrado else not rutas_pendientes
+            )
+            if not vigente:
+                del por_tipo[doc_type]
+                self.invalidaciones += 1
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return resultado
+
+    def guardar(self, consulta: ConsultaDocumentos, doc_type: str, resultado: ResultadoTipo):
+        clave = (consulta.clean_cedula, consulta.norm_nombre)
+        with self._lock:
+            self._entradas.setdefault(clave, {})[doc_type] = resultado
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def estadisticas(self) -> dict:
+        """Contadores de uso de la caché (por tipo de documento consultado)"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aprendices': len(self._entradas),
+                'max_aprendices': self.max_entradas,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'invalidaciones': self.invalidaciones,
+                'desalojos': self.desalojos
+            }
+
+cache_resultados = CacheResultados(indice_corpus, CACHE_RESULTADOS_MAX)
@@ -0,0 +1,212 @@
+"""Ingesta en segundo plano de los PDF nuevos o modificados de los directorios de documentos"""
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from epas import cache, indice, segmento
+from epas.cache import huella_archivo
+from epas.configuracion import DOCUMENTOS_PATH, INGESTA_INTERVALO_SONDEO, INGESTA_WORKERS, TIPOS_DOCUMENTO
+from epas.indice import IndiceCorpus
+
+# Eventos de inotify (ver <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+def _iniciar_inotify(directorios: Dict[str, str]) -> Optional[Tuple[int, Dict[int, str]]]:
+    """Crea un descriptor inotify sobre los directorios dados; None si no está disponible"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init()
+        if fd < 0:
+            return None
+        watches = {}
+        mascara = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+        for doc_type, dir_path in directorios.items():
+            wd = libc.inotify_add_watch(fd, dir_path.encode(), mascara)
+            if wd < 0:
+                os.close(fd)
+                return None
+            watches[wd] = doc_type
+        return fd, watches
+    except (OSError, AttributeError):
+        return None
+
+class IngestaDocumentos:
+    """
+    Procesa en segundo plano los PDFs nuevos o modificados de los directorios de documentos
+    (inotify si está disponible, sondeo periódico si no), de modo que la extracción y el OCR
+    ocurran fuera de /procesar. Los resultados quedan en la caché y en el índice del corpus.
+    """
+    PRIORIDAD_URGENTE = 0
+    PRIORIDAD_NORMAL = 1
+
+    def __init__(self, indice: IndiceCorpus, directorios: Dict[str, str], workers: int, intervalo_sondeo: float):
+        self.indice = indice
+        self.directorios = directorios
+        self.workers = max(1, workers)
+        self.intervalo_sondeo = intervalo_sondeo
+        self.modo = None
+        self.procesados = 0
+        self.eliminados = 0
+        self.errores = 0
+        self.escaneo_inicial_completo = False
+        self._cola: queue.PriorityQueue = queue.PriorityQueue()
+        self._pendientes: Dict[str, int] = {}  # archivo -> prioridad encolada
+        self._en_proceso: set = set()
+        self._secuencia = 0
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def iniciar(self):
+        """Arranca el vigilante de directorios y los hilos de extracción"""
+        if self._hilos:
+            return
+        for i in range(self.workers):
+            hilo = threading.Thread(target=self._trabajar, name=f'ingesta-{i}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        vigilante = threading.Thread(target=self._vigilar, name='ingesta-vigilante', daemon=True)
+        vigilante.start()
+        self._hilos.append(vigilante)
+
+    def encolar(self, doc_type: str, file_path: str, prioridad: int = PRIORIDAD_NORMAL):
+        """Agrega un PDF a la cola (los más pequeños primero dentro de la misma prioridad)"""
+        try:
+            tamano = os.path.getsize(file_path)
+        except OSError:
+            return
+        with self._lock:
+            actual = self._pendientes.get(file_path)
+            if actual is not None and actual <= prioridad:
+                return
+            self._pendientes[file_path] = prioridad
+            self._secuencia += 1
+            self._cola.put((prioridad, tamano, self._secuencia, doc_type, file_path))
+
+    def adelantar(self, doc_type: str, rutas: List[str]):
+        """Encola con prioridad urgente los archivos que una consulta dejó sin indexar"""
+        if not self._hilos:
+            return
+        for file_path in rutas:
+            self.encolar(doc_type, file_path, self.PRIORIDAD_URGENTE)
+
+    def escanear(self):
+        """Compara cada directorio con el índice: encola lo nuevo o modificado y retira lo borrado"""
+        for doc_type, dir_path in self.directorios.items():
+            try:
+                actuales = {
+                    os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith('.pdf')
+                }
+            except OSError:
+                continue
+            for file_path in self.indice.archivos(doc_type) - actuales:
+                self._retirar(doc_type, file_path)
+            for file_path in actuales:
+                if not self.indice.al_dia(doc_type, file_path):
+                    self.encolar(doc_type, file_path)
+        try:
+            segmento.segmento_corpus.compactar_si_conviene()
+        except OSError as e:
+            print(f"⚠️ Error compactando el segmento del corpus: {str(e)}")
+
+    def _retirar(self, doc_type: str, file_path: str):
+        self.indice.eliminar(doc_type, file_path)
+        cache.cache_extraccion.invalidar(file_path)
+        segmento.segmento_corpus.retirar(file_path)
+        with self._lock:
+            self.eliminados += 1
+
+    def _vigilar(self):
+        # Registrar inotify antes del escaneo inicial para no perder archivos copiados mientras tanto
+        inotify = _iniciar_inotify(self.directorios)
+        self.escanear()
+        self.escaneo_inicial_completo = True
+
+        if inotify is None:
+            self.modo = 'sondeo'
+            while True:
+                time.sleep(self.intervalo_sondeo)
+                self.escanear()
+
+        self.modo = 'inotify'
+        fd, watches = inotify
+        encabezado = struct.Struct('iIII')
+        while True:
+            listos, _, _ = select.select([fd], [], [], self.intervalo_sondeo)
+            if not listos:
+                continue
+            datos = os.read(fd, 64 * 1024)
+            offset = 0
+            while offset < len(datos):
+                wd, mascara, _, longitud = encabezado.unpack_from(datos, offset)
+                offset += encabezado.size
+                nombre = datos[offset:offset + longitud].rstrip(b'\0').decode(errors='replace')
+                offset += longitud
+
+                if mascara & IN_Q_OVERFLOW:
+                    self.escanear()
+                    continue
+                doc_type = watches.get(wd)
+                if not doc_type or not nombre.lower().endswith('.pdf'):
+                    continue
+                file_path = os.path.join(self.directorios[doc_type], nombre)
+                if mascara & (IN_DELETE | IN_MOVED_FROM):
+                    self._retirar(doc_type, file_path)
+                else:
+                    self.encolar(doc_type, file_path)
+
+    def _trabajar(self):
+        while True:
+            prioridad, _, _, doc_type, file_path = self._cola.get()
+            with self._lock:
+                # Entrada obsoleta: el archivo se volvió a encolar con más prioridad
+                if self._pendientes.get(file_path) != prioridad:
+                    continue
+                del self._pendientes[file_path]
+                self._en_proceso.add(file_path)
+            try:
+                # Una consulta pudo terminar de indexarlo mientras esperaba en la cola
+                if os.path.exists(file_path) and not self.indice.al_dia(doc_type, file_path):
+                    self.indice.indexar(doc_type, file_path, huella_archivo(file_path))
+                with self._lock:
+                    self.procesados += 1
+            except Exception as e:
+                print(f"⚠️ Error en ingesta de {file_path}: {str(e)}")
+                with self._lock:
+                    self.errores += 1
+            finally:
+                with self._lock:
+                    self._en_proceso.discard(file_path)
+
+    def estado(self) -> dict:
+        """Estado de la cola de ingesta"""
+        with self._lock:
+            pendientes = len(self._pendientes)
+            en_proceso = len(self._en_proceso)
+            return {
+                'activa': bool(self._hilos),
+                'modo': self.modo,
+                'workers': self.workers,
+                'pendientes': pendientes,
+                'en_proceso': en_proceso,
+                'procesados': self.procesados,
+                'eliminados': self.eliminados,
+                'errores': self.errores,
+                'corpus_caliente': self.escaneo_inicial_completo and pendientes == 0 and en_proceso == 0
+            }
+
+ingesta = IngestaDocumentos(
+    indice.indice_corpus,
+    {doc_type: os.path.join(DOCUMENTOS_PATH, doc_type) for doc_type in TIPOS_DOCUMENTO},
+    INGESTA_WORKERS,
+    INGESTA_INTERVALO_SONDEO
+)
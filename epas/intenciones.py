@@ -0,0 +1,188 @@
+"""Detección de intenciones y preguntas frecuentes del chatbot a partir de intenciones.json"""
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from epas.cache import huella_archivo
+from epas.configuracion import INTENCIONES_PATH, INTERVALO_RECARGA_DATABASE
+from epas.texto import normalize_text
+
+class AutomataFrases:
+    """
+    Autómata de Aho-Corasick sobre tokens: encuentra en una sola pasada todas las apariciones de
+    todas las frases registradas (secuencias de palabras completas) en una lista de tokens.
+    """
+
+    def __init__(self):
+        self._siguiente: List[Dict[str, int]] = [{}]
+        self._falla: List[int] = [0]
+        self._salidas: List[List[int]] = [[]]
+        self.frases = 0
+
+    def agregar(self, tokens: List[str]) -> int:
+        """Registra una frase y devuelve su identificador"""
+        nodo = 0
+        for token in tokens:
+            if token not in self._siguiente[nodo]:
+                self._siguiente.append({})
+                self._falla.append(0)
+                self._salidas.append([])
+                self._siguiente[nodo][token] = len(self._siguiente) - 1
+            nodo = self._siguiente[nodo][token]
+        self._salidas[nodo].append(self.frases)
+        self.frases += 1
+        return self.frases - 1
+
+    def compilar(self):
+        """Calcula los enlaces de falla (recorrido en anchura) y hereda las salidas de cada enlace"""
+        pendientes = deque(self._siguiente[0].values())
+        while pendientes:
+            nodo = pendientes.popleft()
+            for token, hijo in self._siguiente[nodo].items():
+                falla = self._falla[nodo]
+                while falla and token not in self._siguiente[falla]:
+                    falla = self._falla[falla]
+                self._falla[hijo] = self._siguiente[falla].get(token, 0)
+                self._salidas[hijo] = self._salidas[hijo] + self._salidas[self._falla[hijo]]
+                pendientes.append(hijo)
+
+    def buscar(self, tokens: List[str]) -> Iterator[int]:
+        """Identificadores de las frases que aparecen en `tokens`, una vez por aparición"""
+        nodo = 0
+        for token in tokens:
+            while nodo and token not in self._siguiente[nodo]:
+                nodo = self._falla[nodo]
+            nodo = self._siguiente[nodo].get(token, 0)
+            yield from self._salidas[nodo]
+
+class PreguntaFrecuente(NamedTuple):
+    clave: str
+    pregunta: str
+    respuesta: str
+    mensaje: str  # respuesta ya armada para el chat
+
+class MotorIntenciones:
+    """
+    Intenciones y preguntas frecuentes de intenciones.json. Las frases de todas se normalizan con
+    normalize_text y se compilan en un solo AutomataFrases; cada frase encontrada en el mensaje
+    suma su peso (una vez) a su intención y gana la de mayor puntaje si alcanza el umbral. Los
+    menús de preguntas frecuentes quedan armados al cargar.
+    """
+
+    def __init__(self, datos: dict):
+        self.umbral = float(datos.get('umbral', 1))
+        self.intenciones: List[str] = []
+        self._frases: List[Tuple[int, float]] = []  # frase -> (intención, peso)
+        self._automata = AutomataFrases()
+
+        for nombre, definicion in datos.get('intenciones', {}).items():
+            self._agregar_intencion(nombre, definicion.get('frases', {}))
+
+        self.preguntas: List[PreguntaFrecuente] = []
+        self._preguntas_por_intencion: Dict[str, PreguntaFrecuente] = {}
+        for entrada in datos.get('preguntas_frecuentes', []):
+            pregunta = PreguntaFrecuente(
+                entrada['clave'], entrada['pregunta'], entrada['respuesta'],
+                f"<b>{entrada['pregunta']}</b><br><br>{entrada['respuesta']}<br><br>¿Necesitas algo más? (sí/no)"
+            )
+            self.preguntas.append(pregunta)
+            self._preguntas_por_intencion[f"pregunta:{pregunta.clave}"] = pregunta
+            self._agregar_intencion(f"pregunta:{pregunta.clave}", entrada.get('frases', {}))
+        self._automata.compilar()
+
+        opciones = "<br>".join(f"{i}. {p.pregunta}" for i, p in enumerate(self.preguntas, start=1))
+        consulta = f"{opciones}<br><br>¿Cuál deseas consultar? (1-{len(self.preguntas)})"
+        self.menu_preguntas = f"Estas son nuestras preguntas frecuentes:<br>{consulta}"
+        self.menu_preguntas_invalido = f"Opción no válida. Estas son nuestras preguntas frecuentes:<br>{consulta}"
+
+    def _agregar_intencion(self, nombre: str, frases: Dict[str, float]):
+        self.intenciones.append(nombre)
+        for frase, peso in frases.items():
+            tokens = normalize_text(frase).split()
+            if tokens:
+                self._automata.agregar(tokens)
+                self._frases.append((len(self.intenciones) - 1, float(peso)))
+
+    @classmethod
+    def cargar(cls, path: str) -> 'MotorIntenciones':
+        with open(path, 'r', encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def _puntajes(self, texto: str) -> Dict[int, float]:
+        puntajes: Dict[int, float] = {}
+        for frase in set(self._automata.buscar(normalize_text(texto).split())):
+            intencion, peso = self._frases[frase]
+            puntajes[intencion] = puntajes.get(intencion, 0.0) + peso
+        return puntajes
+
+    def detectar(self, texto: str) -> str:
+        """Intención de mayor puntaje (en empate, la primera declarada), o 'desconocido'"""
+        puntajes = self._puntajes(texto)
+        mejor = max(puntajes, key=lambda i: (puntajes[i], -i), default=None)
+        if mejor is None or puntajes[mejor] < self.umbral:
+            return 'desconocido'
+        return self.intenciones[mejor]
+
+    def pregunta_por_numero(self, mensaje: str) -> Optional[PreguntaFrecuente]:
+        mensaje = mensaje.strip()
+        if mensaje.isdigit() and 1 <= int(mensaje) <= len(self.preguntas):
+            return self.preguntas[int(mensaje) - 1]
+        return None
+
+    def pregunta_por_intencion(self, intencion: str) -> Optional[PreguntaFrecuente]:
+        return self._preguntas_por_intencion.get(intencion)
+
+class CatalogoIntenciones:
+    """Mantiene intenciones.json cargado y lo recarga si cambia; un archivo inválido conserva el motor vigente"""
+
+    def __init__(self, path: str, intervalo: float):
+        self.path = path
+        self.intervalo = intervalo
+        self.recargas = 0
+        self._actual: Optional[MotorIntenciones] = None
+        self._huella: Optional[Tuple[int, int]] = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+    def obtener(self) -> MotorIntenciones:
+        """Devuelve el motor vigente; como mucho un stat() del archivo cada `intervalo` segundos"""
+        ahora = time.monotonic()
+        actual = self._actual
+        if actual is not None and ahora - self._ultima_revision < self.intervalo:
+            return actual
+
+        if not self._lock.acquire(blocking=actual is None):
+            return actual
+        try:
+            self._ultima_revision = ahora
+            try:
+                huella = huella_archivo(self.path)
+            except OSError:
+                huella = None
+            if self._actual is not None and huella == self._huella:
+                return self._actual
+
+            motor = None
+            if huella is None:
+                print(f"⚠️ Archivo de intenciones no encontrado en {self.path}")
+            else:
+                try:
+                    motor = MotorIntenciones.cargar(self.path)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️ Error cargando {self.path}: {str(e)}")
+            if motor is None:
+                motor = self._actual or MotorIntenciones({})
+            self._actual = motor
+            self._huella = huella
+            self.recargas += 1
+            return self._actual
+        finally:
+            self._lock.release()
+
+catalogo_intenciones = CatalogoIntenciones(INTENCIONES_PATH, INTERVALO_RECARGA_DATABASE)
+
+def detectar_intencion(texto: str) -> str:
+    """Detecta la intención del usuario basado en su mensaje"""
+    return catalogo_intenciones.obtener().detectar(texto)
@@ -0,0 +1,219 @@
+"""Métricas en formato Prometheus, desglose por etapa de cada solicitud y registro de consultas lentas"""
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from epas.configuracion import (
+    BUCKETS_ARCHIVOS, BUCKETS_BYTES, BUCKETS_SEGUNDOS, METRICAS_ACTIVAS, REGISTRO_LENTAS_PATH, UMBRAL_CONSULTA_LENTA
+)
+
+class Metricas:
+    """
+    Contadores e histogramas en memoria con etiquetas, exportados en el formato de texto de
+    Prometheus. Solo se aceptan las métricas declaradas en DEFINICIONES.
+    """
+    DEFINICIONES = {
+        'epas_solicitud_segundos': ('histogram', 'Tiempo de respuesta de /procesar por estado del chatbot', BUCKETS_SEGUNDOS),
+        'epas_etapa_segundos': ('histogram', 'Duración de cada etapa del pipeline (por archivo o por página)', BUCKETS_SEGUNDOS),
+        'epas_archivos_por_consulta': ('histogram', 'Archivos PDF revisados por verificación de documentos', BUCKETS_ARCHIVOS),
+        'epas_trabajo_espera_segundos': ('histogram', 'Espera de una verificación en la cola de trabajos', BUCKETS_SEGUNDOS),
+        'epas_paginas_total': ('counter', 'Páginas extraídas por método (capa de texto u OCR)', None),
+        'epas_ocr_bytes_pagina': ('histogram', 'Bytes de imagen renderizados por página enviada a OCR', BUCKETS_BYTES),
+        'epas_ocr_rerender_total': ('counter', 'Páginas renderizadas de nuevo a DPI_OCR por baja confianza o sin dígitos', None),
+        'epas_ocr_perfil_paginas_total': ('counter', 'Páginas escaneadas por tipo de documento y pasada del perfil de OCR', None),
+        'epas_ocr_perfil_pixeles_total': ('counter', 'Píxeles reconocidos por EasyOCR por tipo de documento', None),
+        'epas_archivos_revisados_total': ('counter', 'Archivos PDF revisados en verificaciones, por tipo de documento', None),
+        'epas_consultas_lentas_total': ('counter', 'Solicitudes por encima del umbral de consulta lenta', None),
+    }
+
+    def __init__(self):
+        self._contadores: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histogramas: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}  # buckets..., suma, cuenta
+        self._lock = threading.Lock()
+
+    def contar(self, nombre: str, valor: float = 1, **etiquetas):
+        if not METRICAS_ACTIVAS:
+            return
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.contar(nombre, valor)
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        if not METRICAS_ACTIVAS:
+            return
+        buckets = self.DEFINICIONES[nombre][2]
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            datos = self._histogramas.get(clave)
+            if datos is None:
+                datos = self._histogramas[clave] = [0] * (len(buckets) + 2)
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    datos[i] += 1
+            datos[-2] += valor
+            datos[-1] += 1
+
+    def exportar(self, extras: List[Tuple[str, str, str, Dict[str, str], float]] = ()) -> str:
+        """Texto para /metrics; `extras` son (nombre, tipo, ayuda, etiquetas, valor) tomados de otros componentes"""
+        def etiquetas_texto(etiquetas) -> str:
+            if not etiquetas:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in etiquetas) + '}'
+
+        lineas = []
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {clave: list(datos) for clave, datos in self._histogramas.items()}
+        for nombre, (tipo, ayuda, buckets) in self.DEFINICIONES.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            if tipo == 'counter':
+                for (n, etiquetas), valor in sorted(contadores.items()):
+                    if n == nombre:
+                        lineas.append(f"{nombre}{etiquetas_texto(etiquetas)} {valor}")
+                continue
+            for (n, etiquetas), datos in sorted(histogramas.items()):
+                if n != nombre:
+                    continue
+                for limite, cuenta in zip(buckets, datos):
+                    lineas.append(f"{nombre}_bucket{etiquetas_texto(etiquetas + (('le', str(limite)),))} {cuenta}")
+                lineas.append(f"{nombre}_bucket{etiquetas_texto(etiquetas + (('le', '+Inf'),))} {datos[-1]}")
+                lineas.append(f"{nombre}_sum{etiquetas_texto(etiquetas)} {datos[-2]}")
+                lineas.append(f"{nombre}_count{etiquetas_texto(etiquetas)} {datos[-1]}")
+
+        declaradas = set()
+        for nombre, tipo, ayuda, etiquetas, valor in extras:
+            if nombre not in declaradas:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                declaradas.add(nombre)
+            lineas.append(f"{nombre}{etiquetas_texto(tuple(sorted(etiquetas.items())))} {valor}")
+        return "\n".join(lineas) + "\n"
+
+metricas = Metricas()
+
+class TrazaSolicitud:
+    """Desglose por etapa de una solicitud (incluidos los hilos que lanza), para el registro de consultas lentas"""
+    MAX_TRAMOS = 1000
+
+    def __init__(self):
+        self.etapas: Dict[str, List[float]] = {}  # etapa -> [segundos, veces]
+        self.contadores: Dict[str, float] = {}
+        self.tramos: List[Tuple[float, str, dict]] = []  # (segundos, etapa, detalle) por archivo o página
+        self.descartados = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, etapa: str, segundos: float, detalle: dict):
+        with self._lock:
+            acumulado = self.etapas.setdefault(etapa, [0.0, 0])
+            acumulado[0] += segundos
+            acumulado[1] += 1
+            if len(self.tramos) < self.MAX_TRAMOS:
+                self.tramos.append((segundos, etapa, detalle))
+            else:
+                self.descartados += 1
+
+    def contar(self, nombre: str, valor: float):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def resumen(self, tramos_lentos: int = 20) -> dict:
+        with self._lock:
+            return {
+                'etapas': {
+                    etapa: {'segundos': round(segundos, 4), 'veces': veces}
+                    for etapa, (segundos, veces) in sorted(self.etapas.items(), key=lambda e: -e[1][0])
+                },
+                'contadores': dict(self.contadores),
+                'tramos_mas_lentos': [
+                    {'etapa': etapa, 'segundos': round(segundos, 4), **detalle}
+                    for segundos, etapa, detalle in sorted(self.tramos, key=lambda t: -t[0])[:tramos_lentos]
+                ],
+                'tramos_descartados': self.descartados
+            }
+
+_traza_actual: contextvars.ContextVar = contextvars.ContextVar('traza_solicitud', default=None)
+
+class _Etapa:
+    __slots__ = ('nombre', 'detalle', 'inicio')
+
+    def __init__(self, nombre: str, detalle: dict):
+        self.nombre = nombre
+        self.detalle = detalle
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        metricas.observar('epas_etapa_segundos', segundos, etapa=self.nombre)
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.agregar(self.nombre, segundos, self.detalle)
+        return False
+
+class _SinMedicion:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_SIN_MEDICION = _SinMedicion()
+
+def etapa(nombre: str, **detalle):
+    """Mide un tramo del pipeline: `with etapa('ocr', archivo=..., pagina=...):`"""
+    if not METRICAS_ACTIVAS:
+        return _SIN_MEDICION
+    return _Etapa(nombre, detalle)
+
+@contextmanager
+def trazar_solicitud() -> Iterator[TrazaSolicitud]:
+    """Activa una traza nueva para la solicitud en curso y los hilos que lance con en_contexto"""
+    traza = TrazaSolicitud()
+    token = _traza_actual.set(traza)
+    try:
+        yield traza
+    finally:
+        _traza_actual.reset(token)
+
+def en_contexto(funcion: Callable) -> Callable:
+    """Envuelve `funcion` para que corra en otro hilo con la traza del hilo actual (una copia por tarea)"""
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcion, *args, **kwargs)
+
+class RegistroConsultasLentas:
+    """Guarda el desglose por etapa de las solicitudes lentas: las últimas en memoria y todas en un JSONL"""
+
+    def __init__(self, path: str, umbral: float, recientes: int = 50):
+        self.path = path
+        self.umbral = umbral
+        self._recientes: deque = deque(maxlen=recientes)
+        self._lock = threading.Lock()
+
+    def registrar(self, entrada: dict):
+        metricas.contar('epas_consultas_lentas_total', estado=entrada['estado'])
+        print(f"🐢 Consulta lenta ({entrada['estado']}): {entrada['segundos']:.2f} s")
+        with self._lock:
+            self._recientes.append(entrada)
+            try:
+                with open(self.path, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir el registro de consultas lentas: {str(e)}")
+
+    def recientes(self) -> List[dict]:
+        with self._lock:
+            return list(self._recientes)
+
+consultas_lentas = RegistroConsultasLentas(REGISTRO_LENTAS_PATH, UMBRAL_CONSULTA_LENTA)
@@ -0,0 +1,788 @@
+"""OCR de páginas escaneadas con EasyOCR: lector, servicio por lotes, render, perfiles y pool de procesos"""
+import json
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from epas.coincidencias import ConsultaDocumentos
+from epas.configuracion import (
+    CONFIANZA_MIN_OCR, DIGITOS_MAX_CANDIDATO, DIGITOS_MIN_CANDIDATO, DIGITOS_OCR, DPI_OCR, DPI_OCR_INICIAL, OCR_LOTE_ESPERA, OCR_LOTE_MAX,
+    OCR_MAX_GLOBAL, OCR_PROCESOS, PAGINAS_EN_MEMORIA, PERFILES_OCR_PATH, PERFILES_OCR_PREDETERMINADOS, SERVICIO_OCR
+)
+from epas.metricas import en_contexto, etapa, metricas
+from epas.texto import normalize_text, proyeccion_digitos
+
+_lector = None
+_lector_lock = threading.Lock()
+estado_lector = {'modelo_cargado': False, 'segundos_carga_modelo': None, 'segundos_arranque': None}
+
+def obtener_lector():
+    """
+    Devuelve el lector de EasyOCR, cargando los modelos la primera vez que se necesita.
+    Importar este módulo (pruebas, preguntas frecuentes, menú) no toca EasyOCR.
+    """
+    global _lector
+    if _lector is None:
+        with _lector_lock:
+            if _lector is None:
+                inicio = time.perf_counter()
+                import easyocr
+                _lector = easyocr.Reader(['es'], gpu=False)
+                estado_lector['modelo_cargado'] = True
+                estado_lector['segundos_carga_modelo'] = time.perf_counter() - inicio
+                print(f"🧠 Modelos de EasyOCR cargados en {estado_lector['segundos_carga_modelo']:.2f} s")
+    return _lector
+
+def precalentar_ocr() -> dict:
+    """
+    Carga los modelos de EasyOCR por adelantado. Llamado en el proceso padre antes de crear los
+    workers (p. ej. gunicorn --preload con EPAS_PRECARGAR_OCR=1), la memoria de los modelos se
+    comparte copy-on-write entre los procesos hijos.
+    """
+    obtener_lector()
+    return dict(estado_lector)
+
+class ServicioOCR:
+    """
+    Hilo dueño del modelo de EasyOCR. Recibe por una cola las páginas de todas las consultas e
+    ingestas en curso y las reconoce en lotes de hasta `lote_max` imágenes del mismo tamaño,
+    esperando como mucho `espera_max` segundos a que se llene cada lote (las páginas con lista de
+    caracteres permitidos van en lotes aparte). También hace las pasadas de solo detección de los
+    perfiles, para que ningún otro hilo use el modelo. Cada llamador recibe el resultado de su
+    página por un Future. Funciona igual en CPU.
+    """
+
+    def __init__(self, lote_max: int, espera_max: float):
+        self.lote_max = max(1, lote_max)
+        self.espera_max = espera_max
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.paginas = 0
+        self.detecciones = 0
+        self.segundos_ocupado = 0.0
+        self.errores = 0
+
+    def _encolar(self, tarea: str, imagen: np.ndarray, allowlist: Optional[str] = None):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._trabajar, name='servicio-ocr', daemon=True)
+                self._hilo.start()
+        futuro: Future = Future()
+        self._cola.put((tarea, imagen, allowlist, futuro))
+        return futuro.result()
+
+    def reconocer(self, imagen: np.ndarray, allowlist: Optional[str] = None) -> list:
+        """Resultado de readtext (detalle con confianza) para una imagen; bloquea hasta que su lote termina"""
+        return self._encolar('reconocer', imagen, allowlist)
+
+    def detectar(self, imagen: np.ndarray) -> tuple:
+        """Resultado de detect (cajas horizontales y libres) para una imagen; bloquea hasta que se procesa"""
+        return self._encolar('detectar', imagen)
+
+    def _recolectar(self) -> list:
+        """Espera una página y junta las que lleguen hasta llenar el lote o agotar la espera"""
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.espera_max
+        while len(lote) < self.lote_max:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _trabajar(self):
+        while True:
+            # EasyOCR solo apila en un lote imágenes del mismo tamaño y con la misma lista de caracteres
+            por_forma: Dict[Tuple[str, Tuple[int, ...], Optional[str]], list] = {}
+            for tarea, imagen, allowlist, futuro in self._recolectar():
+                por_forma.setdefault((tarea, imagen.shape, allowlist), []).append((imagen, futuro))
+            for (tarea, _, allowlist), solicitudes in por_forma.items():
+                if tarea == 'detectar':
+                    self._detectar(solicitudes)
+                else:
+                    self._procesar(solicitudes, allowlist)
+
+    def _detectar(self, solicitudes: list):
+        """Pasadas de solo detección, una imagen a la vez: son baratas y no se agrupan"""
+        inicio = time.perf_counter()
+        for imagen, futuro in solicitudes:
+            try:
+                futuro.set_result(obtener_lector().detect(imagen))
+            except Exception as e:
+                with self._lock:
+                    self.errores += 1
+                futuro.set_exception(e)
+        with self._lock:
+            self.detecciones += len(solicitudes)
+            self.segundos_ocupado += time.perf_counter() - inicio
+
+    def _procesar(self, solicitudes: list, allowlist: Optional[str] = None):
+        inicio = time.perf_counter()
+        try:
+            lector = obtener_lector()
+            imagenes = [imagen for imagen, _ in solicitudes]
+            if len(imagenes) > 1 and hasattr(lector, 'readtext_batched'):
+                resultados = lector.readtext_batched(
+                    imagenes, paragraph=False, batch_size=self.lote_max, allowlist=allowlist
+                )
+            else:
+                resultados = [lector.readtext(imagen, paragraph=False, allowlist=allowlist) for imagen in imagenes]
+        except Exception as e:
+            with self._lock:
+                self.errores += 1
+            for _, futuro in solicitudes:
+                futuro.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self.lotes += 1
+                self.paginas += len(solicitudes)
+                self.segundos_ocupado += time.perf_counter() - inicio
+        for (_, futuro), resultado in zip(solicitudes, resultados):
+            futuro.set_result(resultado)
+
+    def estadisticas(self) -> dict:
+        """Lotes, páginas, páginas por segundo de modelo ocupado y llenado medio de los lotes"""
+        with self._lock:
+            return {
+                'lote_max': self.lote_max,
+                'espera_max': self.espera_max,
+                'en_cola': self._cola.qsize(),
+                'lotes': self.lotes,
+                'paginas': self.paginas,
+                'detecciones': self.detecciones,
+                'errores': self.errores,
+                'segundos_ocupado': round(self.segundos_ocupado, 3),
+                'paginas_por_segundo': round(self.paginas / self.segundos_ocupado, 2) if self.segundos_ocupado else 0.0,
+                'llenado_lote': round(self.paginas / (self.lotes * self.lote_max), 3) if self.lotes else 0.0,
+            }
+
+servicio_ocr = ServicioOCR(OCR_LOTE_MAX, OCR_LOTE_ESPERA)
+
+def reconocer(imagen: np.ndarray, allowlist: Optional[str] = None) -> Tuple[str, float]:
+    """
+    Texto y confianza media (ponderada por caracteres) de EasyOCR sobre una imagen en escala de
+    grises o RGB; con `allowlist` el reconocedor solo puede leer esos caracteres. Los errores de
+    EasyOCR se propagan: una página sin leer no es una página en blanco
+    """
+    # En los procesos del pool de OCR cada proceso tiene su lector: no hay nada que agrupar
+    if SERVICIO_OCR and OCR_PROCESOS <= 0:
+        results = servicio_ocr.reconocer(imagen, allowlist)
+    else:
+        results = obtener_lector().readtext(imagen, paragraph=False, allowlist=allowlist)
+    caracteres = sum(len(result[1]) for result in results)
+    if not caracteres:
+        return "", 0.0
+    confianza = sum(float(result[2]) * len(result[1]) for result in results) / caracteres
+    return "\n".join(result[1] for result in results), confianza
+
+def extract_text_with_easyocr(image) -> str:
+    """Extrae texto de una imagen (PIL o matriz de NumPy, sin copiarla) usando EasyOCR"""
+    try:
+        return reconocer(np.asarray(image))[0]
+    except Exception as e:
+        print(f"⚠️ Error en EasyOCR: {str(e)}")
+        return ""
+
+# MuPDF no es thread-safe ni siquiera con un documento por hilo: toda llamada a fitz de los hilos de
+# un proceso (capa de texto, render, apertura y cierre) pasa por este lock; el OCR queda fuera
+bloqueo_fitz = threading.RLock()
+
+@contextmanager
+def abrir_pdf(pdf_path: str) -> Iterator[fitz.Document]:
+    """Abre un PDF con fitz y lo cierra, ambas cosas bajo bloqueo_fitz"""
+    with bloqueo_fitz:
+        doc = fitz.open(pdf_path)
+    try:
+        yield doc
+    finally:
+        with bloqueo_fitz:
+            doc.close()
+
+def recorte_pagina(page, region: Optional[Tuple[float, float, float, float]]) -> Optional[fitz.Rect]:
+    """Rectángulo de la página que corresponde a `region` (fracciones de su ancho y alto), o None para toda"""
+    if region is None:
+        return None
+    rect = page.rect
+    x0, y0, x1, y1 = region
+    return fitz.Rect(rect.x0 + x0 * rect.width, rect.y0 + y0 * rect.height,
+                     rect.x0 + x1 * rect.width, rect.y0 + y1 * rect.height)
+
+def renderizar_gris(page, dpi: int,
+                    region: Optional[Tuple[float, float, float, float]] = None) -> Tuple[fitz.Pixmap, np.ndarray]:
+    """
+    Renderiza una página (o solo su `region`) en escala de grises. La matriz es una vista sobre el
+    buffer del pixmap, sin copias intermedias: el pixmap debe seguir vivo mientras se use la matriz.
+    """
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=recorte_pagina(page, region))
+    imagen = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    return pix, imagen
+
+def renderizar_pagina(doc: fitz.Document, numero: int, dpi: int,
+                      region: Optional[Tuple[float, float, float, float]] = None) -> Tuple[fitz.Pixmap, np.ndarray]:
+    """renderizar_gris de la página `numero` de `doc`, bajo bloqueo_fitz"""
+    with bloqueo_fitz:
+        return renderizar_gris(doc[numero], dpi, region)
+
+class ResultadoOCR(NamedTuple):
+    """Texto de una página por OCR, con la resolución usada y lo que costó"""
+    texto: str
+    confianza: float
+    dpi: int
+    bytes: int  # bytes de imagen renderizados para la página (ambas resoluciones si hubo segundo intento)
+    segundos: float  # tiempo de EasyOCR, sin el render
+    rerenderizada: bool
+    pixeles: int = 0  # píxeles que pasaron por el reconocedor, sumando todas las pasadas
+    vacia: bool = False  # la detección no encontró texto y la página no se reconoció
+    fallida: bool = False  # EasyOCR falló: la página queda pendiente y no se guarda como leída
+
+    def describir(self) -> str:
+        if self.fallida:
+            return "error de OCR, queda pendiente"
+        if self.vacia:
+            return f"en blanco según la detección, {self.segundos:.2f} s"
+        resolucion = f"{DPI_OCR_INICIAL}→{self.dpi} dpi" if self.rerenderizada else f"{self.dpi} dpi"
+        return (f"{resolucion}, {self.bytes / (1024 * 1024):.1f} MB, {self.pixeles / 1e6:.1f} Mpx, "
+                f"OCR {self.segundos:.2f} s, confianza {self.confianza:.0%}")
+
+class PerfilOCR(NamedTuple):
+    """
+    Cómo se hace el OCR de un tipo de documento. La pasada dirigida lee solo las primeras
+    `max_paginas` páginas del PDF y, de cada una, solo `region` (x0, y0, x1, y1 en fracciones del
+    ancho y alto de la página). Con `detectar_vacias` las páginas en las que el detector no
+    encuentra texto no se reconocen; con `pasada_digitos` las que no dejan un número candidato a
+    cédula se releen permitiendo solo dígitos. Si lo que leyó la pasada dirigida no tiene ningún
+    número candidato (ver numeros_candidatos), se hace OCR de página completa de todas las páginas
+    escaneadas. Solo lo usan las consultas: lo que el perfil no leyó queda pendiente para la ingesta.
+    """
+    max_paginas: Optional[int] = None
+    region: Optional[Tuple[float, float, float, float]] = None
+    pasada_digitos: bool = False
+    detectar_vacias: bool = False
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> 'PerfilOCR':
+        desconocidas = set(datos) - set(cls._fields)
+        if desconocidas:
+            raise ValueError(f"claves desconocidas: {', '.join(sorted(desconocidas))}")
+        max_paginas = datos.get('max_paginas')
+        if max_paginas is not None and (isinstance(max_paginas, bool) or not isinstance(max_paginas, int)
+                                        or max_paginas < 1):
+            raise ValueError("max_paginas debe ser un entero positivo o null")
+        region = datos.get('region')
+        if region is not None:
+            region = tuple(float(v) for v in region)
+            if len(region) != 4 or not (0 <= region[0] < region[2] <= 1 and 0 <= region[1] < region[3] <= 1):
+                raise ValueError("region debe ser [x0, y0, x1, y1] en fracciones de la página, con x0 < x1 y y0 < y1")
+        return cls(max_paginas, region, bool(datos.get('pasada_digitos', False)),
+                   bool(datos.get('detectar_vacias', False)))
+
+    def describir(self) -> str:
+        partes = [f"primeras {self.max_paginas} página(s)" if self.max_paginas else "todas las páginas"]
+        if self.region:
+            x0, y0, x1, y1 = self.region
+            partes.append(f"región x {x0:.0%}–{x1:.0%}, y {y0:.0%}–{y1:.0%}")
+        else:
+            partes.append("página completa")
+        if self.pasada_digitos:
+            partes.append("pasada de solo dígitos")
+        if self.detectar_vacias:
+            partes.append("omite páginas en blanco")
+        return ", ".join(partes)
+
+def cargar_perfiles_ocr(path: str) -> Dict[str, PerfilOCR]:
+    """
+    Perfiles de OCR por tipo: los predeterminados, reemplazados por los que defina `path`.
+    Un tipo en null (o sin perfil) usa el OCR genérico de todas sus páginas escaneadas.
+    """
+    datos = dict(PERFILES_OCR_PREDETERMINADOS)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                datos.update(json.load(file))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Error cargando {path}: {str(e)}; se usan los perfiles de OCR predeterminados")
+    perfiles = {}
+    for tipo, valor in datos.items():
+        if valor is None:
+            continue
+        try:
+            perfiles[tipo] = PerfilOCR.desde_dict(valor)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"⚠️ Perfil de OCR inválido para '{tipo}': {str(e)}; se usa el OCR genérico")
+    return perfiles
+
+# Por nombre del directorio del tipo de documento
+PERFILES_OCR = cargar_perfiles_ocr(PERFILES_OCR_PATH)
+
+def _valor_ocr(texto: str, confianza: float) -> Tuple[bool, float]:
+    """Para comparar dos lecturas: primero si tienen dígitos candidatos a cédula, luego la confianza"""
+    return len(proyeccion_digitos(normalize_text(texto))) >= DIGITOS_MIN_CANDIDATO, confianza
+
+# Números de uno o más grupos de dígitos separados por un espacio ('1032 508 266'), en el texto normalizado
+PATRON_GRUPO_DIGITOS = re.compile(r'\d+(?: \d+)*')
+# El número de ficha del programa va después de la palabra "ficha" (p. ej. "ficha no 2758344")
+PATRON_FICHA_ANTES = re.compile(r'ficha(?: [a-z]+){0,3} $')
+# normalize_text quita las barras: '12/03/2024' queda como '12032024'
+PATRON_FECHA = re.compile(r'(?:0[1-9]|[12]\d|3[01])(?:0[1-9]|1[0-2])(?:19|20)\d\d|(?:19|20)\d\d(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])')
+
+def numeros_candidatos(norm_text: str) -> Iterator[str]:
+    """
+    Números del texto normalizado que pueden ser una cédula: grupos seguidos de dígitos que juntan
+    entre DIGITOS_MIN_CANDIDATO y DIGITOS_MAX_CANDIDATO dígitos sin partir ningún grupo y que no son
+    el número de la ficha ni una fecha. Más estricto que la proyección de dígitos, que junta los
+    números cortos de todo el texto (fechas, códigos de formato)
+    """
+    for grupo in PATRON_GRUPO_DIGITOS.finditer(norm_text):
+        inicio = grupo.start()
+        partes = grupo.group().split(' ')
+        for i, parte in enumerate(partes):
+            if not PATRON_FICHA_ANTES.search(norm_text, max(0, inicio - 40), inicio):
+                digitos = 0
+                for j in range(i, len(partes)):
+                    digitos += len(partes[j])
+                    if digitos > DIGITOS_MAX_CANDIDATO:
+                        break
+                    if digitos >= DIGITOS_MIN_CANDIDATO:
+                        numero = "".join(partes[i:j + 1])
+                        if not PATRON_FECHA.fullmatch(numero):
+                            yield numero
+            inicio += len(parte) + 1
+
+def tiene_numero_candidato(texto: str) -> bool:
+    """Si el texto tiene un número que puede ser una cédula (ver numeros_candidatos)"""
+    return next(numeros_candidatos(normalize_text(texto)), None) is not None
+
+def _agregar_digitos(resultado: ResultadoOCR, imagen: np.ndarray) -> ResultadoOCR:
+    """Si la lectura no deja un número candidato a cédula, agrega la de `imagen` con solo dígitos"""
+    if tiene_numero_candidato(resultado.texto):
+        return resultado
+    # EasyOCR suele leer dígitos como letras (0→O, 1→l...): releer permitiendo solo dígitos
+    inicio = time.perf_counter()
+    digitos, _ = reconocer(imagen, DIGITOS_OCR)
+    return resultado._replace(
+        texto="\n".join(t for t in (resultado.texto, digitos) if t),
+        segundos=resultado.segundos + time.perf_counter() - inicio,
+        pixeles=resultado.pixeles + imagen.size,
+    )
+
+def ocr_adaptativo(imagen: np.ndarray, dpi: int, renderizar_alta: Callable[[], Tuple[fitz.Pixmap, np.ndarray]],
+                   memoria: Optional['MemoriaPaginas'] = None, pasada_digitos: bool = False) -> ResultadoOCR:
+    """
+    OCR de una página ya renderizada a `dpi`. Si la lectura tiene confianza baja o ningún dígito
+    candidato, se renderiza de nuevo a DPI_OCR con `renderizar_alta` y se conserva la mejor lectura.
+    Con `pasada_digitos` la relectura de solo dígitos usa la imagen de mayor resolución renderizada.
+    """
+    tamano = imagen.nbytes
+    pixeles = imagen.size
+    inicio = time.perf_counter()
+    texto, confianza = reconocer(imagen)
+    segundos = time.perf_counter() - inicio
+    con_digitos, _ = _valor_ocr(texto, confianza)
+    if dpi >= DPI_OCR or (con_digitos and confianza >= CONFIANZA_MIN_OCR):
+        resultado = ResultadoOCR(texto, confianza, dpi, tamano, segundos, False, pixeles)
+        return _agregar_digitos(resultado, imagen) if pasada_digitos else resultado
+
+    pix, alta = renderizar_alta()
+    if memoria:
+        memoria.reservar(alta.nbytes)
+    try:
+        tamano += alta.nbytes
+        pixeles += alta.size
+        inicio = time.perf_counter()
+        texto_alta, confianza_alta = reconocer(alta)
+        segundos += time.perf_counter() - inicio
+        if _valor_ocr(texto_alta, confianza_alta) >= _valor_ocr(texto, confianza):
+            texto, confianza, dpi = texto_alta, confianza_alta, DPI_OCR
+        resultado = ResultadoOCR(texto, confianza, dpi, tamano, segundos, True, pixeles)
+        return _agregar_digitos(resultado, alta) if pasada_digitos else resultado
+    finally:
+        if memoria:
+            memoria.liberar(alta.nbytes)
+        del alta, pix
+
+def pagina_vacia(imagen: np.ndarray) -> bool:
+    """
+    Pasada de solo detección, sin reconocer, sobre la página a la mitad de resolución: True si el
+    detector de EasyOCR no encuentra ninguna caja de texto. Ante un error la página se reconoce.
+    """
+    reducida = np.ascontiguousarray(imagen[::2, ::2])
+    try:
+        # Como el reconocimiento: por el servicio, dueño del modelo, salvo en los procesos del pool
+        if SERVICIO_OCR and OCR_PROCESOS <= 0:
+            horizontales, libres = servicio_ocr.detectar(reducida)
+        else:
+            horizontales, libres = obtener_lector().detect(reducida)
+    except Exception as e:
+        print(f"⚠️ Error en la detección de EasyOCR: {str(e)}")
+        return False
+    return not any(horizontales) and not any(libres)
+
+def ocr_perfilado(imagen: np.ndarray, dpi: int, renderizar_alta: Callable[[], Tuple[fitz.Pixmap, np.ndarray]],
+                  perfil: Optional[PerfilOCR], memoria: Optional['MemoriaPaginas'] = None) -> ResultadoOCR:
+    """
+    OCR adaptativo de una página según el perfil de su tipo: primero descarta las páginas en
+    blanco y, si la lectura no deja un número candidato a cédula, agrega la de solo dígitos
+    """
+    segundos = 0.0
+    if perfil and perfil.detectar_vacias:
+        inicio = time.perf_counter()
+        vacia = pagina_vacia(imagen)
+        segundos = time.perf_counter() - inicio
+        if vacia:
+            return ResultadoOCR("", 0.0, dpi, imagen.nbytes, segundos, False, 0, True)
+
+    resultado = ocr_adaptativo(imagen, dpi, renderizar_alta, memoria, bool(perfil and perfil.pasada_digitos))
+    return resultado._replace(segundos=resultado.segundos + segundos)
+
+class MemoriaPaginas:
+    """
+    Contabiliza los bytes de las páginas renderizadas que siguen vivas y su pico, y el total
+    renderizado y el tiempo de OCR de las páginas que pasaron por EasyOCR
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.actual = 0
+        self.pico = 0
+        self.paginas_ocr = 0
+        self.bytes_ocr = 0
+        self.segundos_ocr = 0.0
+        self.rerenderizadas = 0
+        self.pixeles_ocr = 0
+        self.vacias = 0
+
+    def registrar_ocr(self, resultado: ResultadoOCR):
+        with self._lock:
+            self.paginas_ocr += not resultado.vacia
+            self.vacias += resultado.vacia
+            self.bytes_ocr += resultado.bytes
+            self.pixeles_ocr += resultado.pixeles
+            self.segundos_ocr += resultado.segundos
+            self.rerenderizadas += resultado.rerenderizada
+        metricas.observar('epas_ocr_bytes_pagina', resultado.bytes)
+        if resultado.rerenderizada:
+            metricas.contar('epas_ocr_rerender_total')
+
+    def describir_ocr(self) -> str:
+        vacias = f" y {self.vacias} en blanco" if self.vacias else ""
+        return (f"{self.paginas_ocr} página(s){vacias}, {self.pixeles_ocr / 1e6:.1f} Mpx reconocidos, "
+                f"{self.bytes_ocr / (1024 * 1024):.1f} MB renderizados, "
+                f"{self.segundos_ocr:.2f} s de OCR, {self.rerenderizadas} a {DPI_OCR} dpi")
+
+    def reservar(self, tamano: int):
+        with self._lock:
+            self.actual += tamano
+            self.pico = max(self.pico, self.actual)
+
+    def liberar(self, tamano: int):
+        with self._lock:
+            self.actual -= tamano
+
+def iterar_paginas(pdf_path: str, numeros: Optional[List[int]] = None, memoria: Optional[MemoriaPaginas] = None,
+                   dpi: int = DPI_OCR, region: Optional[Tuple[float, float, float, float]] = None,
+                   cancelado: Optional[threading.Event] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Renderiza las páginas de un PDF una a una (todas, o solo `numeros`; enteras, o solo `region`)
+    en escala de grises, en un hilo productor; cada página es una vista de NumPy sobre su pixmap,
+    válida hasta pedir la siguiente.
+    Como máximo quedan PAGINAS_EN_MEMORIA páginas en espera, además de la que se está renderizando
+    y la que procesa el consumidor. Al cerrar el generador (o al activarse `cancelado`) se detiene
+    el render y se cierra el PDF.
+    """
+    cola: queue.Queue = queue.Queue(maxsize=max(1, PAGINAS_EN_MEMORIA))
+    detener = threading.Event()
+    fin = object()
+
+    def poner(item) -> bool:
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producir():
+        try:
+            with abrir_pdf(pdf_path) as doc:
+                for numero in (numeros if numeros is not None else range(doc.page_count)):
+                    if detener.is_set() or (cancelado is not None and cancelado.is_set()):
+                        return
+                    with etapa('pdf.render', archivo=os.path.basename(pdf_path), pagina=numero, dpi=dpi):
+                        pix, image = renderizar_pagina(doc, numero, dpi, region)
+                    tamano = image.nbytes
+                    if memoria:
+                        memoria.reservar(tamano)
+                    if not poner((numero, pix, image, tamano)):
+                        if memoria:
+                            memoria.liberar(tamano)
+                        return
+        except Exception as e:
+            poner(e)
+        finally:
+            poner(fin)
+
+    productor = threading.Thread(target=en_contexto(producir), name='render-pdf', daemon=True)
+    productor.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is fin:
+                break
+            if isinstance(item, Exception):
+                raise item
+            numero, pix, image, tamano = item
+            try:
+                yield numero, image
+            finally:
+                del image, pix
+                if memoria:
+                    memoria.liberar(tamano)
+    finally:
+        detener.set()
+        productor.join()
+        # Liberar las páginas que quedaron en espera si el consumidor salió antes
+        while not cola.empty():
+            item = cola.get_nowait()
+            if memoria and isinstance(item, tuple):
+                memoria.liberar(item[3])
+
+def pdf_to_images(pdf_path: str) -> List[Image.Image]:
+    """Convierte PDF a imágenes (escala de grises, DPI_OCR) usando PyMuPDF"""
+    try:
+        return [Image.fromarray(image) for _, image in iterar_paginas(pdf_path)]
+    except Exception as e:
+        print(f"⚠️ Error al convertir PDF a imágenes: {str(e)}")
+        return []
+
+class UsoPerfilesOCR:
+    """
+    Trabajo de OCR por tipo de documento desde el arranque, para comparar perfiles: páginas
+    escaneadas de los PDF extraídos, cuántas se leyeron en la pasada dirigida y cuántas a página
+    completa, cuántas estaban en blanco, cuántas quedaron pendientes por estar fuera del perfil y
+    los píxeles reconocidos
+    """
+    CAMPOS = ('documentos', 'respaldos', 'paginas_escaneadas', 'dirigidas', 'completas', 'vacias', 'omitidas', 'pixeles')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_tipo: Dict[str, Dict[str, int]] = {}
+
+    def registrar(self, tipo: str, uso: Dict[str, int]):
+        """Suma el OCR de un PDF; `uso` tiene los CAMPOS salvo 'documentos'"""
+        with self._lock:
+            acumulado = self._por_tipo.setdefault(tipo, dict.fromkeys(self.CAMPOS, 0))
+            acumulado['documentos'] += 1
+            for campo in self.CAMPOS[1:]:
+                acumulado[campo] += uso[campo]
+        for pasada in ('dirigidas', 'completas', 'vacias', 'omitidas'):
+            if uso[pasada]:
+                metricas.contar('epas_ocr_perfil_paginas_total', uso[pasada], tipo=tipo, pasada=pasada)
+        metricas.contar('epas_ocr_perfil_pixeles_total', uso['pixeles'], tipo=tipo)
+
+    def estadisticas(self) -> dict:
+        """Contadores por tipo, con las páginas reconocidas y los megapíxeles por documento"""
+        with self._lock:
+            return {
+                tipo: {
+                    **uso,
+                    'perfil': PERFILES_OCR[tipo].describir() if tipo in PERFILES_OCR else None,
+                    'paginas_por_documento': round((uso['dirigidas'] + uso['completas']) / uso['documentos'], 2),
+                    'mpx_por_documento': round(uso['pixeles'] / 1e6 / uso['documentos'], 2),
+                }
+                for tipo, uso in self._por_tipo.items()
+            }
+
+uso_perfiles_ocr = UsoPerfilesOCR()
+
+class ControlOCR:
+    """
+    Cancelación, cupo de páginas en OCR simultáneas y memoria de páginas del trabajo de una consulta.
+    Con `consulta`, el OCR de un PDF se detiene en cuanto aparecen la cédula y el nombre.
+    """
+
+    def __init__(self, cupo: Optional[threading.Semaphore] = None, consulta: Optional['ConsultaDocumentos'] = None,
+                 memoria: Optional[MemoriaPaginas] = None, progreso: Optional[Callable[[str], None]] = None):
+        self.cancelado = threading.Event()
+        self.cupo = cupo
+        self.consulta = consulta
+        self.memoria = memoria or MemoriaPaginas()
+        self.progreso = progreso
+        self.archivos_revisados = 0
+        self._lock = threading.Lock()
+        self.paginas_ocr = 0
+        self.vacias = 0
+        self.pixeles_ocr = 0
+
+    def registrar_ocr(self, resultado: ResultadoOCR):
+        """Suma una página al trabajo de OCR de este control y a la memoria compartida"""
+        with self._lock:
+            self.paginas_ocr += not resultado.vacia
+            self.vacias += resultado.vacia
+            self.pixeles_ocr += resultado.pixeles
+        self.memoria.registrar_ocr(resultado)
+
+    def describir_ocr(self) -> str:
+        vacias = f" y {self.vacias} en blanco" if self.vacias else ""
+        return f"{self.paginas_ocr} página(s){vacias}, {self.pixeles_ocr / 1e6:.1f} Mpx reconocidos"
+
+# Cupo global de páginas en OCR simultáneas, compartido por todas las consultas y la ingesta
+_cupo_ocr_global = threading.BoundedSemaphore(OCR_MAX_GLOBAL)
+_pool_ocr: Optional[ProcessPoolExecutor] = None
+_pool_ocr_lock = threading.Lock()
+
+def _iniciar_worker_ocr():
+    """
+    Inicializa un proceso del pool de OCR: un hilo de torch por proceso para no sobresuscribir,
+    y su propio lector de EasyOCR cargado antes de recibir la primera página
+    """
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    obtener_lector()
+
+def obtener_pool_ocr() -> Optional[ProcessPoolExecutor]:
+    """Devuelve el pool de procesos de OCR (creado al primer uso), o None si está deshabilitado"""
+    global _pool_ocr
+    if OCR_PROCESOS <= 0:
+        return None
+    with _pool_ocr_lock:
+        if _pool_ocr is None:
+            # spawn: cada proceso carga su propio Reader sin heredar hilos del servidor
+            _pool_ocr = ProcessPoolExecutor(
+                max_workers=OCR_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_iniciar_worker_ocr
+            )
+        return _pool_ocr
+
+def _ocr_pagina_en_proceso(pdf_path: str, numero: int, perfil: Optional[PerfilOCR] = None) -> ResultadoOCR:
+    """Renderiza y hace OCR (adaptativo, según el perfil) de una página; se ejecuta dentro de un proceso del pool"""
+    region = perfil.region if perfil else None
+    with abrir_pdf(pdf_path) as doc:
+        pix, image = renderizar_pagina(doc, numero, DPI_OCR_INICIAL, region)
+        return ocr_perfilado(image, DPI_OCR_INICIAL, lambda: renderizar_pagina(doc, numero, DPI_OCR, region), perfil)
+
+def _bytes_pagina(page, dpi: int, region: Optional[Tuple[float, float, float, float]] = None) -> int:
+    """Tamaño estimado del buffer en escala de grises de una página (o de su `region`) renderizada a `dpi`"""
+    rect = recorte_pagina(page, region) or page.rect
+    escala = dpi / 72
+    return int(rect.width * escala) * int(rect.height * escala)
+
+def _adquirir_cupos(control: Optional[ControlOCR]) -> bool:
+    """Reserva el cupo global y el de la consulta; False si la consulta se canceló mientras esperaba"""
+    semaforos = [_cupo_ocr_global] + ([control.cupo] if control and control.cupo else [])
+    adquiridos = []
+    for semaforo in semaforos:
+        while not semaforo.acquire(timeout=0.1):
+            if control and control.cancelado.is_set():
+                for adquirido in adquiridos:
+                    adquirido.release()
+                return False
+        adquiridos.append(semaforo)
+    return True
+
+def _liberar_cupos(control: Optional[ControlOCR]):
+    _cupo_ocr_global.release()
+    if control and control.cupo:
+        control.cupo.release()
+
+class ExtraccionCancelada(Exception):
+    """La consulta que pidió la extracción ya no la necesita"""
+
+def ocr_paginas(pdf_path: str, numeros: List[int], control: Optional[ControlOCR] = None,
+                 perfil: Optional[PerfilOCR] = None) -> Iterator[Tuple[int, ResultadoOCR]]:
+    """
+    Genera (número de página, resultado del OCR) para las páginas `numeros`, en orden, renderizando
+    bajo demanda a DPI_OCR_INICIAL y a DPI_OCR solo las páginas que lo necesitan; con `perfil`,
+    solo su región de cada página y con sus pasadas (ver ocr_perfilado).
+    Lanza ExtraccionCancelada si la consulta se cancela; cerrar el generador detiene el trabajo pendiente.
+    """
+    memoria = control.memoria if control else None
+    region = perfil.region if perfil else None
+    pool = obtener_pool_ocr()
+    if pool is None:
+        # Los segundos renders se hacen en este hilo, con su propio documento y también bajo bloqueo_fitz
+        cancelado = control.cancelado if control else None
+        with closing(iterar_paginas(pdf_path, numeros, memoria, DPI_OCR_INICIAL, region, cancelado)) as paginas, \
+                abrir_pdf(pdf_path) as doc:
+            for numero, image in paginas:
+                # Con cupos libres _adquirir_cupos no espera: la cancelación se revisa antes de cada página
+                if (cancelado is not None and cancelado.is_set()) or not _adquirir_cupos(control):
+                    raise ExtraccionCancelada(pdf_path)
+                try:
+                    with etapa('ocr', archivo=os.path.basename(pdf_path), pagina=numero):
+                        resultado = ocr_perfilado(
+                            image, DPI_OCR_INICIAL, lambda: renderizar_pagina(doc, numero, DPI_OCR, region),
+                            perfil, memoria
+                        )
+                except Exception as e:
+                    print(f"⚠️ Error en EasyOCR en la página {numero} de {pdf_path}: {str(e)}")
+                    resultado = ResultadoOCR("", 0.0, DPI_OCR_INICIAL, image.nbytes, 0.0, False, fallida=True)
+                finally:
+                    _liberar_cupos(control)
+                del image
+                if control and not resultado.fallida:
+                    control.registrar_ocr(resultado)
+                yield numero, resultado
+        return
+
+    with abrir_pdf(pdf_path) as doc, bloqueo_fitz:
+        tamanos = {numero: _bytes_pagina(doc[numero], DPI_OCR_INICIAL, region) for numero in numeros}
+
+    # Como mucho PAGINAS_EN_MEMORIA páginas de este PDF en vuelo en el pool
+    en_vuelo = deque()
+    restantes = deque(numeros)
+    try:
+        while restantes or en_vuelo:
+            while restantes and len(en_vuelo) < max(1, PAGINAS_EN_MEMORIA):
+                if (control and control.cancelado.is_set()) or not _adquirir_cupos(control):
+                    raise ExtraccionCancelada(pdf_path)
+                siguiente = restantes.popleft()
+                if memoria:
+                    memoria.reservar(tamanos[siguiente])
+
+                def al_terminar(_, tamano=tamanos[siguiente]):
+                    _liberar_cupos(control)
+                    if memoria:
+                        memoria.liberar(tamano)
+
+                futuro = pool.submit(_ocr_pagina_en_proceso, pdf_path, siguiente, perfil)
+                futuro.add_done_callback(al_terminar)
+                en_vuelo.append((siguiente, futuro))
+
+            numero, futuro = en_vuelo.popleft()
+            try:
+                # En el pool el render y el OCR ocurren en el proceso hijo: se mide la espera del resultado
+                with etapa('ocr.pool', archivo=os.path.basename(pdf_path), pagina=numero):
+                    resultado = futuro.result()
+            except Exception as e:
+                print(f"⚠️ Error en el pool de OCR para {pdf_path}: {str(e)}")
+                resultado = ResultadoOCR("", 0.0, DPI_OCR_INICIAL, tamanos[numero], 0.0, False, fallida=True)
+            if control and not resultado.fallida:
+                control.registrar_ocr(resultado)
+            yield numero, resultado
+            if control and control.cancelado.is_set():
+                raise ExtraccionCancelada(pdf_path)
+    finally:
+        for _, futuro in en_vuelo:
+            futuro.cancel()
@@ -0,0 +1,213 @@
+"""Reporte de cumplimiento de documentos de todo el roster (`python web_app.py report`)"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from typing import Dict, List, Tuple
+
+from epas import configuracion
+from epas.aprendices import Aprendiz, load_database
+from epas.cache import DocumentoExtraido
+from epas.coincidencias import ConsultaDocumentos, VariantesNombre, buscar_aproximado
+from epas.configuracion import OCR_MAX_GLOBAL, TIPOS_DOCUMENTO
+from epas.extraccion import extraer_documento
+from epas.texto import PATRON_CLAVE_CEDULA
+
+class ComparadorRoster:
+    """
+    Busca a la vez a todos los aprendices de una lista en un documento extraído, con los mismos
+    criterios que ConsultaDocumentos.buscar: cédulas por ventanas de la proyección de dígitos
+    (una búsqueda en diccionario por ventana y longitud; Myers solo para quienes tienen un bloque
+    intacto de la cédula), "palabra clave + últimos 4 dígitos" y al menos dos partes del nombre
+    presentes (exactas o a un error), contadas desde los tokens del documento.
+    """
+
+    def __init__(self, aprendices: List[Aprendiz]):
+        self.aprendices = aprendices
+        self._por_cedula: Dict[str, List[int]] = {}
+        self._por_ultimos4: Dict[str, List[int]] = {}
+        self._por_token: Dict[str, List[Tuple[int, int]]] = {}  # token -> [(aprendiz, repeticiones)]
+        self._por_bloque: Dict[str, List[int]] = {}
+        self._variantes = VariantesNombre()
+        self._consultas = [ConsultaDocumentos(a.documento, a.nombre_completo) for a in aprendices]
+        for i, consulta in enumerate(self._consultas):
+            if consulta.clean_cedula:
+                self._por_cedula.setdefault(consulta.clean_cedula, []).append(i)
+                if consulta.ultimos_digitos:
+                    self._por_ultimos4.setdefault(consulta.ultimos_digitos, []).append(i)
+            for bloque in consulta.bloques_cedula:
+                self._por_bloque.setdefault(bloque, []).append(i)
+            if len(consulta.name_parts) >= 2:
+                for token in set(consulta.name_parts):
+                    self._por_token.setdefault(token, []).append((i, consulta.name_parts.count(token)))
+                self._variantes.agregar(consulta.name_parts)
+        self._longitudes = sorted({len(cedula) for cedula in self._por_cedula})
+        self._longitudes_bloque = sorted({len(bloque) for bloque in self._por_bloque})
+
+    def coincidencias(self, documento: DocumentoExtraido) -> set:
+        """Posiciones (en la lista de aprendices) de quienes aparecen en el documento"""
+        encontrados = set()
+        digitos = documento.digitos
+        for longitud in self._longitudes:
+            for inicio in range(len(digitos) - longitud + 1):
+                aprendices = self._por_cedula.get(digitos[inicio:inicio + longitud])
+                if aprendices:
+                    encontrados.update(aprendices)
+        aproximados = set()
+        for longitud in self._longitudes_bloque:
+            for inicio in range(len(digitos) - longitud + 1):
+                aproximados.update(self._por_bloque.get(digitos[inicio:inicio + longitud], ()))
+        for i in aproximados - encontrados:
+            consulta = self._consultas[i]
+            if buscar_aproximado(consulta.clean_cedula, digitos, consulta.distancia_max) is not None:
+                encontrados.add(i)
+        for m in PATRON_CLAVE_CEDULA.finditer(documento.texto_normalizado):
+            encontrados.update(self._por_ultimos4.get(m.group(1), ()))
+
+        partes = set()
+        for token in set(documento.texto_normalizado.split()):
+            if token in self._por_token:
+                partes.add(token)
+            partes |= self._variantes.cercanas(token)
+        conteo: Dict[int, int] = {}
+        for part in partes:
+            for i, repeticiones in self._por_token.get(part, ()):
+                conteo[i] = conteo.get(i, 0) + repeticiones
+        encontrados.update(i for i, n in conteo.items() if n >= 2)
+        return encontrados
+
+NOMBRES_TIPO_REPORTE = {'cedulas': 'cedula', 'actas': 'acta_f023', 'evaluaciones': 'evaluacion'}
+
+def generar_reporte(aprendices: List[Aprendiz], workers: int = OCR_MAX_GLOBAL) -> dict:
+    """
+    Estado de documentos de todos los aprendices dados con una sola pasada por el corpus: cada PDF
+    se extrae una vez (o se lee de la caché) y se compara contra todo el listado a la vez
+    """
+    inicio = time.perf_counter()
+    comparador = ComparadorRoster(aprendices)
+    archivos_por_aprendiz = [{doc_type: [] for doc_type in TIPOS_DOCUMENTO} for _ in aprendices]
+    rendimiento = {'archivos': 0, 'paginas': 0, 'paginas_ocr': 0, 'desde_cache': 0, 'errores': 0}
+
+    trabajos = []
+    for doc_type in TIPOS_DOCUMENTO:
+        dir_path = os.path.join(configuracion.DOCUMENTOS_PATH, doc_type)
+        if not os.path.exists(dir_path):
+            print(f"⚠️ Directorio no encontrado: {doc_type}", file=sys.stderr)
+            continue
+        trabajos.extend(
+            (doc_type, os.path.join(dir_path, f)) for f in sorted(os.listdir(dir_path)) if f.lower().endswith('.pdf')
+        )
+
+    # Los documentos se comparan y se descartan a medida que terminan: la memoria no crece con el corpus
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futuros = {executor.submit(extraer_documento, file_path): (doc_type, file_path) for doc_type, file_path in trabajos}
+        for hechos, futuro in enumerate(as_completed(futuros), start=1):
+            doc_type, file_path = futuros[futuro]
+            try:
+                documento = futuro.result()
+            except Exception as e:
+                print(f"⚠️ Error procesando {file_path}: {str(e)}", file=sys.stderr)
+                rendimiento['errores'] += 1
+                continue
+            rendimiento['archivos'] += 1
+            rendimiento['paginas'] += documento.total_paginas
+            rendimiento['paginas_ocr'] += documento.paginas_ocr
+            rendimiento['desde_cache'] += int(documento.desde_cache)
+            for i in comparador.coincidencias(documento):
+                archivos_por_aprendiz[i][doc_type].append(os.path.basename(file_path))
+            if hechos % 100 == 0:
+                print(f"📄 {hechos}/{len(trabajos)} archivos procesados", file=sys.stderr)
+
+    filas = []
+    for aprendiz, archivos in zip(aprendices, archivos_por_aprendiz):
+        faltantes = [NOMBRES_TIPO_REPORTE[t] for t in TIPOS_DOCUMENTO if not archivos[t]]
+        fila = {
+            'tipo_documento': aprendiz.tipo_documento,
+            'documento': aprendiz.documento,
+            'nombre': aprendiz.nombre_completo,
+            'ficha': aprendiz.ficha,
+            'programa': aprendiz.programa,
+            'completo': not faltantes,
+            'faltantes': faltantes
+        }
+        for doc_type in TIPOS_DOCUMENTO:
+            fila[f'archivos_{doc_type}'] = sorted(archivos[doc_type])
+        filas.append(fila)
+
+    segundos = time.perf_counter() - inicio
+    rendimiento.update({
+        'aprendices': len(aprendices),
+        'segundos': round(segundos, 2),
+        'archivos_por_segundo': round(rendimiento['archivos'] / segundos, 2) if segundos else None,
+        'paginas_por_segundo': round(rendimiento['paginas'] / segundos, 2) if segundos else None
+    })
+    return {
+        'aprendices': filas,
+        'resumen': {
+            'total': len(filas),
+            'completos': sum(1 for fila in filas if fila['completo']),
+            'faltantes_por_tipo': {
+                NOMBRES_TIPO_REPORTE[t]: sum(1 for fila in filas if not fila[f'archivos_{t}']) for t in TIPOS_DOCUMENTO
+            }
+        },
+        'rendimiento': rendimiento
+    }
+
+def escribir_reporte(reporte: dict, formato: str, salida):
+    """Escribe el reporte como CSV (una fila por aprendiz) o JSON (con resumen y rendimiento)"""
+    if formato == 'json':
+        json.dump(reporte, salida, ensure_ascii=False, indent=2)
+        salida.write("\n")
+        return
+    columnas = ['tipo_documento', 'documento', 'nombre', 'ficha', 'programa', 'completo', 'faltantes']
+    columnas += [f'archivos_{doc_type}' for doc_type in TIPOS_DOCUMENTO]
+    escritor = csv.DictWriter(salida, fieldnames=columnas)
+    escritor.writeheader()
+    for fila in reporte['aprendices']:
+        escritor.writerow({
+            **fila,
+            'completo': 'SI' if fila['completo'] else 'NO',
+            'faltantes': ';'.join(fila['faltantes']),
+            **{f'archivos_{t}': ';'.join(fila[f'archivos_{t}']) for t in TIPOS_DOCUMENTO}
+        })
+
+def ejecutar_reporte(argv: List[str]) -> int:
+    """Comando `python web_app.py report`: reporte de cumplimiento de una ficha o de todo el listado"""
+    parser = argparse.ArgumentParser(prog='web_app.py report', description='Reporte de documentos faltantes por aprendiz')
+    parser.add_argument('--ficha', help='solo los aprendices de esta ficha (por defecto, todo database.txt)')
+    parser.add_argument('--format', dest='formato', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--salida', default='-', help='archivo de salida (por defecto, la salida estándar)')
+    parser.add_argument('--workers', type=int, default=OCR_MAX_GLOBAL, help='PDFs extraídos en paralelo')
+    args = parser.parse_args(argv)
+
+    database = load_database()
+    if args.ficha:
+        aprendices = database.buscar_por_ficha(args.ficha)
+    else:
+        aprendices = [aprendiz for _, aprendiz in database.items()]
+    if not aprendices:
+        print(f"⚠️ No hay aprendices{' en la ficha ' + args.ficha if args.ficha else ''}", file=sys.stderr)
+        return 1
+
+    # Los avisos de extracción y OCR van a stderr para no mezclarse con un reporte por la salida estándar
+    with redirect_stdout(sys.stderr):
+        reporte = generar_reporte(aprendices, args.workers)
+    if args.salida == '-':
+        escribir_reporte(reporte, args.formato, sys.stdout)
+    else:
+        with open(args.salida, 'w', encoding='utf-8', newline='') as salida:
+            escribir_reporte(reporte, args.formato, salida)
+
+    rendimiento = reporte['rendimiento']
+    print(
+        f"📊 {reporte['resumen']['completos']}/{reporte['resumen']['total']} aprendices con todos los documentos; "
+        f"{rendimiento['archivos']} PDFs ({rendimiento['paginas']} páginas, {rendimiento['paginas_ocr']} con OCR, "
+        f"{rendimiento['desde_cache']} desde caché) en {rendimiento['segundos']} s: "
+        f"{rendimiento['archivos_por_segundo']} archivos/s, {rendimiento['paginas_por_segundo']} páginas/s",
+        file=sys.stderr
+    )
+    return 0
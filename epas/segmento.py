@@ -0,0 +1,351 @@
+"""Segmento compartido (mapeado en memoria) con el texto normalizado de cada PDF del corpus"""
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from epas.cache import DocumentoExtraido
+from epas.configuracion import CORPUS_COMPACTAR_FRACCION, CORPUS_SEGMENTO_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos para el segmento del corpus (un solo proceso)
+    fcntl = None
+
+class EntradaSegmento(NamedTuple):
+    """Posición de un documento en el segmento: el texto va entre espacios y los dígitos justo después"""
+    huella: Tuple[int, int]
+    inicio_texto: int
+    fin_texto: int
+    fin_digitos: int
+    paginas: int
+    paginas_ocr: int
+    bytes: int  # tamaño del registro completo, que queda muerto al reemplazarlo o retirarlo
+
+class SegmentoCorpus:
+    """
+    Texto normalizado y proyección de dígitos de cada PDF en un archivo de solo agregado que todos
+    los procesos del servidor mapean en memoria (solo lectura): comparten las mismas páginas del
+    page cache y buscan en ellas con mmap.find, sin copiarlas. Un registro nuevo reemplaza al
+    anterior de la misma ruta (o lo retira, si es una lápida); la tabla de posiciones se arma
+    leyendo solo los encabezados. Al acumularse registros muertos se compacta en un archivo nuevo
+    que reemplaza al actual con os.replace; los demás procesos lo notan por el inodo y lo remapean.
+    Cada escritura sube una generación guardada en el archivo de lock, que cada proceso también
+    mapea: mientras no cambie, una lectura no hace stat() del segmento.
+    """
+    # EPASSEG2: ya no guarda como completos los PDF con páginas que el perfil de OCR no leyó
+    MAGICO = b'EPASSEG2'
+    MARCA_REGISTRO = b'REG1'
+    # marca, vivo, tamaño y mtime del PDF, largos de ruta/texto/dígitos, páginas, páginas con OCR
+    ENCABEZADO = struct.Struct('<4sBxxxQqIIIII')
+    GENERACION = struct.Struct('<Q')
+    MIN_BYTES_COMPACTAR = 1024 * 1024
+    # Documentos ya decodificados del mapeo que se conservan por proceso
+    MAX_DECODIFICADOS = 256
+
+    def __init__(self, path: str, fraccion_compactar: float):
+        self.path = path
+        self.fraccion_compactar = fraccion_compactar
+        self.aciertos = 0
+        self.fallos = 0
+        self.escrituras = 0
+        self.retiros = 0
+        self.compactaciones = 0
+        self.remapeos = 0
+        self._lock = threading.RLock()
+        self._mm: Optional[mmap.mmap] = None
+        self._identidad: Optional[Tuple[int, int]] = None  # (st_dev, st_ino) del archivo mapeado
+        self._fin = 0  # fin del último registro completo leído
+        self._tabla: Dict[str, EntradaSegmento] = {}
+        self._bytes_muertos = 0
+        self._contador: Optional[mmap.mmap] = None  # generación, en el archivo de lock
+        self._generacion_vista: Optional[int] = None
+        self._decodificados: 'OrderedDict[str, Tuple[EntradaSegmento, DocumentoExtraido]]' = OrderedDict()
+
+    def _desmapear(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._identidad = None
+        self._fin = 0
+        self._tabla = {}
+        self._bytes_muertos = 0
+        self._decodificados.clear()
+        self._generacion_vista = None
+
+    def _generacion(self) -> Optional[int]:
+        """Generación del segmento que suben los escritores; None si no se pudo mapear el archivo de lock"""
+        if self._contador is None:
+            try:
+                with open(self.path + '.lock', 'a+b') as file:
+                    if os.fstat(file.fileno()).st_size < self.GENERACION.size:
+                        file.truncate(self.GENERACION.size)
+                    self._contador = mmap.mmap(file.fileno(), self.GENERACION.size)
+            except (OSError, ValueError):
+                return None
+        return self.GENERACION.unpack_from(self._contador)[0]
+
+    def _avanzar_generacion(self):
+        """Avisa a los demás procesos que el segmento cambió; se llama con el lock entre procesos tomado"""
+        generacion = self._generacion()
+        if generacion is not None:
+            self.GENERACION.pack_into(self._contador, 0, generacion + 1)
+
+    def _refrescar(self):
+        """
+        Si otro proceso (o este) escribió desde la última vez, mapea el archivo actual (nuevo tras
+        una compactación) y lee los registros agregados
+        """
+        generacion = self._generacion()
+        if generacion is not None and generacion == self._generacion_vista:
+            return
+        self._generacion_vista = generacion
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._desmapear()
+            return
+        identidad = (stat.st_dev, stat.st_ino)
+        if identidad == self._identidad and stat.st_size == len(self._mm):
+            return
+        if identidad != self._identidad:
+            self._desmapear()
+        if stat.st_size < len(self.MAGICO):
+            return
+
+        with open(self.path, 'rb') as file:
+            stat = os.fstat(file.fileno())  # el archivo abierto manda si se reemplazó entre stat() y open()
+            if stat.st_size < len(self.MAGICO):
+                return
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        identidad = (stat.st_dev, stat.st_ino)
+        if identidad != self._identidad:
+            self._desmapear()
+            if mm[:len(self.MAGICO)] != self.MAGICO:
+                mm.close()
+                return
+            self._fin = len(self.MAGICO)
+        elif self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+        self._identidad = identidad
+        self.remapeos += 1
+        self._leer_registros()
+
+    def _leer_registros(self):
+        mm = self._mm
+        pos = self._fin
+        total = len(mm)
+        while pos + self.ENCABEZADO.size <= total:
+            marca, vivo, tamano, mtime_ns, largo_ruta, largo_texto, largo_digitos, paginas, paginas_ocr = \
+                self.ENCABEZADO.unpack_from(mm, pos)
+            inicio_ruta = pos + self.ENCABEZADO.size
+            fin = inicio_ruta + largo_ruta + largo_texto + largo_digitos
+            # Un registro a medias (escritor caído) termina la lectura; el próximo escritor lo trunca
+            if marca != self.MARCA_REGISTRO or fin > total:
+                break
+            ruta = mm[inicio_ruta:inicio_ruta + largo_ruta].decode('utf-8')
+            anterior = self._tabla.pop(ruta, None)
+            if anterior is not None:
+                self._bytes_muertos += anterior.bytes
+                self._decodificados.pop(ruta, None)
+            if vivo:
+                inicio_texto = inicio_ruta + largo_ruta
+                self._tabla[ruta] = EntradaSegmento(
+                    (tamano, mtime_ns), inicio_texto, inicio_texto + largo_texto, fin, paginas, paginas_ocr, fin - pos
+                )
+            else:
+                self._bytes_muertos += fin - pos
+            pos = fin
+        self._fin = pos
+
+    @contextmanager
+    def _bloqueo(self):
+        """Lock entre procesos sobre un archivo aparte, porque el segmento se reemplaza al compactar"""
+        with self._lock, open(self.path + '.lock', 'a') as candado:
+            if fcntl is not None:
+                fcntl.flock(candado, fcntl.LOCK_EX)  # se libera al cerrar el archivo
+            self._refrescar()
+            yield
+
+    def _agregar(self, registro: bytes):
+        with self._bloqueo():
+            with open(self.path, 'ab') as file:
+                if self._mm is None:
+                    file.truncate(0)
+                    file.write(self.MAGICO)
+                elif file.tell() != self._fin:
+                    file.truncate(self._fin)
+                file.write(registro)
+            self._avanzar_generacion()
+            self._refrescar()
+
+    def _registro(self, ruta: str, huella: Tuple[int, int], documento: Optional[DocumentoExtraido]) -> bytes:
+        ruta_bytes = ruta.encode('utf-8')
+        if documento is None:
+            return self.ENCABEZADO.pack(self.MARCA_REGISTRO, 0, *huella, len(ruta_bytes), 0, 0, 0, 0) + ruta_bytes
+        texto = f" {documento.texto_normalizado} ".encode('ascii')
+        digitos = documento.digitos.encode('ascii')
+        return self.ENCABEZADO.pack(
+            self.MARCA_REGISTRO, 1, *huella, len(ruta_bytes), len(texto), len(digitos),
+            documento.total_paginas, documento.paginas_ocr
+        ) + ruta_bytes + texto + digitos
+
+    def guardar(self, huella: Tuple[int, int], documento: DocumentoExtraido) -> bool:
+        """Agrega el texto de un PDF con su huella (tamaño, mtime), salvo que otro proceso ya lo haya hecho"""
+        with self._lock:
+            self._refrescar()
+            entrada = self._tabla.get(documento.ruta)
+            if entrada is not None and entrada.huella == huella:
+                return False
+        escrito = False
+        try:
+            self._agregar(self._registro(documento.ruta, huella, documento))
+            escrito = True
+            self.escrituras += 1
+            self.compactar_si_conviene()
+        except OSError as e:
+            print(f"⚠️ Error escribiendo el segmento del corpus {self.path}: {str(e)}")
+        return escrito
+
+    def retirar(self, ruta: str) -> bool:
+        """Agrega una lápida para un PDF borrado o modificado"""
+        with self._lock:
+            self._refrescar()
+            if ruta not in self._tabla:
+                return False
+        retirado = False
+        try:
+            self._agregar(self._registro(ruta, (0, 0), None))
+            retirado = True
+            self.retiros += 1
+            self.compactar_si_conviene()
+        except OSError as e:
+            print(f"⚠️ Error escribiendo el segmento del corpus {self.path}: {str(e)}")
+        return retirado
+
+    def rutas(self) -> List[str]:
+        """Rutas de los PDFs con registro vivo"""
+        with self._lock:
+            self._refrescar()
+            return list(self._tabla)
+
+    def _decodificar(self, ruta: str, entrada: EntradaSegmento) -> DocumentoExtraido:
+        """Documento de un registro vivo, decodificado del mapeo una vez mientras el registro no cambie"""
+        decodificado = self._decodificados.get(ruta)
+        if decodificado is not None and decodificado[0] is entrada:
+            self._decodificados.move_to_end(ruta)
+            return decodificado[1]
+        texto = self._mm[entrada.inicio_texto + 1:entrada.fin_texto - 1].decode('ascii')
+        digitos = self._mm[entrada.fin_texto:entrada.fin_digitos].decode('ascii')
+        documento = DocumentoExtraido(ruta, [], texto, digitos, True, 0.0, True, (entrada.paginas, entrada.paginas_ocr))
+        self._decodificados[ruta] = (entrada, documento)
+        if len(self._decodificados) > self.MAX_DECODIFICADOS:
+            self._decodificados.popitem(last=False)
+        return documento
+
+    def documento(self, ruta: str, huella: Optional[Tuple[int, int]] = None) -> Optional[DocumentoExtraido]:
+        """Documento guardado (con esa huella, si se da), sin abrir el PDF ni la caché de extracción, o None"""
+        with self._lock:
+            self._refrescar()
+            entrada = self._tabla.get(ruta)
+            if entrada is None or (huella is not None and entrada.huella != huella):
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            return self._decodificar(ruta, entrada)
+
+    def digitos(self, ruta: str) -> Optional[str]:
+        """Proyección de dígitos guardada de un PDF, o None"""
+        with self._lock:
+            self._refrescar()
+            entrada = self._tabla.get(ruta)
+            if entrada is None:
+                return None
+            decodificado = self._decodificados.get(ruta)
+            if decodificado is not None and decodificado[0] is entrada:
+                return decodificado[1].digitos
+            return self._mm[entrada.fin_texto:entrada.fin_digitos].decode('ascii')
+
+    def filtrar_digitos(self, rutas, fragmentos: List[bytes]) -> set:
+        """
+        Rutas cuya proyección de dígitos contiene alguno de los fragmentos, buscados directamente sobre
+        el mapeo. Las rutas sin registro se devuelven también, para que quien llama no las descarte.
+        """
+        with self._lock:
+            self._refrescar()
+            if self._mm is None:
+                return set(rutas)
+            tabla = self._tabla
+            find = self._mm.find
+            encontradas = set()
+            for ruta in rutas:
+                entrada = tabla.get(ruta)
+                if entrada is None:
+                    encontradas.add(ruta)
+                    continue
+                _, _, inicio, fin, _, _, _ = entrada
+                for fragmento in fragmentos:
+                    if find(fragmento, inicio, fin) != -1:
+                        encontradas.add(ruta)
+                        break
+            return encontradas
+
+    def compactar(self) -> bool:
+        """
+        Reescribe solo los registros vivos en un archivo nuevo y lo cambia por el actual de forma
+        atómica. Lanza OSError si no se pudo escribir o reemplazar (el segmento actual sigue válido).
+        """
+        temporal = self.path + '.tmp'
+        with self._bloqueo():
+            if self._mm is None or not self._bytes_muertos:
+                return False
+            with open(temporal, 'wb') as file, memoryview(self._mm) as vista:
+                file.write(self.MAGICO)
+                for entrada in sorted(self._tabla.values(), key=lambda e: e.fin_digitos):
+                    file.write(vista[entrada.fin_digitos - entrada.bytes:entrada.fin_digitos])
+                file.flush()
+                os.fsync(file.fileno())
+            # El mapeo del archivo actual se cierra antes de reemplazarlo (en Windows no se puede
+            # reemplazar un archivo mapeado); los demás procesos conservan el suyo hasta remapear
+            self._desmapear()
+            os.replace(temporal, self.path)
+            self.compactaciones += 1
+            self._avanzar_generacion()
+            self._refrescar()
+        return True
+
+    def compactar_si_conviene(self) -> bool:
+        """Compacta si los registros muertos superan la fracción configurada (y al menos MIN_BYTES_COMPACTAR)"""
+        with self._lock:
+            self._refrescar()
+            conviene = (self._bytes_muertos >= self.MIN_BYTES_COMPACTAR
+                        and self._bytes_muertos > self.fraccion_compactar * self._fin)
+        return conviene and self.compactar()
+
+    def purgar(self) -> int:
+        """Retira los PDFs que ya no existen; devuelve cuántos se retiraron"""
+        return sum(1 for ruta in self.rutas() if not os.path.exists(ruta) and self.retirar(ruta))
+
+    def estadisticas(self) -> dict:
+        """Tamaño del segmento y contadores de uso de este proceso"""
+        with self._lock:
+            self._refrescar()
+            return {
+                'ruta': self.path,
+                'documentos': len(self._tabla),
+                'bytes': self._fin,
+                'bytes_muertos': self._bytes_muertos,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'escrituras': self.escrituras,
+                'retiros': self.retiros,
+                'compactaciones': self.compactaciones,
+                'remapeos': self.remapeos,
+                'lock_entre_procesos': fcntl is not None
+            }
+
+segmento_corpus = SegmentoCorpus(CORPUS_SEGMENTO_PATH, CORPUS_COMPACTAR_FRACCION)
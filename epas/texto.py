@@ -0,0 +1,39 @@
+"""Normalización de texto y proyección de dígitos usadas en todas las búsquedas"""
+import re
+import unicodedata
+
+def normalize_text(text: str) -> str:
+    """Normaliza el texto para búsquedas más confiables"""
+    if not text:
+        return ""
+    
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').lower()
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    
+    return text
+
+def to_capital_case(text: str) -> str:
+    """Convierte un texto a Capital Case (primera letra mayúscula, resto minúsculas)"""
+    if not text:
+        return text
+    return ' '.join(word.capitalize() for word in text.split())
+
+# Confusiones típicas de EasyOCR entre letras y dígitos (el texto ya está normalizado en minúsculas)
+CONFUSIONES_OCR = str.maketrans('oqdlizsbgt', '0001125897')
+PATRON_TOKEN_CON_DIGITO = re.compile(r'\S*\d\S*')
+PATRON_TOKEN_NUMERICO = re.compile(r'[0-9oqdlizsbgt]+')
+PATRON_NO_DIGITO = re.compile(r'\D')
+# Palabras clave seguidas de los últimos 4 dígitos de la cédula
+PATRON_CLAVE_CEDULA = re.compile(r'(?:cc|cedula|documento|identificacion)\D*(\d{4})')
+
+def proyeccion_digitos(norm_text: str) -> str:
+    """
+    Dígitos del texto en orden, como si no hubiera espacios. En los tokens que tienen algún dígito y
+    solo dígitos o letras confundibles ('1o32s08266'), las letras se leen como el dígito que el OCR
+    confundió; en los demás tokens solo cuentan los dígitos.
+    """
+    return "".join(
+        token.translate(CONFUSIONES_OCR) if PATRON_TOKEN_NUMERICO.fullmatch(token) else PATRON_NO_DIGITO.sub('', token)
+        for token in PATRON_TOKEN_CON_DIGITO.findall(norm_text)
+    )
@@ -0,0 +1,397 @@
+"""Verificación de los documentos de un aprendiz y cola de trabajos de verificación"""
+import json
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from epas import configuracion, indice, ingesta, ocr
+from epas.coincidencias import ConsultaDocumentos
+from epas.configuracion import OCR_MAX_POR_CONSULTA, TIPOS_DOCUMENTO, VERIFICACION_PARALELA
+from epas.extraccion import extraer_documento
+from epas.indice import ResultadoTipo
+from epas.metricas import en_contexto, etapa, metricas
+from epas.ocr import ControlOCR, ExtraccionCancelada, MemoriaPaginas
+
+class RegistroProceso(list):
+    """Lista de pasos del proceso que además avisa cada paso nuevo en cuanto ocurre (p. ej. al stream SSE)"""
+
+    def __init__(self, progreso: Optional[Callable[[str], None]] = None):
+        super().__init__()
+        self.progreso = progreso
+
+    def append(self, paso: str):
+        super().append(paso)
+        if self.progreso:
+            self.progreso(paso)
+
+def _verificar_tipo(doc_type: str, consulta: ConsultaDocumentos, control: ControlOCR) -> Tuple[bool, List[str]]:
+    """Busca la cédula o el nombre en un tipo de documento; devuelve (encontrado, pasos del proceso)"""
+    proceso = RegistroProceso(control.progreso)
+    dir_path = os.path.join(configuracion.DOCUMENTOS_PATH, doc_type)
+    if not os.path.exists(dir_path):
+        proceso.append(f"⚠️ Directorio no encontrado: {doc_type}")
+        return False, proceso
+
+    proceso.append(f"🔍 Buscando en {doc_type}...")
+    found = False
+
+    with etapa('indice.pendientes', tipo=doc_type):
+        pendientes, eliminados = indice.indice_corpus.pendientes(doc_type, dir_path)
+    if eliminados:
+        proceso.append(f"   {eliminados} archivo(s) eliminados del índice")
+
+    # Con la generación leída antes de buscar: si el índice cambia por otra vía mientras tanto, la entrada nace vencida
+    generacion = indice.indice_corpus.generacion(doc_type)
+    indexados = set()
+
+    # Sin cambios en el corpus desde la última verificación de este aprendiz, el resultado se reutiliza
+    previo = indice.cache_resultados.obtener(consulta, doc_type, pendientes)
+    if previo is not None:
+        detalle = f" en {os.path.basename(previo.archivo)}" if previo.archivo else ""
+        proceso.append(f"   ♻️ Resultado reutilizado: el corpus no cambió desde la última verificación{detalle}")
+        proceso.append(f"📌 Resultado para {doc_type}: {'ENCONTRADO' if previo.encontrado else 'NO ENCONTRADO'}")
+        return previo.encontrado, proceso
+    archivo = None
+
+    # Primero los archivos ya indexados: no requieren extracción ni OCR
+    rutas_pendientes = {file_path for file_path, _ in pendientes}
+    with etapa('indice.candidatos', tipo=doc_type):
+        candidatos = [f for f in indice.indice_corpus.candidatos(doc_type, consulta) if f not in rutas_pendientes]
+    proceso.append(f"   {len(candidatos)} archivo(s) candidato(s) según el índice")
+
+    for file_path in candidatos:
+        filename = os.path.basename(file_path)
+        documento = extraer_documento(file_path)
+        control.archivos_revisados += 1
+        proceso.append(f"   Verificando archivo: {filename} ({documento.describir()})")
+        cedula_found, name_found = consulta.buscar(documento)
+
+        if cedula_found or name_found:
+            proceso.append(f"   ✅ Coincidencia encontrada en {filename} ({consulta.explicar(documento).describir()})")
+            found = True
+            archivo = file_path
+            break
+
+    # Luego los archivos nuevos o modificados, en paralelo; al encontrar coincidencia se cancela el resto
+    if not found and pendientes:
+        proceso.append(f"   {len(pendientes)} archivo(s) nuevos o modificados por procesar")
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(pendientes), OCR_MAX_POR_CONSULTA)))
+        futuros = [
+            executor.submit(en_contexto(indice.indice_corpus.indexar), doc_type, file_path, huella, control)
+            for file_path, huella in pendientes
+        ]
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    documento = futuro.result()
+                except ExtraccionCancelada:
+                    continue
+                if documento.completo:
+                    indexados.add(documento.ruta)
+                filename = os.path.basename(documento.ruta)
+                control.archivos_revisados += 1
+                proceso.append(f"   Procesando archivo: {filename} ({documento.describir()})")
+                cedula_found, name_found = consulta.buscar(documento)
+
+                if cedula_found or name_found:
+                    proceso.append(f"   ✅ Coincidencia encontrada en {filename} ({consulta.explicar(documento).describir()})")
+                    found = True
+                    archivo = documento.ruta
+                    control.cancelado.set()
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if found:
+            restantes = sum(1 for futuro in futuros if not futuro.done() or futuro.cancelled())
+            if restantes:
+                proceso.append(f"   ⏹️ {restantes} archivo(s) cancelados; quedan para la ingesta")
+
+        # Lo cancelado o leído solo en parte pasa al frente de la ingesta: la próxima consulta lo encuentra indexado
+        ingesta.ingesta.adelantar(doc_type, [file_path for file_path, _ in pendientes if file_path not in indexados])
+
+    # Si los únicos cambios del índice son los archivos que esta búsqueda indexó (y revisó), el resultado
+    # vale para la generación final; si la ingesta agregó otros mientras tanto, queda la de antes de buscar
+    generacion_final = indice.indice_corpus.generacion(doc_type)
+    if generacion_final - generacion == len(indexados):
+        generacion = generacion_final
+    indice.cache_resultados.guardar(consulta, doc_type, ResultadoTipo(found, archivo, generacion))
+    metricas.contar('epas_archivos_revisados_total', control.archivos_revisados, tipo=doc_type)
+    if control.paginas_ocr or control.vacias:
+        perfil = ocr.PERFILES_OCR.get(doc_type)
+        proceso.append(f"   🖼️ OCR en {doc_type}: {control.describir_ocr()} "
+                       f"({f'perfil: {perfil.describir()}' if perfil else 'sin perfil, página completa'})")
+    proceso.append(f"📌 Resultado para {doc_type}: {'ENCONTRADO' if found else 'NO ENCONTRADO'}")
+    return found, proceso
+
+def check_documents(cedula: str, nombre: str,
+                    progreso: Optional[Callable[[str], None]] = None) -> Tuple[Dict[str, bool], List[str]]:
+    """
+    Verifica todos los tipos de documentos para coincidencias y devuelve pasos del proceso.
+    Si se pasa `progreso`, se llama con cada paso (y cada página de OCR) en cuanto ocurre.
+    """
+    results = {t: False for t in TIPOS_DOCUMENTO}
+    proceso = RegistroProceso(progreso)
+    consulta = ConsultaDocumentos(cedula, nombre)
+    inicio_consulta = time.perf_counter()
+
+    # Un cupo de OCR por consulta, compartido por sus tres tipos de documento
+    cupo_consulta = threading.BoundedSemaphore(OCR_MAX_POR_CONSULTA)
+    memoria = MemoriaPaginas()
+    controles = {
+        doc_type: ControlOCR(cupo_consulta, consulta, memoria, progreso) for doc_type in TIPOS_DOCUMENTO
+    }
+
+    if VERIFICACION_PARALELA:
+        with ThreadPoolExecutor(max_workers=len(TIPOS_DOCUMENTO)) as executor:
+            futuros = [
+                executor.submit(en_contexto(_verificar_tipo), doc_type, consulta, controles[doc_type])
+                for doc_type in TIPOS_DOCUMENTO
+            ]
+            verificaciones = [futuro.result() for futuro in futuros]
+    else:
+        verificaciones = [_verificar_tipo(t, consulta, controles[t]) for t in TIPOS_DOCUMENTO]
+
+    for doc_type, (found, pasos) in zip(TIPOS_DOCUMENTO, verificaciones):
+        results[doc_type] = found
+        proceso.extend(pasos)
+
+    metricas.observar('epas_archivos_por_consulta', sum(c.archivos_revisados for c in controles.values()))
+    if memoria.pico:
+        proceso.append(f"📈 Pico de memoria en páginas renderizadas: {memoria.pico / (1024 * 1024):.1f} MB")
+    if memoria.paginas_ocr:
+        proceso.append(f"🖼️ OCR: {memoria.describir_ocr()}")
+    proceso.append(f"⏱️ Verificación completada en {time.perf_counter() - inicio_consulta:.2f} s")
+    return results, proceso
+
+class CanalProgreso:
+    """Eventos de una verificación en curso, que uno o varios lectores reciben en tiempo real"""
+
+    def __init__(self):
+        self._eventos: List[Tuple[str, dict]] = []
+        self._cerrado = False
+        self._condicion = threading.Condition()
+
+    def publicar(self, tipo: str, datos: dict):
+        with self._condicion:
+            self._eventos.append((tipo, datos))
+            self._condicion.notify_all()
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+
+    def iterar(self, espera: float = 15.0) -> Iterator[Optional[Tuple[str, dict]]]:
+        """Genera todos los eventos desde el inicio; None cada `espera` segundos sin novedades"""
+        posicion = 0
+        while True:
+            with self._condicion:
+                if posicion >= len(self._eventos) and not self._cerrado:
+                    self._condicion.wait(espera)
+                nuevos = self._eventos[posicion:]
+                posicion += len(nuevos)
+                terminado = self._cerrado and posicion >= len(self._eventos)
+            if not nuevos and not terminado:
+                yield None
+            for evento in nuevos:
+                yield evento
+            if terminado:
+                return
+
+class ColaLlena(Exception):
+    """La cola de verificaciones no admite más trabajos por ahora"""
+
+    def __init__(self, reintentar_en: int):
+        super().__init__(f"Cola de verificaciones llena; reintentar en {reintentar_en} s")
+        self.reintentar_en = reintentar_en
+
+class TrabajoVerificacion:
+    """
+    Una verificación de documentos encolada. Su canal guarda todos los eventos desde el inicio,
+    así que quien se une tarde (otra consulta por la misma cédula) recibe el progreso completo.
+    """
+
+    def __init__(self, clave: Tuple[str, str], data: dict):
+        self.id = uuid.uuid4().hex
+        self.clave = clave
+        self.data = data
+        self.estado = 'en_cola'
+        self.solicitudes = 1
+        self.creado = time.perf_counter()
+        self.iniciado: Optional[float] = None
+        self.terminado: Optional[float] = None
+        self.resultado: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.canal = CanalProgreso()
+        self.finalizado = threading.Event()
+
+    @property
+    def segundos_espera(self) -> float:
+        fin = self.iniciado if self.iniciado is not None else time.perf_counter()
+        return fin - self.creado
+
+    @property
+    def segundos_ejecucion(self) -> Optional[float]:
+        if self.iniciado is None:
+            return None
+        return (self.terminado if self.terminado is not None else time.perf_counter()) - self.iniciado
+
+    def describir(self) -> dict:
+        """Estado del trabajo para /trabajos/<id>"""
+        datos = {
+            'id': self.id,
+            'estado': self.estado,
+            'solicitudes': self.solicitudes,
+            'segundos_espera': round(self.segundos_espera, 3),
+            'segundos_ejecucion': None if self.iniciado is None else round(self.segundos_ejecucion, 3)
+        }
+        if self.resultado is not None:
+            datos['resultado'] = self.resultado
+        if self.error is not None:
+            datos['error'] = self.error
+        return datos
+
+class ColaVerificaciones:
+    """
+    Cola acotada de verificaciones atendida por pocos hilos fijos, para que un pico de consultas
+    no ocupe un hilo del servidor por consulta. Las consultas simultáneas por la misma cédula (y con
+    el mismo contexto de conversación, que viaja en la respuesta) se unen al trabajo que ya está en
+    cola o en curso (una sola verificación), y con la cola llena se
+    rechaza con un tiempo sugerido de reintento en lugar de acumular hilos. `procesar` calcula la
+    respuesta del chatbot para el cuerpo de la solicitud, avisando cada paso a la función de progreso.
+    """
+    MUESTRAS = 500  # trabajos recientes para promedios y máximos
+
+    def __init__(self, procesar: Callable[[dict, Callable[[str], None]], dict], workers: int, max_cola: int,
+                 retencion: float):
+        self.procesar = procesar
+        self.workers = max(1, workers)
+        self.max_cola = max(1, max_cola)
+        self.retencion = retencion
+        self.enviados = 0
+        self.coalescidos = 0
+        self.rechazados = 0
+        self.completados = 0
+        self.fallidos = 0
+        self._cola: queue.Queue = queue.Queue(maxsize=self.max_cola)
+        self._en_vuelo: Dict[Tuple[str, str], TrabajoVerificacion] = {}  # (cédula, contexto) -> trabajo en cola o en curso
+        self._trabajos: Dict[str, TrabajoVerificacion] = {}  # id -> trabajo (terminados, hasta la retención)
+        self._esperas: deque = deque(maxlen=self.MUESTRAS)
+        self._ejecuciones: deque = deque(maxlen=self.MUESTRAS)
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def _iniciar(self):
+        if self._hilos:
+            return
+        for i in range(self.workers):
+            hilo = threading.Thread(target=self._trabajar, name=f'verificacion-{i}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def enviar(self, data: dict) -> TrabajoVerificacion:
+        """Encola la verificación (o devuelve la que ya está en vuelo para esa cédula); ColaLlena si no cabe"""
+        # El contexto es parte de la respuesta: solo se comparte el trabajo de quien envió el mismo
+        clave = (data.get('mensaje', '').strip(), json.dumps(data.get('contexto', {}), sort_keys=True, default=str))
+        with self._lock:
+            self._iniciar()
+            self._purgar()
+            self.enviados += 1
+            trabajo = self._en_vuelo.get(clave)
+            if trabajo is not None:
+                trabajo.solicitudes += 1
+                self.coalescidos += 1
+                return trabajo
+
+            trabajo = TrabajoVerificacion(clave, data)
+            try:
+                self._cola.put_nowait(trabajo)
+            except queue.Full:
+                self.rechazados += 1
+                raise ColaLlena(self._estimar_reintento())
+            self._en_vuelo[clave] = trabajo
+            self._trabajos[trabajo.id] = trabajo
+            return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoVerificacion]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def _estimar_reintento(self) -> int:
+        """Segundos hasta que la cola actual probablemente se haya vaciado"""
+        ejecucion = sum(self._ejecuciones) / len(self._ejecuciones) if self._ejecuciones else 1.0
+        return max(1, math.ceil(self._cola.qsize() * ejecucion / self.workers))
+
+    def _purgar(self):
+        """Olvida los trabajos terminados hace más de la retención"""
+        limite = time.perf_counter() - self.retencion
+        vencidos = [
+            trabajo_id for trabajo_id, trabajo in self._trabajos.items()
+            if trabajo.terminado is not None and trabajo.terminado < limite
+        ]
+        for trabajo_id in vencidos:
+            del self._trabajos[trabajo_id]
+
+    def _trabajar(self):
+        while True:
+            trabajo = self._cola.get()
+            trabajo.iniciado = time.perf_counter()
+            trabajo.estado = 'en_curso'
+            metricas.observar('epas_trabajo_espera_segundos', trabajo.segundos_espera)
+            trabajo.canal.publicar('estado', {'estado': 'en_curso', 'segundos_espera': round(trabajo.segundos_espera, 3)})
+            try:
+                trabajo.resultado = self.procesar(
+                    trabajo.data, lambda paso: trabajo.canal.publicar('paso', {'paso': paso})
+                )
+                trabajo.estado = 'terminado'
+                trabajo.canal.publicar('resultado', trabajo.resultado)
+            except Exception as e:
+                print(f"⚠️ Error en la verificación {trabajo.id}: {str(e)}")
+                trabajo.estado = 'error'
+                trabajo.error = str(e)
+                trabajo.canal.publicar('error', {'mensaje': '⚠️ Lo siento, hubo un error. Por favor intenta nuevamente.'})
+            finally:
+                trabajo.terminado = time.perf_counter()
+                with self._lock:
+                    self._en_vuelo.pop(trabajo.clave, None)
+                    self._esperas.append(trabajo.segundos_espera)
+                    self._ejecuciones.append(trabajo.segundos_ejecucion)
+                    if trabajo.estado == 'terminado':
+                        self.completados += 1
+                    else:
+                        self.fallidos += 1
+                trabajo.canal.cerrar()
+                trabajo.finalizado.set()
+                self._cola.task_done()
+
+    def estado(self) -> dict:
+        """Profundidad de la cola, contadores y tiempos de espera y de ejecución recientes"""
+        with self._lock:
+            en_curso = sum(1 for t in self._en_vuelo.values() if t.estado == 'en_curso')
+
+            def resumen(muestras: deque) -> dict:
+                if not muestras:
+                    return {'promedio': None, 'maximo': None}
+                return {'promedio': round(sum(muestras) / len(muestras), 3), 'maximo': round(max(muestras), 3)}
+
+            return {
+                'activa': bool(self._hilos),
+                'workers': self.workers,
+                'capacidad_cola': self.max_cola,
+                'profundidad_cola': self._cola.qsize(),
+                'en_curso': en_curso,
+                'enviados': self.enviados,
+                'coalescidos': self.coalescidos,
+                'rechazados': self.rechazados,
+                'completados': self.completados,
+                'fallidos': self.fallidos,
+                'segundos_espera': resumen(self._esperas),
+                'segundos_ejecucion': resumen(self._ejecuciones)
+            }
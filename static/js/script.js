@@ -52,57 +52,105 @@ document.addEventListener('DOMContentLoaded', function() {
         chatBox.appendChild(typingIndicator);
         chatBox.scrollTop = chatBox.scrollHeight;
         
-        fetch('/procesar', {
+        const cuerpo = {
+            estado: estadoActual,
+            mensaje: mensaje,
+            contexto: contextoConversacion
+        };
+
+        // La verificación de documentos puede tardar (OCR): se encola y se muestran los pasos reales en vivo
+        const peticion = (estadoActual === 1 && window.EventSource)
+            ? verificarConProgreso(cuerpo)
+            : fetch('/procesar', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify(cuerpo)
+            }).then(response => response.json());
+
+        peticion
+        .then(manejarRespuesta)
+        .catch(error => {
+            console.error('Error:', error);
+            document.getElementById('typing-indicator')?.remove();
+            enviarMensajeBot('⚠️ Lo siento, hubo un error. Por favor intenta nuevamente.');
+        });
+    }
+
+    function verificarConProgreso(cuerpo) {
+        // Crea un trabajo en /trabajos y sigue su progreso por Server-Sent Events hasta el resultado
+        return fetch('/trabajos', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
                 'X-Requested-With': 'XMLHttpRequest'
             },
-            body: JSON.stringify({
-                estado: estadoActual,
-                mensaje: mensaje,
-                contexto: contextoConversacion
-            })
+            body: JSON.stringify(cuerpo)
         })
-        .then(response => response.json())
-        .then(data => {
-            // Eliminar indicador de escritura
-            document.getElementById('typing-indicator')?.remove();
-            
-            // Actualizar estado y contexto
-            estadoActual = data.estado;
-            contextoConversacion = data.contexto || {};
-            
-            // Mostrar respuesta del bot
-            if (data.mensaje) {
-                enviarMensajeBot(data.mensaje);
-            }
-            
-            // Mostrar proceso si existe
-            if (data.proceso && data.proceso.length > 0) {
-                const procesoDiv = mostrarProceso(data.proceso);
+        .then(response => response.json().then(data => ({ status: response.status, data })))
+        .then(({ status, data }) => {
+            // 429: cola llena, la respuesta ya trae el mensaje para el chat
+            if (status !== 202) return data;
+
+            return new Promise((resolve, reject) => {
+                const procesoDiv = mostrarProceso([]);
+                const pasos = [];
                 chatBox.appendChild(procesoDiv);
-                chatBox.scrollTop = chatBox.scrollHeight;
-            }
-            
-            // Manejar final de conversación
-            if (data.mostrar_reinicio) {
-                userInput.disabled = true;
-                sendBtn.disabled = true;
-                
-                const nuevoBtn = document.createElement('button');
-                nuevoBtn.textContent = 'Hacer otra consulta';
-                nuevoBtn.className = 'btn btn-restart';
-                nuevoBtn.onclick = reiniciarChat;
-                chatBox.appendChild(nuevoBtn);
-            }
-        })
-        .catch(error => {
-            console.error('Error:', error);
-            document.getElementById('typing-indicator')?.remove();
-            enviarMensajeBot('⚠️ Lo siento, hubo un error. Por favor intenta nuevamente.');
+
+                const fuente = new EventSource(`/trabajos/${data.id}/stream`);
+                fuente.addEventListener('paso', e => {
+                    pasos.push(JSON.parse(e.data).paso);
+                    procesoDiv.innerHTML = pasos.slice(-3).join('<br>');
+                    chatBox.scrollTop = chatBox.scrollHeight;
+                });
+                fuente.addEventListener('resultado', e => {
+                    fuente.close();
+                    procesoDiv.remove();
+                    resolve(JSON.parse(e.data));
+                });
+                fuente.addEventListener('error', e => {
+                    fuente.close();
+                    procesoDiv.remove();
+                    reject(new Error(e.data ? JSON.parse(e.data).mensaje : 'Conexión interrumpida'));
+                });
+            });
         });
     }
+
+    function manejarRespuesta(data) {
+        // Eliminar indicador de escritura
+        document.getElementById('typing-indicator')?.remove();
+        
+        // Actualizar estado y contexto
+        estadoActual = data.estado;
+        contextoConversacion = data.contexto || {};
+        
+        // Mostrar respuesta del bot
+        if (data.mensaje) {
+            enviarMensajeBot(data.mensaje);
+        }
+        
+        // Mostrar proceso si existe
+        if (data.proceso && data.proceso.length > 0) {
+            const procesoDiv = mostrarProceso(data.proceso);
+            chatBox.appendChild(procesoDiv);
+            chatBox.scrollTop = chatBox.scrollHeight;
+        }
+        
+        // Manejar final de conversación
+        if (data.mostrar_reinicio) {
+            userInput.disabled = true;
+            sendBtn.disabled = true;
+            
+            const nuevoBtn = document.createElement('button');
+            nuevoBtn.textContent = 'Hacer otra consulta';
+            nuevoBtn.className = 'btn btn-restart';
+            nuevoBtn.onclick = reiniciarChat;
+            chatBox.appendChild(nuevoBtn);
+        }
+    }
     
 
 
@@ -0,0 +1,92 @@
+"""Fixtures compartidas: un corpus en un directorio temporal, PDF de prueba y un OCR simulado"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+# Antes de importar epas: la caché, el segmento y el registro de consultas lentas de las pruebas
+# viven en un directorio temporal, nunca en la raíz del repositorio
+DATOS_PRUEBAS = tempfile.mkdtemp(prefix='epas-pruebas-')
+atexit.register(shutil.rmtree, DATOS_PRUEBAS, True)
+os.environ['EPAS_CACHE_EXTRACCION'] = os.path.join(DATOS_PRUEBAS, 'cache_extraccion.sqlite3')
+os.environ['EPAS_CORPUS_SEGMENTO'] = os.path.join(DATOS_PRUEBAS, 'corpus_texto.seg')
+os.environ['EPAS_REGISTRO_LENTAS'] = os.path.join(DATOS_PRUEBAS, 'consultas_lentas.jsonl')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from epas import cache, configuracion, indice, ocr, segmento  # noqa: E402
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """
+    Directorio de documentos (un subdirectorio por tipo) con su propia caché de extracción,
+    segmento, índice y caché de resultados, para que las pruebas no toquen los datos del servidor
+    """
+    documentos = tmp_path / 'documentos'
+    for doc_type in configuracion.TIPOS_DOCUMENTO:
+        (documentos / doc_type).mkdir(parents=True)
+    monkeypatch.setattr(configuracion, 'DOCUMENTOS_PATH', str(documentos))
+    # La caché de extracción se abre en la ruta de la prueba al primer uso
+    monkeypatch.setattr(configuracion, 'CACHE_EXTRACCION_PATH', str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.delitem(vars(cache), 'cache_extraccion', raising=False)
+    monkeypatch.setattr(segmento, 'segmento_corpus', segmento.SegmentoCorpus(
+        str(tmp_path / 'corpus_texto.seg'), configuracion.CORPUS_COMPACTAR_FRACCION
+    ))
+    indice_corpus = indice.IndiceCorpus(configuracion.TIPOS_DOCUMENTO)
+    monkeypatch.setattr(indice, 'indice_corpus', indice_corpus)
+    monkeypatch.setattr(indice, 'cache_resultados', indice.CacheResultados(indice_corpus, 64))
+    monkeypatch.setattr(ocr, 'uso_perfiles_ocr', ocr.UsoPerfilesOCR())
+    return documentos
+
+@pytest.fixture
+def crear_pdf():
+    """
+    Crea un PDF en `ruta`: cada página es un texto (página con capa de texto) o None (página
+    escaneada: una imagen que la cubre, sin capa de texto)
+    """
+    def crear(ruta, paginas: List[Optional[str]]) -> str:
+        with fitz.open() as doc:
+            for contenido in paginas:
+                page = doc.new_page(width=595, height=842)
+                if contenido is None:
+                    gris = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 60, 85), False)
+                    gris.clear_with(200)
+                    page.insert_image(page.rect, pixmap=gris)
+                else:
+                    page.insert_textbox(fitz.Rect(40, 40, 555, 800), contenido, fontsize=11)
+            doc.save(str(ruta))
+        return str(ruta)
+    return crear
+
+class OCRSimulado:
+    """
+    Reemplaza a EasyOCR: devuelve `region` para las imágenes apaisadas (el recorte del encabezado
+    de un perfil) y `pagina` para las páginas completas, y anota cada llamada
+    """
+
+    def __init__(self):
+        self.region = ""
+        self.pagina = ""
+        self.llamadas: List[str] = []
+
+    def __call__(self, imagen: np.ndarray, allowlist: Optional[str] = None):
+        forma = 'region' if imagen.shape[0] < imagen.shape[1] else 'pagina'
+        self.llamadas.append(forma)
+        texto = getattr(self, forma)
+        if allowlist:
+            texto = "".join(c for c in texto if c in allowlist or c.isspace()).strip()
+        return texto, 0.9 if texto else 0.0
+
+@pytest.fixture
+def ocr_simulado(monkeypatch):
+    """OCR en el hilo de la prueba, sin pool de procesos, sin detección de páginas en blanco y sin EasyOCR"""
+    simulado = OCRSimulado()
+    monkeypatch.setattr(ocr, 'reconocer', simulado)
+    monkeypatch.setattr(ocr, 'pagina_vacia', lambda imagen: False)
+    monkeypatch.setattr(ocr, 'OCR_PROCESOS', 0)
+    return simulado
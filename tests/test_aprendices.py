@@ -0,0 +1,50 @@
+"""Roster de aprendices: índices por documento, ficha y nombre, y recarga de database.txt"""
+import os
+
+from epas.aprendices import RosterAprendices
+
+ENCABEZADO = "TipoDocumento|NumeroDocumento|Nombres|Apellido1|Apellido2|Ficha|Codigo|Version|Programa|Nivel\n"
+FILAS = [
+    "CC|1032508266|JUAN CARLOS|PEREZ|GÓMEZ|2758344|228106|1|ANALISIS Y DESARROLLO DE SOFTWARE|TECNÓLOGO",
+    "CC|52111222|MARIA|LOPEZ|RUIZ|2758344|228106|1|ANALISIS Y DESARROLLO DE SOFTWARE|TECNÓLOGO",
+    "TI|1001001001|ANA|RUIZ|PEREZ|2611000|134100|2|GESTION CONTABLE|TÉCNICO",
+    "fila incompleta|sin campos",
+]
+
+def escribir(path, filas):
+    path.write_text(ENCABEZADO + "\n".join(filas) + "\n", encoding='utf-8')
+
+def test_indices_y_busqueda_por_nombre(tmp_path):
+    path = tmp_path / 'database.txt'
+    escribir(path, FILAS)
+    base = RosterAprendices(str(path), 60.0).obtener()
+
+    assert len(base) == 3
+    assert base.get('1032508266').nombre_completo == "Juan Carlos Perez Gómez"
+    assert base.get('999') is None
+    assert {a.documento for a in base.buscar_por_ficha('2758344')} == {'1032508266', '52111222'}
+    assert [a.documento for a in base.buscar_por_codigo('134100')] == ['1001001001']
+    assert {a.documento for a in base.buscar_por_tokens(['perez'])} == {'1032508266', '1001001001'}
+    # Subcadena, sin tildes ni mayúsculas
+    assert [a.documento for a in base.buscar_por_nombre("carlos perez gom")] == ['1032508266']
+    assert [a.documento for a in base.buscar_por_nombre("ruiz p")] == ['1001001001']
+    assert base.buscar_por_nombre("xyz") == []
+
+def test_recarga_solo_si_cambia_el_archivo(tmp_path):
+    path = tmp_path / 'database.txt'
+    escribir(path, FILAS)
+    roster = RosterAprendices(str(path), 0.0)
+    primera = roster.obtener()
+    assert roster.obtener() is primera
+    assert roster.recargas == 1
+
+    escribir(path, FILAS[:1])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    segunda = roster.obtener()
+    assert segunda is not primera
+    assert len(segunda) == 1
+    assert roster.recargas == 2
+
+def test_sin_archivo_queda_vacio(tmp_path):
+    assert len(RosterAprendices(str(tmp_path / 'no_existe.txt'), 60.0).obtener()) == 0
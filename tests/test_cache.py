@@ -0,0 +1,84 @@
+"""Caché de extracción en SQLite: huella del archivo, extracciones parciales y esquema"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from epas.cache import CacheExtraccion, PaginaExtraida, hash_archivo, huella_archivo
+
+def paginas(*textos: str, metodo: str = 'texto'):
+    return [PaginaExtraida(i, metodo, texto, texto.lower()) for i, texto in enumerate(textos)]
+
+def guardar(cache: CacheExtraccion, ruta: str, contenido, completo: bool = True):
+    cache.guardar(ruta, (*huella_archivo(ruta), hash_archivo(ruta)), contenido, completo)
+
+def tocar(ruta, segundos: int = 1):
+    stat = os.stat(ruta)
+    os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + segundos * 10 ** 9))
+
+def test_acierto_hasta_que_cambia_el_contenido(tmp_path):
+    cache = CacheExtraccion(str(tmp_path / 'cache.sqlite3'))
+    ruta = tmp_path / 'a.pdf'
+    ruta.write_bytes(b'%PDF version 1')
+    guardar(cache, str(ruta), paginas("Juan Perez"))
+
+    assert cache.obtener(str(ruta))[0].texto == "Juan Perez"
+
+    # Solo cambió el mtime (una copia, un touch): el hash confirma que es el mismo archivo
+    tocar(ruta)
+    assert cache.obtener(str(ruta)) is not None
+    assert cache.invalidaciones == 0
+
+    ruta.write_bytes(b'%PDF version 2')
+    tocar(ruta, 2)
+    assert cache.obtener(str(ruta)) is None
+    assert cache.invalidaciones == 1
+    assert cache.estadisticas()['documentos'] == 0
+
+def test_extraccion_parcial_solo_se_retoma(tmp_path):
+    cache = CacheExtraccion(str(tmp_path / 'cache.sqlite3'))
+    ruta = tmp_path / 'a.pdf'
+    ruta.write_bytes(b'%PDF escaneado')
+    parcial = [PaginaExtraida(0, 'ocr', "CC 1032508266", "cc 1032508266"), PaginaExtraida(1, 'pendiente', "", "")]
+    guardar(cache, str(ruta), parcial, completo=False)
+
+    assert cache.obtener(str(ruta)) is None
+    assert cache.obtener_parcial(str(ruta)) == parcial
+
+    guardar(cache, str(ruta), paginas("CC 1032508266", "Firma", metodo='ocr'))
+    assert cache.obtener_parcial(str(ruta)) == []
+    assert len(cache.obtener(str(ruta))) == 2
+
+def test_purgar_archivos_borrados(tmp_path):
+    cache = CacheExtraccion(str(tmp_path / 'cache.sqlite3'))
+    for nombre in ('a.pdf', 'b.pdf'):
+        (tmp_path / nombre).write_bytes(nombre.encode())
+        guardar(cache, str(tmp_path / nombre), paginas(nombre))
+    os.remove(tmp_path / 'a.pdf')
+
+    assert cache.purgar() == 1
+    assert cache.estadisticas()['documentos'] == 1
+
+def test_esquema_anterior_se_descarta(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite3')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE documentos (ruta TEXT PRIMARY KEY, tamano INTEGER, mtime_ns INTEGER,"
+                     " sha256 TEXT, completo INTEGER)")
+        conn.execute("INSERT INTO documentos VALUES ('/docs/a.pdf', 1, 1, 'x', 1)")
+        conn.execute("PRAGMA user_version = 2")
+    conn.close()
+
+    cache = CacheExtraccion(db_path)
+    assert cache.estadisticas()['documentos'] == 0
+
+def test_importar_no_crea_la_base(tmp_path):
+    db_path = tmp_path / 'cache.sqlite3'
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    codigo = (
+        "import os, epas.cache, web_app\n"
+        f"assert not os.path.exists({str(db_path)!r})\n"
+        "assert epas.cache.cache_extraccion is epas.cache.cache_extraccion\n"
+        f"assert os.path.exists({str(db_path)!r})\n"
+    )
+    entorno = dict(os.environ, EPAS_CACHE_EXTRACCION=str(db_path))
+    subprocess.run([sys.executable, '-c', codigo], cwd=raiz, env=entorno, check=True)
@@ -0,0 +1,105 @@
+"""Búsqueda de la cédula y el nombre: Myers contra Levenshtein, errores admitidos y falsos positivos"""
+import random
+
+import pytest
+
+from epas import indice, segmento
+from epas.cache import DocumentoExtraido
+from epas.coincidencias import ConsultaDocumentos, buscar_aproximado, distancia_edicion, distancia_max_cedula
+from epas.texto import normalize_text, proyeccion_digitos
+
+def levenshtein(a: str, b: str) -> int:
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        actual = [i]
+        for j, cb in enumerate(b, start=1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = actual
+    return anterior[-1]
+
+def mejor_subcadena(patron: str, texto: str):
+    """(distancia, fin) de la subcadena de `texto` más parecida a `patron`, la primera en empate"""
+    mejor = None
+    for fin in range(len(texto)):
+        distancia = min(levenshtein(patron, texto[inicio:fin + 1]) for inicio in range(fin + 2))
+        if mejor is None or distancia < mejor[0]:
+            mejor = (distancia, fin)
+    return mejor
+
+def documento(texto: str, ruta: str = '/docs/a.pdf') -> DocumentoExtraido:
+    norm_text = normalize_text(texto)
+    return DocumentoExtraido(ruta, [], norm_text, proyeccion_digitos(norm_text), False, 0.0)
+
+def test_buscar_aproximado_coincide_con_levenshtein():
+    azar = random.Random(7)
+    for _ in range(400):
+        patron = "".join(azar.choice('0123') for _ in range(azar.randint(1, 10)))
+        texto = "".join(azar.choice('0123') for _ in range(azar.randint(1, 16)))
+        maximo = azar.randint(0, 3)
+        referencia = mejor_subcadena(patron, texto)
+        esperado = referencia if referencia[0] <= maximo else None
+        assert buscar_aproximado(patron, texto, maximo) == esperado, (patron, texto, maximo)
+
+def test_distancia_edicion_acotada():
+    azar = random.Random(11)
+    for _ in range(300):
+        a = "".join(azar.choice('abc') for _ in range(azar.randint(0, 8)))
+        b = "".join(azar.choice('abc') for _ in range(azar.randint(0, 8)))
+        maximo = azar.randint(0, 3)
+        assert distancia_edicion(a, b, maximo) == min(levenshtein(a, b), maximo + 1)
+
+@pytest.mark.parametrize('largo, errores', [(6, 0), (8, 0), (9, 1), (10, 1)])
+def test_errores_admitidos_segun_el_largo(largo, errores):
+    assert distancia_max_cedula(largo) == errores
+
+@pytest.mark.parametrize('cedula, texto, esperado', [
+    # Cédula de 10 dígitos con un dígito perdido o cambiado por el OCR
+    ('1032508266', "C.C. 103250826", True),
+    ('1032508266', "C.C. 1032503266", True),
+    ('1032508266', "C.C. lO325O8266", True),
+    # Dos errores ya son otro número
+    ('1032508266', "C.C. 1032503267", False),
+    # Una cédula de 8 dígitos a un error es la de otra persona
+    ('52111222', "C.C. 52111223", False),
+    ('52111222', "C.C. 5211122", False),
+    # Solo comparte bloques sueltos de la cédula
+    ('1032508266', "Ficha 1032 del 08 2024, folio 66", False),
+])
+def test_cedula_con_errores_de_ocr(cedula, texto, esperado):
+    consulta = ConsultaDocumentos(cedula, "")
+    assert consulta.buscar(documento(texto))[0] is esperado
+
+def test_nombre_parcial_o_de_otra_persona_no_coincide():
+    consulta = ConsultaDocumentos('', 'Juan Carlos Perez Gomez')
+    assert consulta.buscar(documento("Aprendiz: JUAN CARLOS PEREZ GOMEZ"))[1]
+    assert consulta.buscar(documento("Aprendiz: JAUN CARLOS PERES GOMEZ"))[1]
+    assert not consulta.buscar(documento("Instructor: Juan Rodriguez"))[1]
+    assert not consulta.buscar(documento("Juana Carla Lopez"))[1]
+
+def test_explicar_reporta_el_tramo_de_la_cedula():
+    doc = documento("Nombre: Juan Perez  C.C. 1.032.5O8.266  Ficha 2758344")
+    coincidencia = ConsultaDocumentos('1032508266', 'Juan Perez').explicar(doc)
+    assert coincidencia.cedula and coincidencia.nombre
+    assert coincidencia.evidencia == '10325o8266'
+    assert coincidencia.motivo == "cédula leída con letras confundidas por el OCR"
+
+def test_pasada_aproximada_solo_en_archivos_con_un_bloque_de_la_cedula(corpus, monkeypatch):
+    tipo = indice._IndiceTipo()
+    textos = {
+        '/docs/un_error.pdf': "C.C. 1032503266 aprendiz",
+        '/docs/sin_bloques.pdf': "radicado 9988776655 del 14 07 2023",
+        '/docs/clave.pdf': "documento de identidad 8266",
+    }
+    for numero, (ruta, texto) in enumerate(textos.items(), start=1):
+        doc = documento(texto, ruta)
+        segmento.segmento_corpus.guardar((numero, 1), doc)
+        tipo.agregar((numero, 1), doc)
+
+    leidos = []
+    digitos = segmento.segmento_corpus.digitos
+    monkeypatch.setattr(segmento.segmento_corpus, 'digitos', lambda ruta: leidos.append(ruta) or digitos(ruta))
+
+    candidatos = tipo.candidatos(ConsultaDocumentos('1032508266', ''))
+
+    assert candidatos == {'/docs/un_error.pdf', '/docs/clave.pdf'}
+    assert '/docs/sin_bloques.pdf' not in leidos
@@ -0,0 +1,91 @@
+"""Extracción de PDF: fitz serializado entre hilos, OCR en paralelo y cancelación"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from epas import cache, extraccion, indice, ocr, segmento
+from epas.cache import huella_archivo
+
+RECONOCER_EASYOCR = ocr.reconocer
+
+class Concurrencia:
+    """Cuenta cuántos hilos están a la vez dentro de una función y el máximo observado"""
+
+    def __init__(self, funcion, espera: float):
+        self.funcion = funcion
+        self.espera = espera
+        self.activos = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.activos += 1
+            self.maximo = max(self.maximo, self.activos)
+        try:
+            time.sleep(self.espera)
+            return self.funcion(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.activos -= 1
+
+def test_render_serializado_y_ocr_en_paralelo(corpus, crear_pdf, ocr_simulado, monkeypatch):
+    rutas = [crear_pdf(corpus / 'cedulas' / f'cedula_{i}.pdf', [None, None]) for i in range(4)]
+    ocr_simulado.pagina = "CEDULA DE CIUDADANIA 1032508266"
+    render = Concurrencia(ocr.renderizar_gris, 0.02)
+    reconocimiento = Concurrencia(ocr.reconocer, 0.05)
+    monkeypatch.setattr(ocr, 'renderizar_gris', render)
+    monkeypatch.setattr(ocr, 'reconocer', reconocimiento)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        documentos = list(executor.map(extraccion.extraer_documento, rutas))
+
+    assert all(documento.completo for documento in documentos)
+    assert render.maximo == 1
+    assert reconocimiento.maximo > 1
+
+def test_ocr_se_detiene_al_cancelar_la_consulta(corpus, crear_pdf, ocr_simulado, monkeypatch):
+    ruta = crear_pdf(corpus / 'actas' / 'escaneada.pdf', [None] * 30)
+    ocr_simulado.pagina = "ACTA F-023 C.C. 52111222"
+    control = ocr.ControlOCR()
+    llamadas_al_cancelar = []
+
+    def reconocer_y_cancelar(imagen, allowlist=None):
+        resultado = ocr_simulado(imagen, allowlist)
+        if not control.cancelado.is_set():
+            # Otro archivo de la misma consulta encontró la coincidencia
+            control.cancelado.set()
+            llamadas_al_cancelar.append(len(ocr_simulado.llamadas))
+        return resultado
+
+    monkeypatch.setattr(ocr, 'reconocer', reconocer_y_cancelar)
+    with pytest.raises(ocr.ExtraccionCancelada):
+        for _ in ocr.ocr_paginas(ruta, list(range(30)), control):
+            pass
+
+    assert len(ocr_simulado.llamadas) == llamadas_al_cancelar[0] == 1
+
+def test_error_de_easyocr_deja_la_pagina_pendiente(corpus, crear_pdf, ocr_simulado, monkeypatch):
+    ruta = crear_pdf(corpus / 'cedulas' / 'cedula.pdf', ["CEDULA DE CIUDADANIA", None])
+
+    def sin_modelo():
+        raise RuntimeError("no se pudo descargar el modelo de detección")
+
+    monkeypatch.setattr(ocr, 'obtener_lector', sin_modelo)
+    monkeypatch.setattr(ocr, 'reconocer', RECONOCER_EASYOCR)
+    documento = indice.indice_corpus.indexar('cedulas', ruta, huella_archivo(ruta))
+
+    assert [p.metodo for p in documento.paginas] == ['texto', 'pendiente']
+    assert not documento.completo
+    assert cache.cache_extraccion.obtener(ruta) is None
+    assert segmento.segmento_corpus.documento(ruta, huella_archivo(ruta)) is None
+    assert ruta not in indice.indice_corpus.archivos('cedulas')
+
+    # Con EasyOCR de nuevo disponible, el mismo archivo sin cambios se lee completo
+    monkeypatch.setattr(ocr, 'reconocer', ocr_simulado)
+    ocr_simulado.pagina = "C.C. 1032508266"
+    documento = indice.indice_corpus.indexar('cedulas', ruta, huella_archivo(ruta))
+    assert [p.metodo for p in documento.paginas] == ['texto', 'ocr']
+    assert ruta in indice.indice_corpus.archivos('cedulas')
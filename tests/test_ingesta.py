@@ -0,0 +1,63 @@
+"""Ingesta en segundo plano: prioridad de lo que las consultas dejaron sin indexar"""
+import threading
+import time
+
+import pytest
+
+from epas import indice, ingesta
+from epas.cache import huella_archivo
+from epas.ingesta import IngestaDocumentos
+from epas.verificacion import check_documents
+
+CEDULA = '1032508266'
+NOMBRE = 'Juan Carlos Perez Gomez'
+
+@pytest.fixture
+def cola(corpus, monkeypatch):
+    """Ingesta sobre el corpus de la prueba, marcada como activa pero sin hilos propios"""
+    directorios = {doc_type.name: str(doc_type) for doc_type in corpus.iterdir()}
+    cola = IngestaDocumentos(indice.indice_corpus, directorios, 1, 60.0)
+    monkeypatch.setattr(cola, '_hilos', [threading.current_thread()])
+    monkeypatch.setattr(ingesta, 'ingesta', cola)
+    return cola
+
+def test_consulta_adelanta_lo_que_dejo_a_medias(corpus, crear_pdf, ocr_simulado, cola):
+    crear_pdf(corpus / 'actas' / 'acta.pdf', ["ACTA F-023\nAprendiz: MARIA LOPEZ RUIZ\nC.C. 52111222"])
+    parcial = crear_pdf(corpus / 'evaluaciones' / 'evaluacion.pdf', [None, None, None, None])
+    ocr_simulado.region = "EVALUACION MARIA LOPEZ RUIZ CC 52111222"
+    ocr_simulado.pagina = ocr_simulado.region
+
+    check_documents(CEDULA, NOMBRE)
+
+    # Solo la evaluación quedó con páginas pendientes del perfil; el acta ya está indexada
+    assert cola._pendientes == {parcial: IngestaDocumentos.PRIORIDAD_URGENTE}
+
+def test_inactiva_no_encola(corpus, crear_pdf):
+    cola = IngestaDocumentos(indice.indice_corpus, {}, 1, 60.0)
+    cola.adelantar('actas', [crear_pdf(corpus / 'actas' / 'acta.pdf', ["ACTA"])])
+    assert cola.estado()['pendientes'] == 0
+
+def test_urgentes_primero_y_sin_repetir_lo_indexado(corpus, crear_pdf, cola, monkeypatch):
+    normales = [crear_pdf(corpus / 'actas' / f'acta_{i}.pdf', [f"ACTA {i}"]) for i in range(3)]
+    urgente = crear_pdf(corpus / 'actas' / 'urgente.pdf', ["ACTA URGENTE"])
+    ya_indexado = crear_pdf(corpus / 'actas' / 'indexado.pdf', ["ACTA INDEXADA"])
+    for file_path in normales + [ya_indexado]:
+        cola.encolar('actas', file_path)
+    cola.adelantar('actas', [urgente])
+    # Una consulta lo indexó mientras esperaba en la cola
+    indice.indice_corpus.indexar('actas', ya_indexado, huella_archivo(ya_indexado))
+
+    orden = []
+    indexar = indice.indice_corpus.indexar
+    monkeypatch.setattr(indice.indice_corpus, 'indexar', lambda doc_type, file_path, huella: (
+        orden.append(file_path), indexar(doc_type, file_path, huella)
+    ))
+    threading.Thread(target=cola._trabajar, daemon=True).start()
+    limite = time.monotonic() + 10
+    while cola.procesados < 5 and time.monotonic() < limite:
+        time.sleep(0.01)
+
+    assert cola.procesados == 5
+    assert orden[0] == urgente
+    assert ya_indexado not in orden
+    assert set(orden) == set(normales) | {urgente}
@@ -0,0 +1,80 @@
+"""Intenciones del chatbot: autómata de frases, puntajes de intenciones.json y menús de respaldo"""
+import pytest
+
+import web_app
+from epas import configuracion
+from epas.intenciones import AutomataFrases, MotorIntenciones
+
+@pytest.fixture(scope='module')
+def motor():
+    return MotorIntenciones.cargar(configuracion.INTENCIONES_PATH)
+
+def test_automata_encuentra_frases_solapadas():
+    automata = AutomataFrases()
+    etapa = automata.agregar(['etapa'])
+    productiva = automata.agregar(['etapa', 'productiva'])
+    completa = automata.agregar(['que', 'es', 'la', 'etapa', 'productiva'])
+    prefijo = automata.agregar(['la', 'etapa', 'lectiva'])
+    automata.compilar()
+
+    encontradas = list(automata.buscar('que es la etapa productiva'.split()))
+
+    assert sorted(encontradas) == sorted([etapa, productiva, completa])
+    assert prefijo not in encontradas
+    # Solo palabras completas: 'etapas' no es 'etapa'
+    assert list(automata.buscar(['etapas', 'productivas'])) == []
+
+def test_automata_cuenta_cada_aparicion():
+    automata = AutomataFrases()
+    hola = automata.agregar(['hola'])
+    automata.compilar()
+    assert list(automata.buscar(['hola', 'hola', 'que', 'tal'])) == [hola, hola]
+
+@pytest.mark.parametrize('mensaje, intencion', [
+    ("¡Hola!", 'saludo'),
+    ("BUENOS DÍAS", 'saludo'),
+    ("Quiero saber el estado de mi cédula", 'consultar_documentos'),
+    ("documentos", 'consultar_documentos'),
+    ("Mis documentos", 'consultar_documentos'),
+    ("¿Qué es la etapa productiva?", 'info_etapa'),
+    ("Preguntas frecuentes", 'preguntas_frecuentes'),
+    ("¿Qué documentos necesito?", 'pregunta:documentos'),
+    ("¿Cuántas horas dura?", 'pregunta:horas'),
+    ("Fechas de entrega", 'pregunta:fechas'),
+])
+def test_detectar_con_tildes_y_signos(motor, mensaje, intencion):
+    assert motor.detectar(mensaje) == intencion
+
+def test_mensaje_sin_frases_o_bajo_el_umbral_es_desconocido():
+    motor = MotorIntenciones({'umbral': 2, 'intenciones': {'saludo': {'frases': {'hola': 1, 'buenos dias': 2}}}})
+    assert motor.detectar("hola") == 'desconocido'
+    assert motor.detectar("buenos días") == 'saludo'
+    assert motor.detectar("xyz") == 'desconocido'
+    assert MotorIntenciones({}).detectar("hola") == 'desconocido'
+
+def test_empate_gana_la_primera_intencion_declarada():
+    motor = MotorIntenciones({'intenciones': {
+        'primera': {'frases': {'ayuda': 1}},
+        'segunda': {'frases': {'ayuda': 1}},
+    }})
+    assert motor.detectar("ayuda") == 'primera'
+
+def test_pregunta_por_numero(motor):
+    assert motor.pregunta_por_numero(" 2 ").clave == 'fechas'
+    assert motor.pregunta_por_numero("0") is None
+    assert motor.pregunta_por_numero(str(len(motor.preguntas) + 1)) is None
+
+def test_menu_principal_sin_intencion_vuelve_al_menu():
+    respuesta = web_app.procesar_menu_principal("asdf qwerty", {})
+    assert respuesta['estado'] == web_app.ESTADOS['MENU_PRINCIPAL']
+    assert respuesta['mensaje'].startswith("No entendí tu selección")
+
+def test_menu_principal_responde_pregunta_frecuente_escrita():
+    respuesta = web_app.procesar_menu_principal("¿cuántas horas dura?", {})
+    assert respuesta['estado'] == web_app.ESTADOS['FINAL']
+    assert '880 horas' in respuesta['mensaje']
+
+def test_preguntas_frecuentes_opcion_invalida_repite_el_menu(motor):
+    respuesta = web_app.procesar_preguntas_frecuentes("99", {})
+    assert respuesta['estado'] == web_app.ESTADOS['PREGUNTAS_FRECUENTES']
+    assert respuesta['mensaje'] == motor.menu_preguntas_invalido
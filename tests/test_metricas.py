@@ -0,0 +1,47 @@
+"""Métricas: histogramas y contadores en formato Prometheus y traza por etapa entre hilos"""
+import threading
+
+import pytest
+
+from epas import metricas as modulo_metricas
+from epas.metricas import Metricas, en_contexto, etapa, trazar_solicitud
+
+@pytest.fixture(autouse=True)
+def metricas_activas(monkeypatch):
+    monkeypatch.setattr(modulo_metricas, 'METRICAS_ACTIVAS', True)
+
+def test_exportar_histograma_acumulado_y_contadores():
+    metricas = Metricas()
+    buckets = Metricas.DEFINICIONES['epas_archivos_por_consulta'][2]
+    metricas.observar('epas_archivos_por_consulta', buckets[0])
+    metricas.observar('epas_archivos_por_consulta', buckets[-1] + 1)
+    metricas.contar('epas_paginas_total', 3, metodo='ocr')
+    metricas.contar('epas_paginas_total', metodo='ocr')
+
+    texto = metricas.exportar([('epas_extra', 'gauge', 'Valor de otro componente', {'tipo': 'actas'}, 7)])
+
+    assert f'epas_archivos_por_consulta_bucket{{le="{buckets[0]}"}} 1' in texto
+    assert f'epas_archivos_por_consulta_bucket{{le="{buckets[-1]}"}} 1' in texto
+    assert 'epas_archivos_por_consulta_bucket{le="+Inf"} 2' in texto
+    assert 'epas_archivos_por_consulta_count 2' in texto
+    assert 'epas_paginas_total{metodo="ocr"} 4' in texto
+    assert '# TYPE epas_extra gauge' in texto
+    assert 'epas_extra{tipo="actas"} 7' in texto
+
+def test_traza_incluye_las_etapas_de_otros_hilos():
+    def trabajo():
+        with etapa('pdf.render', pagina=0):
+            pass
+
+    with trazar_solicitud() as traza:
+        with etapa('indice.candidatos'):
+            hilo = threading.Thread(target=en_contexto(trabajo))
+            hilo.start()
+            hilo.join()
+        # Sin en_contexto, el hilo no ve la traza de la solicitud
+        ajeno = threading.Thread(target=trabajo)
+        ajeno.start()
+        ajeno.join()
+
+    assert traza.etapas['indice.candidatos'][1] == 1
+    assert traza.etapas['pdf.render'][1] == 1
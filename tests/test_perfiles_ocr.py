@@ -0,0 +1,119 @@
+"""Perfiles de OCR por tipo de documento: pasada dirigida, respaldo de página completa y páginas pendientes"""
+import numpy as np
+
+from epas import cache, extraccion, indice, ocr, segmento
+from epas.cache import huella_archivo
+from epas.coincidencias import ConsultaDocumentos
+from epas.texto import normalize_text
+
+CEDULA = '1032508266'
+NOMBRE = 'Juan Carlos Perez Gomez'
+PORTADA_ACTA = (
+    "ACTA F-023 DE COMPROMISO DEL APRENDIZ\n"
+    "Programa: Tecnologo en Analisis y Desarrollo de Software\n"
+    "Ficha No. 2758344   Fecha: 12/03/2024   Centro de Gestion Industrial"
+)
+
+def consulta_control(cedula: str = CEDULA, nombre: str = NOMBRE) -> ocr.ControlOCR:
+    return ocr.ControlOCR(consulta=ConsultaDocumentos(cedula, nombre))
+
+def test_numeros_candidatos_excluye_ficha_y_numeros_largos():
+    texto = normalize_text("Ficha No. 27583441 - CC 1.032 508 266 - radicado 202403120001 - tel 3001234567")
+    candidatos = list(ocr.numeros_candidatos(texto))
+    assert CEDULA in candidatos
+    assert '3001234567' in candidatos
+    assert '27583441' not in candidatos
+    assert '202403120001' not in candidatos
+    assert not ocr.tiene_numero_candidato("Ficha 2758344 fecha 12/03/2024 - 2024 03 12")
+
+def test_pasada_de_digitos_sobre_la_imagen_de_mayor_resolucion(monkeypatch):
+    llamadas = []
+
+    def reconocer(imagen, allowlist=None):
+        llamadas.append((imagen.shape, allowlist))
+        return ("1032508266", 0.9) if allowlist else ("CC lO3Z5O8Z66", 0.3)
+
+    monkeypatch.setattr(ocr, 'reconocer', reconocer)
+    baja, alta = np.zeros((100, 80), np.uint8), np.zeros((200, 160), np.uint8)
+    perfil = ocr.PerfilOCR(pasada_digitos=True)
+
+    # Confianza baja a DPI_OCR_INICIAL: se renderiza de nuevo y la pasada de dígitos lee esa imagen
+    resultado = ocr.ocr_perfilado(baja, ocr.DPI_OCR_INICIAL, lambda: (None, alta), perfil)
+    assert resultado.rerenderizada
+    assert llamadas == [((100, 80), None), ((200, 160), None), ((200, 160), ocr.DIGITOS_OCR)]
+    assert ocr.tiene_numero_candidato(resultado.texto)
+    assert resultado.pixeles == baja.size + 2 * alta.size
+
+    # Sin segundo render la pasada de dígitos usa la imagen que ya había
+    llamadas.clear()
+    ocr.ocr_perfilado(baja, ocr.DPI_OCR, lambda: (None, alta), perfil)
+    assert llamadas == [((100, 80), None), ((100, 80), ocr.DIGITOS_OCR)]
+
+def test_acta_mixta_con_cedula_fuera_de_la_region(corpus, crear_pdf, ocr_simulado):
+    # Portada tipeada con la ficha y la cédula en la parte baja de la página escaneada
+    ruta = crear_pdf(corpus / 'actas' / 'acta_mixta.pdf', [PORTADA_ACTA, None])
+    ocr_simulado.region = "ACTA DE COMPROMISO DEL APRENDIZ"
+    ocr_simulado.pagina = f"ACTA DE COMPROMISO DEL APRENDIZ\nNombre: {NOMBRE.upper()}\nC.C. 1.032.508.266"
+
+    documento = extraccion.extraer_documento(ruta, consulta_control())
+
+    assert ConsultaDocumentos(CEDULA, NOMBRE).buscar(documento) == (True, True)
+    assert 'pagina' in ocr_simulado.llamadas
+    assert ocr.uso_perfiles_ocr.estadisticas()['actas']['respaldos'] == 1
+    assert [p.metodo for p in documento.paginas] == ['texto', 'ocr']
+    assert documento.completo
+
+def test_paginas_fuera_del_perfil_quedan_pendientes(corpus, crear_pdf, ocr_simulado):
+    ruta = crear_pdf(corpus / 'evaluaciones' / 'evaluacion.pdf', [None, None, None, None])
+    ocr_simulado.region = f"EVALUACION {NOMBRE.upper()} CC {CEDULA}"
+    ocr_simulado.pagina = f"EVALUACION {NOMBRE.upper()} CC {CEDULA}\nResultado aprobado"
+
+    # La consulta es de otro aprendiz: la pasada dirigida lee las dos primeras páginas sin detenerse
+    control = consulta_control('1099888777', 'Maria Lopez')
+    documento = indice.indice_corpus.indexar('evaluaciones', ruta, huella_archivo(ruta), control)
+
+    assert [p.metodo for p in documento.paginas] == ['region', 'region', 'pendiente', 'pendiente']
+    assert not documento.completo
+    assert ocr.uso_perfiles_ocr.estadisticas()['evaluaciones']['respaldos'] == 0
+    # Nada de esto se guarda como el texto completo del PDF
+    assert cache.cache_extraccion.obtener(ruta) is None
+    assert segmento.segmento_corpus.documento(ruta, huella_archivo(ruta)) is None
+    assert ruta not in indice.indice_corpus.archivos('evaluaciones')
+
+    # La ingesta (sin consulta) completa la extracción con OCR de página completa
+    completo = indice.indice_corpus.indexar('evaluaciones', ruta, huella_archivo(ruta))
+    assert completo.completo
+    assert [p.metodo for p in completo.paginas] == ['ocr'] * 4
+    assert ruta in indice.indice_corpus.archivos('evaluaciones')
+    assert cache.cache_extraccion.obtener(ruta) is not None
+
+def test_consulta_retoma_las_regiones_ya_leidas(corpus, crear_pdf, ocr_simulado):
+    ruta = crear_pdf(corpus / 'evaluaciones' / 'evaluacion.pdf', [None, None, None])
+    ocr_simulado.region = f"EVALUACION {NOMBRE.upper()} CC {CEDULA}"
+    ocr_simulado.pagina = f"EVALUACION {NOMBRE.upper()} CC {CEDULA}\nResultado aprobado"
+    extraccion.extraer_documento(ruta, consulta_control('1099888777', 'Maria Lopez'))
+    assert ocr_simulado.llamadas.count('region') == 2
+
+    # La consulta siguiente parte del texto de las regiones guardado en la caché: no repite el OCR dirigido
+    ocr_simulado.llamadas.clear()
+    documento = extraccion.extraer_documento(ruta, consulta_control())
+
+    assert ConsultaDocumentos(CEDULA, NOMBRE).buscar(documento) == (True, True)
+    assert ocr_simulado.llamadas == []
+    assert [p.metodo for p in documento.paginas] == ['region', 'region', 'pendiente']
+
+def test_regiones_retomadas_sin_numeros_van_a_pagina_completa(corpus, crear_pdf, ocr_simulado):
+    ruta = crear_pdf(corpus / 'actas' / 'acta.pdf', [None, None])
+    encabezado = "\nACTA DE COMPROMISO DEL APRENDIZ"
+    # Una extracción parcial anterior que solo leyó las regiones, sin ningún número candidato
+    cache.cache_extraccion.guardar(ruta, (*huella_archivo(ruta), cache.hash_archivo(ruta)), [
+        cache.PaginaExtraida(numero, 'region', encabezado, normalize_text(encabezado)) for numero in range(2)
+    ], completo=False)
+    ocr_simulado.pagina = f"ACTA DE COMPROMISO DEL APRENDIZ\nNombre: {NOMBRE.upper()}\nC.C. {CEDULA}"
+
+    documento = extraccion.extraer_documento(ruta, consulta_control())
+
+    assert ConsultaDocumentos(CEDULA, NOMBRE).buscar(documento) == (True, True)
+    assert 'region' not in ocr_simulado.llamadas
+    assert documento.paginas[0].metodo == 'ocr'
+    assert ocr.uso_perfiles_ocr.estadisticas()['actas']['respaldos'] == 1
@@ -0,0 +1,88 @@
+"""Segmento compartido del corpus: lecturas entre procesos, generación y decodificación por registro"""
+import os
+
+import pytest
+
+from epas.cache import DocumentoExtraido
+from epas.segmento import SegmentoCorpus
+
+def documento(ruta: str, texto: str) -> DocumentoExtraido:
+    digitos = "".join(c for c in texto if c.isdigit())
+    return DocumentoExtraido(ruta, [], texto, digitos, False, 0.0, True, (1, 0))
+
+@pytest.fixture
+def ruta_segmento(tmp_path):
+    return str(tmp_path / 'corpus_texto.seg')
+
+def test_otro_proceso_ve_escrituras_y_retiros(ruta_segmento):
+    escritor = SegmentoCorpus(ruta_segmento, 0.5)
+    lector = SegmentoCorpus(ruta_segmento, 0.5)
+    assert lector.documento('/docs/a.pdf') is None
+
+    escritor.guardar((10, 1), documento('/docs/a.pdf', 'juan perez cc 1032508266'))
+    leido = lector.documento('/docs/a.pdf', (10, 1))
+    assert leido.texto_normalizado == 'juan perez cc 1032508266'
+    assert leido.digitos == '1032508266'
+    assert lector.documento('/docs/a.pdf', (10, 2)) is None
+
+    escritor.guardar((11, 1), documento('/docs/a.pdf', 'maria lopez cc 52111222'))
+    assert lector.documento('/docs/a.pdf').texto_normalizado == 'maria lopez cc 52111222'
+    escritor.retirar('/docs/a.pdf')
+    assert lector.documento('/docs/a.pdf') is None
+    assert lector.rutas() == []
+
+def test_lectura_sin_cambios_no_hace_stat_ni_decodifica_de_nuevo(ruta_segmento, monkeypatch):
+    segmento = SegmentoCorpus(ruta_segmento, 0.5)
+    segmento.guardar((10, 1), documento('/docs/a.pdf', 'juan perez cc 1032508266'))
+    primero = segmento.documento('/docs/a.pdf')
+
+    stat = os.stat
+    llamadas = []
+    monkeypatch.setattr(os, 'stat', lambda ruta, *args, **kwargs: llamadas.append(ruta) or stat(ruta, *args, **kwargs))
+    assert segmento.documento('/docs/a.pdf') is primero
+    assert segmento.digitos('/docs/a.pdf') == '1032508266'
+    assert ruta_segmento not in llamadas
+
+    # Una escritura de otro proceso sube la generación: la siguiente lectura sí vuelve a mirar el archivo
+    SegmentoCorpus(ruta_segmento, 0.5).guardar((20, 1), documento('/docs/b.pdf', 'ana ruiz 1001001001'))
+    assert segmento.documento('/docs/b.pdf').digitos == '1001001001'
+    assert ruta_segmento in llamadas
+    assert segmento.documento('/docs/a.pdf') is primero
+
+def test_compactar_conserva_los_registros_vivos(ruta_segmento):
+    escritor = SegmentoCorpus(ruta_segmento, 0.5)
+    lector = SegmentoCorpus(ruta_segmento, 0.5)
+    for version in range(5):
+        escritor.guardar((version, 1), documento('/docs/a.pdf', f'version {version} cc 1032508266'))
+    escritor.guardar((1, 1), documento('/docs/b.pdf', 'ana ruiz 1001001001'))
+    escritor.retirar('/docs/b.pdf')
+    assert lector.documento('/docs/a.pdf').texto_normalizado == 'version 4 cc 1032508266'
+    tamano = os.path.getsize(ruta_segmento)
+
+    assert escritor.compactar()
+
+    assert os.path.getsize(ruta_segmento) < tamano
+    assert escritor.estadisticas()['bytes_muertos'] == 0
+    assert lector.rutas() == ['/docs/a.pdf']
+    assert lector.documento('/docs/a.pdf', (4, 1)).texto_normalizado == 'version 4 cc 1032508266'
+    assert not os.path.exists(ruta_segmento + '.tmp')
+
+def test_error_al_compactar_no_interrumpe_la_escritura(ruta_segmento, monkeypatch):
+    segmento = SegmentoCorpus(ruta_segmento, 0.1)
+    segmento.MIN_BYTES_COMPACTAR = 0
+    segmento.guardar((1, 1), documento('/docs/a.pdf', 'juan perez cc 1032508266'))
+
+    def fallar(origen, destino):
+        raise PermissionError(13, 'archivo en uso', destino)
+
+    monkeypatch.setattr(os, 'replace', fallar)
+    # El reemplazo deja un registro muerto: guardar intenta compactar y el reemplazo falla
+    assert segmento.guardar((2, 1), documento('/docs/a.pdf', 'juan perez cc 1032508266 acta'))
+    assert segmento.retirar('/docs/a.pdf')
+    assert segmento.estadisticas()['compactaciones'] == 0
+    assert segmento.rutas() == []
+
+    monkeypatch.undo()
+    assert segmento.guardar((3, 1), documento('/docs/b.pdf', 'ana ruiz 1001001001'))
+    assert segmento.estadisticas()['compactaciones'] == 1
+    assert segmento.documento('/docs/b.pdf').digitos == '1001001001'
@@ -0,0 +1,60 @@
+"""Servicio de OCR: lotes de reconocimiento y pasadas de detección en el hilo dueño del modelo"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from epas import ocr
+
+class LectorSimulado:
+    """Lector con la interfaz de easyocr.Reader que anota en qué hilo se usó cada método"""
+
+    def __init__(self):
+        self.hilos = []
+
+    def _anotar(self, metodo: str):
+        self.hilos.append((metodo, threading.current_thread().name))
+
+    def readtext(self, imagen, paragraph=False, allowlist=None):
+        self._anotar('readtext')
+        return [([[0, 0], [1, 0], [1, 1], [0, 1]], 'CC 1032508266', 0.9)]
+
+    def readtext_batched(self, imagenes, paragraph=False, batch_size=1, allowlist=None):
+        self._anotar('readtext_batched')
+        return [[([[0, 0], [1, 0], [1, 1], [0, 1]], 'CC 1032508266', 0.9)] for _ in imagenes]
+
+    def detect(self, imagen):
+        self._anotar('detect')
+        # Una caja horizontal si la imagen tiene algún píxel oscuro
+        return ([[[0, 1, 0, 1]]] if imagen.min() < 128 else [[]]), [[]]
+
+@pytest.fixture
+def lector(monkeypatch):
+    simulado = LectorSimulado()
+    monkeypatch.setattr(ocr, '_lector', simulado)
+    monkeypatch.setattr(ocr, 'servicio_ocr', ocr.ServicioOCR(4, 0.2))
+    monkeypatch.setattr(ocr, 'SERVICIO_OCR', True)
+    monkeypatch.setattr(ocr, 'OCR_PROCESOS', 0)
+    return simulado
+
+def test_deteccion_de_paginas_en_blanco_pasa_por_el_servicio(lector):
+    blanca = np.full((200, 100), 255, dtype=np.uint8)
+    escrita = blanca.copy()
+    escrita[50:60, 10:90] = 0
+
+    assert ocr.pagina_vacia(blanca)
+    assert not ocr.pagina_vacia(escrita)
+    assert lector.hilos == [('detect', 'servicio-ocr'), ('detect', 'servicio-ocr')]
+    assert ocr.servicio_ocr.estadisticas()['detecciones'] == 2
+
+def test_paginas_concurrentes_se_reconocen_en_lotes(lector):
+    imagenes = [np.zeros((100, 80), dtype=np.uint8) for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        resultados = list(executor.map(ocr.reconocer, imagenes))
+
+    assert all(texto == 'CC 1032508266' for texto, _ in resultados)
+    assert {hilo for _, hilo in lector.hilos} == {'servicio-ocr'}
+    estadisticas = ocr.servicio_ocr.estadisticas()
+    assert estadisticas['paginas'] == 4
+    assert estadisticas['lotes'] < 4
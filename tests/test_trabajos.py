@@ -0,0 +1,75 @@
+"""Cola de verificaciones: unión de consultas simultáneas y espera acotada de /procesar"""
+import threading
+
+import pytest
+
+import web_app
+from epas.verificacion import ColaVerificaciones
+
+class VerificacionSimulada:
+    """Hace de `procesar` de la cola: responde con el contexto recibido y espera `liberar` para terminar"""
+
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.llamadas = 0
+
+    def __call__(self, data: dict, progreso) -> dict:
+        self.llamadas += 1
+        progreso("🔍 Buscando en base de datos...")
+        self.liberar.wait(10)
+        return {'mensaje': 'listo', 'estado': web_app.ESTADOS['FINAL'], 'contexto': data.get('contexto', {})}
+
+@pytest.fixture
+def verificacion(monkeypatch):
+    simulada = VerificacionSimulada()
+    monkeypatch.setattr(web_app, 'verificaciones', ColaVerificaciones(simulada, 1, 4, 60.0))
+    return simulada
+
+def cuerpo(contexto: dict) -> dict:
+    return {'estado': web_app.ESTADOS['SOLICITAR_CEDULA'], 'mensaje': '1032508266', 'contexto': contexto}
+
+def test_misma_cedula_y_contexto_se_unen_al_mismo_trabajo(verificacion):
+    primero = web_app.verificaciones.enviar(cuerpo({'sesion': 'a'}))
+    repetido = web_app.verificaciones.enviar(cuerpo({'sesion': 'a'}))
+    otro = web_app.verificaciones.enviar(cuerpo({'sesion': 'b'}))
+    verificacion.liberar.set()
+
+    assert repetido is primero and primero.solicitudes == 2
+    assert otro is not primero
+    assert otro.finalizado.wait(10)
+    assert otro.resultado['contexto'] == {'sesion': 'b'}
+    assert verificacion.llamadas == 2
+
+def test_procesar_responde_202_si_la_verificacion_no_termina(verificacion, monkeypatch):
+    monkeypatch.setattr(web_app, 'TRABAJOS_ESPERA_PROCESAR', 0.05)
+    cliente = web_app.app.test_client()
+
+    respuesta = cliente.post('/procesar', json=cuerpo({}))
+    assert respuesta.status_code == 202
+    datos = respuesta.get_json()
+    assert datos['estado'] == web_app.ESTADOS['SOLICITAR_CEDULA']
+    assert respuesta.headers['Location'] == f"/trabajos/{datos['trabajo']['id']}"
+
+    # Reenviar la cédula con el mismo contexto mientras sigue en curso se une al mismo trabajo y espera su respuesta
+    monkeypatch.setattr(web_app, 'TRABAJOS_ESPERA_PROCESAR', 10)
+    liberar = threading.Timer(0.1, verificacion.liberar.set)
+    liberar.start()
+    respuesta = cliente.post('/procesar', json=cuerpo({}))
+    liberar.join()
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['mensaje'] == 'listo'
+    trabajo = cliente.get(f"/trabajos/{datos['trabajo']['id']}").get_json()
+    assert trabajo['estado'] == 'terminado' and trabajo['solicitudes'] == 2
+    assert verificacion.llamadas == 1
+
+def test_el_progreso_se_sigue_en_el_stream_del_trabajo(verificacion):
+    cliente = web_app.app.test_client()
+    trabajo = cliente.post('/trabajos', json=cuerpo({})).get_json()
+    verificacion.liberar.set()
+
+    eventos = cliente.get(f"/trabajos/{trabajo['id']}/stream").get_data(as_text=True)
+
+    assert 'event: paso' in eventos
+    assert 'event: resultado' in eventos
+    # Ya no hay un hilo por solicitud fuera de la cola
+    assert cliente.post('/procesar/stream', json=cuerpo({})).status_code == 404
@@ -0,0 +1,90 @@
+"""Verificación de documentos de un aprendiz: índice, caché de resultados e invalidación por cambios"""
+import os
+
+from epas import indice
+from epas.cache import huella_archivo
+from epas.verificacion import check_documents
+
+CEDULA = '1032508266'
+NOMBRE = 'Juan Carlos Perez Gomez'
+
+def texto_documento(titulo: str, nombre: str = NOMBRE, cedula: str = CEDULA) -> str:
+    return f"{titulo}\nAprendiz: {nombre.upper()}\nDocumento de identidad C.C. {cedula}\nFicha 2758344"
+
+def test_verificacion_repetida_reutiliza_el_resultado(corpus, crear_pdf):
+    crear_pdf(corpus / 'cedulas' / 'cedula_juan.pdf', [texto_documento("CEDULA DE CIUDADANIA")])
+    crear_pdf(corpus / 'actas' / 'acta_juan.pdf', [texto_documento("ACTA F-023")])
+    crear_pdf(corpus / 'evaluaciones' / 'otra.pdf', [texto_documento("EVALUACION", 'Maria Lopez Ruiz', '52111222')])
+
+    primera, _ = check_documents(CEDULA, NOMBRE)
+    assert primera == {'cedulas': True, 'actas': True, 'evaluaciones': False}
+    assert indice.cache_resultados.aciertos == 0
+
+    segunda, proceso = check_documents(CEDULA, NOMBRE)
+    assert segunda == primera
+    assert indice.cache_resultados.aciertos == 3
+    assert sum(1 for paso in proceso if 'Resultado reutilizado' in paso) == 3
+
+def test_cambio_de_archivo_invalida_solo_su_tipo(corpus, crear_pdf):
+    crear_pdf(corpus / 'cedulas' / 'cedula_juan.pdf', [texto_documento("CEDULA DE CIUDADANIA")])
+    acta = crear_pdf(corpus / 'actas' / 'acta_juan.pdf', [texto_documento("ACTA F-023")])
+    check_documents(CEDULA, NOMBRE)
+
+    # El acta se reemplaza por la de otro aprendiz (con otro mtime)
+    crear_pdf(acta, [texto_documento("ACTA F-023", 'Maria Lopez Ruiz', '52111222')])
+    stat = os.stat(acta)
+    os.utime(acta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    resultados, proceso = check_documents(CEDULA, NOMBRE)
+    assert resultados == {'cedulas': True, 'actas': False, 'evaluaciones': False}
+    reutilizados = [paso for paso in proceso if 'Resultado reutilizado' in paso]
+    assert len(reutilizados) == 2
+    assert indice.cache_resultados.invalidaciones == 1
+
+    # Con el corpus de nuevo estable, la siguiente verificación vuelve a reutilizar los tres
+    check_documents(CEDULA, NOMBRE)
+    assert indice.cache_resultados.aciertos == 5
+
+def test_archivo_nuevo_invalida_un_no_encontrado(corpus, crear_pdf):
+    check_documents(CEDULA, NOMBRE)
+    crear_pdf(corpus / 'evaluaciones' / 'evaluacion_juan.pdf', [texto_documento("EVALUACION")])
+
+    resultados, _ = check_documents(CEDULA, NOMBRE)
+    assert resultados['evaluaciones']
+
+def test_archivo_indexado_por_la_ingesta_durante_la_busqueda(corpus, crear_pdf, monkeypatch):
+    crear_pdf(corpus / 'evaluaciones' / 'otra.pdf', [texto_documento("EVALUACION", 'Maria Lopez Ruiz', '52111222')])
+    check_documents('52111222', 'Maria Lopez Ruiz')
+
+    candidatos = indice.indice_corpus.candidatos
+    ingerida = []
+
+    def candidatos_con_ingesta(doc_type, consulta):
+        encontrados = candidatos(doc_type, consulta)
+        if doc_type == 'evaluaciones' and not ingerida:
+            # La ingesta indexa la evaluación del aprendiz cuando la búsqueda ya tiene sus candidatos
+            ruta = crear_pdf(corpus / 'evaluaciones' / 'evaluacion_juan.pdf', [texto_documento("EVALUACION")])
+            indice.indice_corpus.indexar(doc_type, ruta, huella_archivo(ruta))
+            ingerida.append(ruta)
+        return encontrados
+
+    monkeypatch.setattr(indice.indice_corpus, 'candidatos', candidatos_con_ingesta)
+    resultados, _ = check_documents(CEDULA, NOMBRE)
+    assert not resultados['evaluaciones']
+
+    # El no encontrado se guardó con la generación de antes de buscar: la siguiente consulta vuelve a buscar
+    resultados, _ = check_documents(CEDULA, NOMBRE)
+    assert resultados['evaluaciones']
+
+def test_pdf_ilegible_no_se_indexa_y_se_reintenta(corpus):
+    acta = corpus / 'actas' / 'acta_juan.pdf'
+    acta.write_bytes(b'%PDF-1.4 truncado')
+
+    resultados, _ = check_documents(CEDULA, NOMBRE)
+    assert not resultados['actas']
+    assert str(acta) not in indice.indice_corpus.archivos('actas')
+
+    # Sin cambios en el archivo, la siguiente consulta lo vuelve a intentar: solo se reutilizan los otros tipos
+    _, proceso = check_documents(CEDULA, NOMBRE)
+    assert indice.cache_resultados.aciertos == 2
+    assert any('no se pudo leer el PDF' in paso for paso in proceso)
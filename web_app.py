@@ -1,15 +1,26 @@
 import os
-import re
+import sys
 import random
-import unicodedata
-from typing import Dict, List, Optional, Tuple
-from flask import Flask, render_template, request, jsonify
-from PyPDF2 import PdfReader
-import fitz  # PyMuPDF
-import easyocr
-import numpy as np
-from PIL import Image
-import io
+import time
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+from flask import Flask, Response, render_template, request, jsonify
+import json
+
+from epas import INICIO_PROCESO, cache, configuracion, indice, ocr, segmento
+from epas.aprendices import load_database
+from epas.configuracion import (
+    CORPUS_SEGMENTO_PATH, METRICAS_ACTIVAS, OCR_LOTE_ESPERA, OCR_LOTE_MAX, OCR_PROCESOS,
+    PRECARGAR_OCR, SERVICIO_OCR, TIPOS_DOCUMENTO, TRABAJOS_ESPERA_PROCESAR, TRABAJOS_MAX_COLA, TRABAJOS_RETENCION,
+    TRABAJOS_WORKERS, UMBRAL_CONSULTA_LENTA
+)
+from epas.ingesta import ingesta
+from epas.intenciones import catalogo_intenciones, detectar_intencion
+from epas.metricas import consultas_lentas, metricas, trazar_solicitud
+from epas.ocr import estado_lector, precalentar_ocr, servicio_ocr
+from epas.reporte import ejecutar_reporte
+from epas.texto import normalize_text
+from epas.verificacion import CanalProgreso, ColaLlena, ColaVerificaciones, TrabajoVerificacion, check_documents
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
@@ -22,259 +33,28 @@ ESTADOS = {
     'MENU_PRINCIPAL': 4  
 }
 
-PREGUNTAS_FRECUENTES = {
-    "documentos": {
-        "pregunta": "¿Qué documentos necesito para la etapa productiva?",
-        "respuesta": "Los documentos requeridos son:<br>1. Documento de identidad<br>2. Formato F-023 (Acta de inicio)<br>3. Evaluación de etapa productiva"
-    },
-    "fechas": {
-        "pregunta": "¿Cuáles son las fechas importantes?",
-        "respuesta": "Las fechas clave son:<br>- Inicio etapa productiva: 15 de julio<br>- Entrega evaluaciones: 30 de noviembre<br>- Finalización: 15 de diciembre"
-    },
-    "horas": {
-        "pregunta": "¿Cuántas horas debe tener la etapa productiva?",
-        "respuesta": "La etapa productiva debe tener mínimo 880 horas según el programa de formación."
-    }
-}
-
-# Configuración de paths
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_PATH = os.path.join(BASE_DIR, 'database.txt')
-DOCUMENTOS_PATH = os.path.join(BASE_DIR, 'documentos')
-
-# Inicializar EasyOCR
-reader = easyocr.Reader(['es'], gpu=False)
-
-def normalize_text(text: str) -> str:
-    """Normaliza el texto para búsquedas más confiables"""
-    if not text:
-        return ""
-    
-    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
-
-def load_database() -> Dict[str, dict]:
-    """Carga la base de datos de usuarios en memoria con la nueva estructura"""
-    database = {}
-    try:
-        with open(DATABASE_PATH, 'r', encoding='utf-8') as file:
-            # Saltar la primera línea de encabezados si existe
-            headers = file.readline().strip().split('|')
-            
-            for line in file:
-                parts = line.strip().split('|')
-                if len(parts) >= 10:  # Asegurar que tenemos todos los campos
-                    documento = parts[1].strip()  # Usar NumeroDocumento como clave
-                    database[documento] = {
-                        'tipo_documento': parts[0].strip(),
-                        'nombres': to_capital_case(parts[2].strip()),
-                        'apellido1': to_capital_case(parts[3].strip()),
-                        'apellido2': to_capital_case(parts[4].strip()),
-                        'ficha': parts[5].strip(),
-                        'codigo': parts[6].strip(),
-                        'version_programa': parts[7].strip(),
-                        'programa': to_capital_case(parts[8].strip()),
-                        'nivel_formacion': to_capital_case(parts[9].strip())
-                    }
-    except FileNotFoundError:
-        print(f"⚠️ Archivo de base de datos no encontrado en {DATABASE_PATH}")
-    return database
-
-def detectar_intencion(texto: str) -> str:
-    """Detecta la intención del usuario basado en su mensaje"""
-    texto = texto.lower().strip()
-    
-    # Saludos
-    saludos = ['hola', 'hi', 'buenos días', 'buenas tardes', 'buenas noches']
-    if any(s in texto for s in saludos):
-        return 'saludo'
-    
-    # Preguntas frecuentes
-    if 'documento' in texto or 'requisito' in texto or 'necesito' in texto:
-        return 'documentos'
-    if 'fecha' in texto or 'cuándo' in texto or 'día' in texto:
-        return 'fechas'
-    if 'hora' in texto or 'dura' in texto or 'tiempo' in texto:
-        return 'horas'
-    if 'ayuda' in texto or 'pregunta' in texto or 'frecuente' in texto:
-        return 'ayuda'
-    
-    # Consulta estado
-    if any(palabra in texto for palabra in ['estado', 'documento', 'cedula', 'cédula', 'identificación']):
-        return 'consulta'
-    
-    return 'desconocido'
-
-def extract_text_with_easyocr(image: Image.Image) -> str:
-    """Extrae texto de una imagen usando EasyOCR"""
-    try:
-        img_array = np.array(image)
-        results = reader.readtext(img_array, paragraph=True)
-        full_text = "\n".join([result[1] for result in results])
-        return full_text
-    except Exception as e:
-        print(f"⚠️ Error en EasyOCR: {str(e)}")
-        return ""
-
-def pdf_to_images(pdf_path: str) -> List[Image.Image]:
-    """Convierte PDF a imágenes usando PyMuPDF"""
-    images = []
-    try:
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            pix = page.get_pixmap(dpi=300)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append(img)
-        return images
-    except Exception as e:
-        print(f"⚠️ Error al convertir PDF a imágenes: {str(e)}")
-        return []
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extrae texto de un PDF usando PyPDF2 + EasyOCR (con PyMuPDF para imágenes)"""
-    try:
-        # Extraer texto directo con PyPDF2
-        reader_pdf = PdfReader(pdf_path)
-        full_text = ""
-        for page in reader_pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                full_text += page_text + "\n"
-        
-        # Si hay poco texto, usar OCR en imágenes generadas con PyMuPDF
-        if len(full_text.strip()) < 100:
-            print(f"🔍 Usando EasyOCR para {pdf_path}")
-            images = pdf_to_images(pdf_path)
-            for image in images:
-                ocr_text = extract_text_with_easyocr(image)
-                if ocr_text:
-                    full_text += "\n" + ocr_text
-        
-        return full_text
-    except Exception as e:
-        print(f"⚠️ Error procesando PDF {pdf_path}: {str(e)}")
-        return ""
-    
-def to_capital_case(text: str) -> str:
-    """Convierte un texto a Capital Case (primera letra mayúscula, resto minúsculas)"""
-    if not text:
-        return text
-    return ' '.join(word.capitalize() for word in text.split())
-
-def search_in_pdf(file_path: str, cedula: str, nombre: str) -> Tuple[bool, bool]:
-    """Busca cédula y nombre en un archivo PDF"""
-    try:
-        full_text = extract_text_from_pdf(file_path)
-        
-        if not full_text:
-            return (False, False)
-        
-        norm_text = normalize_text(full_text)
-        norm_cedula = normalize_text(cedula)
-        norm_nombre = normalize_text(nombre)
-        
-        # Búsqueda de cédula
-        cedula_found = False
-        if norm_cedula:
-            clean_cedula = re.sub(r'\D', '', norm_cedula)
-            clean_text_cedula = re.sub(r'\D', '', norm_text)
-            cedula_found = clean_cedula in clean_text_cedula
-            
-            if not cedula_found and len(clean_cedula) >= 4:
-                last_digits = clean_cedula[-4:]
-                patterns = [
-                    rf'cc\D*{last_digits}',
-                    rf'c[ée]dula\D*{last_digits}',
-                    rf'documento\D*{last_digits}',
-                    rf'identificaci[óo]n\D*{last_digits}'
-                ]
-                for pattern in patterns:
-                    if re.search(pattern, norm_text, re.IGNORECASE):
-                        cedula_found = True
-                        break
-        
-        # Búsqueda de nombre
-        name_found = False
-        if norm_nombre:
-            name_parts = norm_nombre.split()
-            if len(name_parts) >= 2:
-                matches = sum(1 for part in name_parts if re.search(r'\b' + re.escape(part) + r'\b', norm_text))
-                name_found = matches >= 2
-                
-                if not name_found:
-                    name_pattern = r'\b' + r'\s+'.join([re.escape(part) for part in name_parts]) + r'\b'
-                    name_found = bool(re.search(name_pattern, norm_text))
-        
-        return (cedula_found, name_found)
-    except Exception as e:
-        print(f"⚠️ Error procesando {file_path}: {str(e)}")
-        return (False, False)
-
-def check_documents(cedula: str, nombre: str) -> Tuple[Dict[str, bool], List[str]]:
-    """Verifica todos los tipos de documentos para coincidencias y devuelve pasos del proceso"""
-    doc_types = ['cedulas', 'actas', 'evaluaciones']
-    results = {t: False for t in doc_types}
-    proceso = []
-    
-    for doc_type in doc_types:
-        dir_path = os.path.join(DOCUMENTOS_PATH, doc_type)
-        if not os.path.exists(dir_path):
-            proceso.append(f"⚠️ Directorio no encontrado: {doc_type}")
-            continue
-        
-        proceso.append(f"🔍 Buscando en {doc_type}...")
-        found = False
-        
-        for filename in os.listdir(dir_path):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(dir_path, filename)
-                proceso.append(f"   Procesando archivo: {filename}")
-                
-                # Extraer texto del PDF
-                proceso.append("   Extrayendo texto del PDF...")
-                full_text = extract_text_from_pdf(file_path)
-                
-                if not full_text:
-                    proceso.append("   No se pudo extraer texto, usando OCR...")
-                
-                # Buscar coincidencias
-                proceso.append("   Buscando coincidencias...")
-                cedula_found, name_found = search_in_pdf(file_path, cedula, nombre)
-                
-                if cedula_found or name_found:
-                    proceso.append(f"   ✅ Coincidencia encontrada en {filename}")
-                    found = True
-                    break
-        
-        results[doc_type] = found
-        proceso.append(f"📌 Resultado para {doc_type}: {'ENCONTRADO' if found else 'NO ENCONTRADO'}")
-    
-    return results, proceso
+# Opciones numéricas del menú principal -> intención (las frases de cada intención están en intenciones.json)
+OPCIONES_MENU = {'1': 'consultar_documentos', '2': 'preguntas_frecuentes', '3': 'info_etapa'}
 
 def buscar_estudiante(database, criterio, valor):
     """
     Busca estudiantes según diferentes criterios
-    :param criterio: 'documento', 'nombre', 'codigo'
+    :param criterio: 'documento', 'nombre', 'codigo', 'ficha'
     :param valor: valor a buscar
     :return: lista de (documento, datos_estudiante)
     """
-    resultados = []
-    for doc, datos in database.items():
-        if criterio == 'documento' and doc == valor:
-            return [(doc, datos)]  # Retorna inmediato para documento
-        
-        if criterio == 'nombre':
-            nombre_completo = f"{datos['nombres']} {datos['apellido1']} {datos['apellido2']}"
-            if valor.lower() in nombre_completo.lower():
-                resultados.append((doc, datos))
-        
-        if criterio == 'codigo' and datos['codigo'] == valor:
-            resultados.append((doc, datos))
-    
-    return resultados
+    if criterio == 'documento':
+        estudiante = database.get(valor)
+        return [(valor, estudiante)] if estudiante else []
+    if criterio == 'nombre':
+        estudiantes = database.buscar_por_nombre(valor)
+    elif criterio == 'codigo':
+        estudiantes = database.buscar_por_codigo(valor)
+    elif criterio == 'ficha':
+        estudiantes = database.buscar_por_ficha(valor)
+    else:
+        estudiantes = []
+    return [(e.documento, e) for e in estudiantes]
 
 def procesar_inicio(intencion, contexto):
     """Maneja el estado inicial con saludo personalizado"""
@@ -311,10 +91,11 @@ def procesar_inicio(intencion, contexto):
 
 def procesar_menu_principal(mensaje_usuario, contexto):
     """Maneja el menú principal con opciones interactivas"""
-    mensaje = mensaje_usuario.lower().strip()
+    motor = catalogo_intenciones.obtener()
+    opcion = OPCIONES_MENU.get(normalize_text(mensaje_usuario)) or motor.detectar(mensaje_usuario)
     
     # Opción 1: Consultar documentos
-    if '1' in mensaje or 'documento' in mensaje or 'estado' in mensaje:
+    if opcion == 'consultar_documentos':
         return {
             'mensaje': "Por favor ingresa tu número de documento (cédula) para verificar tu matrícula y documentos:",
             'estado': ESTADOS['SOLICITAR_CEDULA'],
@@ -323,20 +104,16 @@ def procesar_menu_principal(mensaje_usuario, contexto):
         }
     
     # Opción 2: Preguntas frecuentes
-    elif '2' in mensaje or 'pregunta' in mensaje or 'frecuente' in mensaje:
-        opciones = "<br>".join([
-            f"{i+1}. {v['pregunta']}" 
-            for i, (k, v) in enumerate(PREGUNTAS_FRECUENTES.items())
-        ])
+    elif opcion == 'preguntas_frecuentes':
         return {
-            'mensaje': f'Estas son nuestras preguntas frecuentes:<br>{opciones}<br><br>¿Cuál deseas consultar? (1-{len(PREGUNTAS_FRECUENTES)})',
+            'mensaje': motor.menu_preguntas,
             'estado': ESTADOS['PREGUNTAS_FRECUENTES'],
             'mostrar_reinicio': False,
             'contexto': {'opcion_elegida': 'preguntas_frecuentes'}
         }
     
     # Opción 3: Información etapa productiva
-    elif '3' in mensaje or 'información' in mensaje or 'etapa' in mensaje:
+    elif opcion == 'info_etapa':
         info_etapa = (
             "La <b>Etapa Productiva</b> es el espacio donde aplicas tus conocimientos:<br><br>"
             "📅 <b>Duración:</b> 880 horas mínimo<br>"
@@ -353,6 +130,16 @@ def procesar_menu_principal(mensaje_usuario, contexto):
             'contexto': {'opcion_elegida': 'info_etapa'}
         }
     
+    # Una pregunta frecuente escrita directamente se responde sin pasar por su menú
+    pregunta = motor.pregunta_por_intencion(opcion)
+    if pregunta:
+        return {
+            'mensaje': pregunta.mensaje,
+            'estado': ESTADOS['FINAL'],
+            'mostrar_reinicio': True,
+            'contexto': {'opcion_elegida': 'preguntas_frecuentes'}
+        }
+    
     # Si no se reconoce la opción
     return {
         'mensaje': "No entendí tu selección. Por favor elige:<br>"
@@ -364,26 +151,28 @@ def procesar_menu_principal(mensaje_usuario, contexto):
     }
 
 def procesar_preguntas_frecuentes(mensaje_usuario, contexto):
-    """Procesa las preguntas frecuentes seleccionadas por el usuario"""
-    if mensaje_usuario.isdigit() and 1 <= int(mensaje_usuario) <= len(PREGUNTAS_FRECUENTES):
-        clave = list(PREGUNTAS_FRECUENTES.keys())[int(mensaje_usuario)-1]
+    """Procesa las preguntas frecuentes seleccionadas por el usuario (por número o por sus palabras)"""
+    motor = catalogo_intenciones.obtener()
+    pregunta = motor.pregunta_por_numero(mensaje_usuario) or motor.pregunta_por_intencion(motor.detectar(mensaje_usuario))
+    if pregunta:
         return {
-            'mensaje': f"<b>{PREGUNTAS_FRECUENTES[clave]['pregunta']}</b><br><br>{PREGUNTAS_FRECUENTES[clave]['respuesta']}<br><br>¿Necesitas algo más? (sí/no)",
+            'mensaje': pregunta.mensaje,
             'estado': ESTADOS['FINAL'],
             'mostrar_reinicio': True,
             'contexto': contexto
         }
     
-    opciones = "<br>".join([f"{i+1}. {v['pregunta']}" for i, (k, v) in enumerate(PREGUNTAS_FRECUENTES.items())])
     return {
-        'mensaje': f'Opción no válida. Estas son nuestras preguntas frecuentes:<br>{opciones}<br><br>¿Cuál deseas consultar? (1-{len(PREGUNTAS_FRECUENTES)})',
+        'mensaje': motor.menu_preguntas_invalido,
         'estado': ESTADOS['PREGUNTAS_FRECUENTES'],
         'mostrar_reinicio': False,
         'contexto': contexto
     }
 
-def procesar_cedula(mensaje_usuario, database, contexto):
-    """Procesa el número de cédula ingresado por el usuario"""
+def procesar_cedula(mensaje_usuario, database, contexto, progreso=None):
+    """Procesa el número de cédula ingresado por el usuario (con `progreso`, avisa cada paso en vivo)"""
+    if progreso:
+        progreso("🔍 Buscando en base de datos...")
     if not mensaje_usuario.isdigit() or len(mensaje_usuario) < 8 or len(mensaje_usuario) > 10:
         return {
             'mensaje': 'Documento inválido. Debe tener entre 8 y 10 dígitos. Intenta nuevamente:',
@@ -404,11 +193,14 @@ def procesar_cedula(mensaje_usuario, database, contexto):
             'contexto': contexto
         }
     
-    nombre_completo = f"{estudiante['nombres']} {estudiante['apellido1']} {estudiante['apellido2']}"
-    doc_results, proceso = check_documents(mensaje_usuario, nombre_completo)
+    nombre_completo = estudiante.nombre_completo
+    if progreso:
+        progreso("✓ Datos del estudiante encontrados")
+        progreso("📁 Abriendo archivos PDF...")
+    doc_results, proceso = check_documents(mensaje_usuario, nombre_completo, progreso)
     missing_docs = [k for k, v in doc_results.items() if not v]
 
-    mensaje = f"¡Bienvenido(a), <b>{nombre_completo}</b>! Estudiante del programa {estudiante['programa']} (Ficha {estudiante['ficha']}).<br><br>"
+    mensaje = f"¡Bienvenido(a), <b>{nombre_completo}</b>! Estudiante del programa {estudiante.programa} (Ficha {estudiante.ficha}).<br><br>"
 
     if not missing_docs:
         mensaje += "✅ ¡Felicidades! Tienes TODOS tus documentos al día:<br>"
@@ -416,7 +208,7 @@ def procesar_cedula(mensaje_usuario, database, contexto):
     else:
         mensaje += "❌ Documentos faltantes:<br>"
         if 'cedulas' in missing_docs:
-            mensaje += f"• Documento ({estudiante['tipo_documento']}): No encontrado en nuestros registros<br>"
+            mensaje += f"• Documento ({estudiante.tipo_documento}): No encontrado en nuestros registros<br>"
         if 'actas' in missing_docs:
             mensaje += "• F-023: No encontrada en formatos de curso<br>"
         if 'evaluaciones' in missing_docs:
@@ -464,10 +256,35 @@ def home():
     """Ruta principal que renderiza la interfaz del chatbot"""
     return render_template('chatbot.html')
 
-@app.route('/procesar', methods=['POST'])
-def procesar():
-    """Procesa los mensajes del usuario y devuelve respuestas del chatbot"""
-    data = request.get_json()
+NOMBRES_ESTADO = {valor: nombre for nombre, valor in ESTADOS.items()}
+
+def responder_mensaje(data: dict, progreso: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Calcula la respuesta del chatbot para un mensaje (el cuerpo JSON de /procesar), midiendo su
+    latencia por estado; si supera UMBRAL_CONSULTA_LENTA, guarda su desglose por etapa
+    """
+    if not METRICAS_ACTIVAS:
+        return _responder_mensaje(data, progreso)
+
+    with trazar_solicitud() as traza:
+        inicio = time.perf_counter()
+        try:
+            return _responder_mensaje(data, progreso)
+        finally:
+            segundos = time.perf_counter() - inicio
+            estado = NOMBRES_ESTADO.get(data.get('estado', ESTADOS['INICIO']), 'DESCONOCIDO')
+            metricas.observar('epas_solicitud_segundos', segundos, estado=estado)
+            if segundos >= UMBRAL_CONSULTA_LENTA:
+                mensaje = str(data.get('mensaje', '')).strip()
+                consultas_lentas.registrar({
+                    'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'estado': estado,
+                    'mensaje': ('*' * max(0, len(mensaje) - 4) + mensaje[-4:]) if mensaje.isdigit() else None,
+                    'segundos': round(segundos, 3),
+                    **traza.resumen()
+                })
+
+def _responder_mensaje(data: dict, progreso: Optional[Callable[[str], None]] = None) -> dict:
     estado_actual = data.get('estado', ESTADOS['INICIO'])
     mensaje_usuario = data.get('mensaje', '').strip()
     es_consulta_proceso = data.get('proceso', False)
@@ -497,24 +314,213 @@ def procesar():
     
     elif estado_actual == ESTADOS['SOLICITAR_CEDULA']:
         if es_consulta_proceso:
-            # Simular progreso de búsqueda
+            # Simular progreso de búsqueda (clientes sin streaming; ver /trabajos/<id>/stream)
             respuesta['proceso'] = [
                 "🔍 Buscando en base de datos...",
                 "✓ Datos del estudiante encontrados",
                 "📁 Abriendo archivos PDF..."
             ]
         else:
-            respuesta.update(procesar_cedula(mensaje_usuario, database, contexto))
+            respuesta.update(procesar_cedula(mensaje_usuario, database, contexto, progreso))
     
     elif estado_actual == ESTADOS['FINAL']:
         respuesta.update(procesar_final(mensaje_usuario, contexto))
     
-    return jsonify(respuesta)
+    return respuesta
+
+def es_verificacion(data: dict) -> bool:
+    """True si el mensaje dispara la verificación de documentos (lo costoso, que va a la cola de trabajos)"""
+    return data.get('estado', ESTADOS['INICIO']) == ESTADOS['SOLICITAR_CEDULA'] and not data.get('proceso', False)
+
+def respuesta_cola_llena(data: dict, error: ColaLlena):
+    """Respuesta 429 con Retry-After, en el formato de /procesar para que el chat la muestre"""
+    respuesta = jsonify({
+        'mensaje': f'⏳ Hay muchas consultas en curso. Por favor intenta nuevamente en {error.reintentar_en} segundos.',
+        'estado': data.get('estado', ESTADOS['INICIO']),
+        'mostrar_reinicio': False,
+        'encontrado': None,
+        'proceso': [],
+        'contexto': data.get('contexto', {}),
+        'reintentar_en': error.reintentar_en
+    })
+    respuesta.status_code = 429
+    respuesta.headers['Retry-After'] = str(error.reintentar_en)
+    return respuesta
+
+def respuesta_en_curso(data: dict, trabajo: TrabajoVerificacion):
+    """Respuesta 202 con el trabajo que sigue en curso, en el formato de /procesar para que el chat la muestre"""
+    respuesta = jsonify({
+        'mensaje': '⏳ Tu verificación sigue en curso. Envía de nuevo tu documento en unos segundos para ver el resultado.',
+        'estado': data.get('estado', ESTADOS['INICIO']),
+        'mostrar_reinicio': False,
+        'encontrado': None,
+        'proceso': [],
+        'contexto': data.get('contexto', {}),
+        'trabajo': trabajo.describir()
+    })
+    respuesta.status_code = 202
+    respuesta.headers['Location'] = f'/trabajos/{trabajo.id}'
+    return respuesta
 
-def initialize_application():
+@app.route('/procesar', methods=['POST'])
+def procesar():
+    """
+    Procesa los mensajes del usuario y devuelve respuestas del chatbot. La verificación de documentos
+    espera a lo sumo TRABAJOS_ESPERA_PROCESAR segundos; si no terminó, responde 202 con su trabajo
+    """
+    data = request.get_json()
+    if not es_verificacion(data):
+        return jsonify(responder_mensaje(data))
+
+    try:
+        trabajo = verificaciones.enviar(data)
+    except ColaLlena as e:
+        return respuesta_cola_llena(data, e)
+    if not trabajo.finalizado.wait(TRABAJOS_ESPERA_PROCESAR):
+        return respuesta_en_curso(data, trabajo)
+    if trabajo.estado == 'error':
+        return jsonify({'error': trabajo.error}), 500
+    return jsonify(trabajo.resultado)
+
+def respuesta_sse(canal: CanalProgreso) -> Response:
+    """Respuesta HTTP text/event-stream que reenvía los eventos del canal a medida que llegan"""
+    def generar():
+        for evento in canal.iterar():
+            if evento is None:
+                yield ": ping\n\n"  # mantiene viva la conexión durante OCR largos
+                continue
+            tipo, datos = evento
+            yield f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    return Response(generar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+verificaciones = ColaVerificaciones(responder_mensaje, TRABAJOS_WORKERS, TRABAJOS_MAX_COLA, TRABAJOS_RETENCION)
+
+@app.route('/trabajos', methods=['POST'])
+def crear_trabajo():
+    """
+    Encola la verificación de una cédula (mismo cuerpo que /procesar) y responde 202 con el id del
+    trabajo; el resultado se consulta en /trabajos/<id> o se sigue en vivo en /trabajos/<id>/stream
+    """
+    data = request.get_json()
+    if not es_verificacion(data):
+        return jsonify({'error': 'Solo la verificación de documentos se procesa como trabajo; usa /procesar'}), 400
+    try:
+        trabajo = verificaciones.enviar(data)
+    except ColaLlena as e:
+        return respuesta_cola_llena(data, e)
+    datos = trabajo.describir()
+    datos['coalescido'] = trabajo.solicitudes > 1
+    return jsonify(datos), 202
+
+@app.route('/trabajos/estado')
+def estado_trabajos():
+    """Devuelve la profundidad de la cola de verificaciones y sus tiempos de espera y ejecución"""
+    return jsonify(verificaciones.estado())
+
+@app.route('/trabajos/<trabajo_id>')
+def consultar_trabajo(trabajo_id):
+    """Devuelve el estado de un trabajo y, si ya terminó, la respuesta del chatbot"""
+    trabajo = verificaciones.obtener(trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado o vencido'}), 404
+    return jsonify(trabajo.describir())
+
+@app.route('/trabajos/<trabajo_id>/stream')
+def seguir_trabajo(trabajo_id):
+    """Sigue un trabajo con Server-Sent Events: un evento 'paso' por cada paso real y uno 'resultado' al final"""
+    trabajo = verificaciones.obtener(trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado o vencido'}), 404
+    return respuesta_sse(trabajo.canal)
+
+def _metricas_componentes() -> List[Tuple[str, str, str, Dict[str, str], float]]:
+    """Contadores que ya llevan la caché, el índice, la cola de trabajos y la ingesta, en formato /metrics"""
+    extras = []
+    for nombre, ayuda, fuente in (
+        ('epas_cache_extraccion', 'Caché de extracción de PDFs', cache.cache_extraccion.estadisticas()),
+        ('epas_cache_resultados', 'Caché de resultados por aprendiz', indice.cache_resultados.estadisticas()),
+    ):
+        for evento in ('aciertos', 'fallos', 'invalidaciones'):
+            extras.append((f'{nombre}_total', 'counter', ayuda, {'evento': evento}, fuente[evento]))
+    trabajos = verificaciones.estado()
+    extras.append(('epas_cola_trabajos', 'gauge', 'Verificaciones en cola o en curso', {'estado': 'en_cola'}, trabajos['profundidad_cola']))
+    extras.append(('epas_cola_trabajos', 'gauge', 'Verificaciones en cola o en curso', {'estado': 'en_curso'}, trabajos['en_curso']))
+    for evento in ('enviados', 'coalescidos', 'rechazados', 'completados', 'fallidos'):
+        extras.append(('epas_trabajos_total', 'counter', 'Verificaciones por resultado', {'evento': evento}, trabajos[evento]))
+    for tipo, datos in indice.indice_corpus.estadisticas().items():
+        extras.append(('epas_indice_archivos', 'gauge', 'Archivos indexados por tipo de documento', {'tipo': tipo}, datos['archivos']))
+    extras.append(('epas_ingesta_pendientes', 'gauge', 'Archivos en la cola de ingesta', {}, ingesta.estado()['pendientes']))
+    estado_segmento = segmento.segmento_corpus.estadisticas()
+    extras.append(('epas_segmento_documentos', 'gauge', 'Documentos en el segmento compartido del corpus', {}, estado_segmento['documentos']))
+    extras.append(('epas_segmento_bytes', 'gauge', 'Bytes del segmento del corpus', {'estado': 'total'}, estado_segmento['bytes']))
+    extras.append(('epas_segmento_bytes', 'gauge', 'Bytes del segmento del corpus', {'estado': 'muertos'}, estado_segmento['bytes_muertos']))
+    for evento in ('aciertos', 'fallos'):
+        extras.append(('epas_segmento_lecturas_total', 'counter', 'Lecturas del segmento del corpus', {'evento': evento}, estado_segmento[evento]))
+    extras.append(('epas_segmento_compactaciones_total', 'counter', 'Compactaciones del segmento hechas por este proceso', {}, estado_segmento['compactaciones']))
+    servicio = servicio_ocr.estadisticas()
+    extras.append(('epas_ocr_lotes_total', 'counter', 'Lotes reconocidos por el servicio de OCR', {}, servicio['lotes']))
+    extras.append(('epas_ocr_lote_paginas_total', 'counter', 'Páginas reconocidas por el servicio de OCR', {}, servicio['paginas']))
+    extras.append(('epas_ocr_ocupado_segundos_total', 'counter', 'Tiempo del modelo ocupado en lotes', {}, servicio['segundos_ocupado']))
+    extras.append(('epas_ocr_lote_llenado', 'gauge', 'Páginas por lote sobre el máximo, en promedio', {}, servicio['llenado_lote']))
+    extras.append(('epas_ocr_en_cola', 'gauge', 'Páginas esperando al servicio de OCR', {}, servicio['en_cola']))
+    return extras
+
+@app.route('/metrics')
+def exportar_metricas():
+    """Métricas en formato de texto de Prometheus"""
+    if not METRICAS_ACTIVAS:
+        return "Métricas desactivadas (EPAS_METRICAS=0)\n", 404, {'Content-Type': 'text/plain; charset=utf-8'}
+    return Response(metricas.exportar(_metricas_componentes()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metricas/lentas')
+def estado_consultas_lentas():
+    """Últimas solicitudes por encima del umbral, con su desglose por etapa"""
+    return jsonify({'umbral_segundos': UMBRAL_CONSULTA_LENTA, 'consultas': consultas_lentas.recientes()})
+
+@app.route('/corpus/estado')
+def estado_corpus():
+    """Devuelve el tamaño del segmento compartido del corpus y sus contadores en este proceso"""
+    return jsonify(segmento.segmento_corpus.estadisticas())
+
+@app.route('/resultados/estado')
+def estado_resultados():
+    """Devuelve los contadores de la caché de resultados por aprendiz"""
+    return jsonify(indice.cache_resultados.estadisticas())
+
+@app.route('/ocr/estado')
+def estado_ocr():
+    """
+    Indica si los modelos de EasyOCR están cargados, cuánto tardaron el arranque y la carga, el uso
+    del servicio por lotes, los perfiles de OCR por tipo de documento y el trabajo hecho con cada uno
+    """
+    return jsonify({
+        **estado_lector,
+        'servicio': servicio_ocr.estadisticas() if SERVICIO_OCR and OCR_PROCESOS <= 0 else None,
+        'perfiles': {tipo: perfil._asdict() for tipo, perfil in ocr.PERFILES_OCR.items()},
+        'uso_perfiles': ocr.uso_perfiles_ocr.estadisticas(),
+    })
+
+@app.route('/ocr/precalentar', methods=['POST'])
+def precalentar():
+    """Carga los modelos de EasyOCR sin esperar al primer documento escaneado"""
+    return jsonify(precalentar_ocr())
+
+@app.route('/ingesta/estado')
+def estado_ingesta():
+    """Devuelve el estado de la ingesta en segundo plano (pendientes, procesados, corpus caliente)"""
+    return jsonify(ingesta.estado())
+
+@app.route('/indice/estado')
+def estado_indice():
+    """Devuelve el tamaño del índice invertido del corpus"""
+    return jsonify(indice.indice_corpus.estadisticas())
+
+def initialize_application(iniciar_ingesta: bool = True):
     """Inicializa archivos y directorios requeridos con la nueva estructura"""
-    if not os.path.exists(DATABASE_PATH):
-        with open(DATABASE_PATH, 'w', encoding='utf-8') as file:
+    if not os.path.exists(configuracion.DATABASE_PATH):
+        with open(configuracion.DATABASE_PATH, 'w', encoding='utf-8') as file:
             file.write("TipoDocumento|NumeroDocumento|Nombres|Apellido1|Apellido2|Ficha|Codigo|VersionPrograma|Programa|NivelFormacion\n")
             file.write("CC|1032508266|NICOLLE ALEJANDRA|GONZALEZ|RODRIGUEZ|2944777|233108|1|SISTEMAS TELEINFORMÁTICOS|TÉCNICO\n")
             file.write("CC|1233506810|JULIAN|ALDANA|MAZO|2944777|233108|1|SISTEMAS TELEINFORMÁTICOS|TÉCNICO\n")
@@ -522,18 +528,49 @@ def initialize_application():
             file.write("CC|1023019031|BELLANIRA|ALDANA|ARANGO|2944777|233108|1|SISTEMAS TELEINFORMÁTICOS|TÉCNICO\n")
             file.write("TI|1021805727|BRAHIAN|BERMUDEZ|TORRES|2944777|233108|1|SISTEMAS TELEINFORMÁTICOS|TÉCNICO\n")
     
-    os.makedirs(os.path.join(DOCUMENTOS_PATH, 'cedulas'), exist_ok=True)
-    os.makedirs(os.path.join(DOCUMENTOS_PATH, 'actas'), exist_ok=True)
-    os.makedirs(os.path.join(DOCUMENTOS_PATH, 'evaluaciones'), exist_ok=True)
+    os.makedirs(os.path.join(configuracion.DOCUMENTOS_PATH, 'cedulas'), exist_ok=True)
+    os.makedirs(os.path.join(configuracion.DOCUMENTOS_PATH, 'actas'), exist_ok=True)
+    os.makedirs(os.path.join(configuracion.DOCUMENTOS_PATH, 'evaluaciones'), exist_ok=True)
+
+    purgadas = cache.cache_extraccion.purgar()
+    retirados = segmento.segmento_corpus.purgar()
+    if PRECARGAR_OCR:
+        precalentar_ocr()
+    if iniciar_ingesta:
+        ingesta.iniciar()
+    estado_lector['segundos_arranque'] = time.perf_counter() - INICIO_PROCESO
     
     print("\n" + "="*50)
     print("📂 Aplicación Inicializada:")
-    print(f"- Base de datos: {DATABASE_PATH}")
-    print(f"- Directorio de documentos: {DOCUMENTOS_PATH}")
+    print(f"- Base de datos: {configuracion.DATABASE_PATH}")
+    print(f"- Directorio de documentos: {configuracion.DOCUMENTOS_PATH}")
+    print(f"- Caché de extracción: {cache.cache_extraccion.db_path} ({purgadas} entradas obsoletas eliminadas)")
+    estado_segmento = segmento.segmento_corpus.estadisticas()
+    print(f"- Texto del corpus: {CORPUS_SEGMENTO_PATH} ({estado_segmento['documentos']} documento(s), "
+          f"{estado_segmento['bytes'] / (1024 * 1024):.1f} MB mapeados, {retirados} retirado(s)), estado en /corpus/estado")
+    if iniciar_ingesta:
+        print(f"- Ingesta en segundo plano: {ingesta.workers} worker(s), estado en /ingesta/estado")
+    print(f"- Verificaciones: {verificaciones.workers} worker(s), cola de {verificaciones.max_cola}, estado en /trabajos/estado")
+    modelo = "precargados" if estado_lector['modelo_cargado'] else "se cargarán al primer OCR"
+    print(f"- Modelos de EasyOCR: {modelo}")
+    if OCR_PROCESOS > 0:
+        print(f"- OCR: pool de {OCR_PROCESOS} proceso(s)")
+    elif SERVICIO_OCR:
+        print(f"- OCR: servicio por lotes de hasta {OCR_LOTE_MAX} página(s), espera máxima {OCR_LOTE_ESPERA} s, estado en /ocr/estado")
+    for doc_type in TIPOS_DOCUMENTO:
+        perfil = ocr.PERFILES_OCR.get(doc_type)
+        print(f"- Perfil de OCR de {doc_type}: {perfil.describir() if perfil else 'ninguno (OCR de página completa)'}")
+    print(f"- Tiempo de arranque: {estado_lector['segundos_arranque']:.2f} s")
     print("="*50 + "\n")
 
-if __name__ == '__main__':
-    initialize_application()
-    app.run(debug=True, port=5000)
+if PRECARGAR_OCR and __name__ != '__main__' and multiprocessing.current_process().name == 'MainProcess':
+    # Servidores con --preload importan el módulo en el proceso maestro antes de hacer fork
+    precalentar_ocr()
 
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'report':
+        sys.exit(ejecutar_reporte(sys.argv[2:]))
 
+    # Con debug=True, el proceso padre del recargador no atiende peticiones: solo el hijo ingiere
+    initialize_application(iniciar_ingesta=os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+    app.run(debug=True, port=5000)